@@ -3,9 +3,12 @@ import logging
 import traceback
 from urllib.request import urlopen, Request
 from uniswap.uniswap import UniswapV2Client
+from uniswap.ratelimit import RateLimitedProvider
+from uniswap.scheduler import BlockScheduler
+from uniswap.monitor import LiquidityMonitor
+from uniswap.tokens import TokenStore
 import os
 from web3 import Web3
-import time
 from datetime import datetime
 import math
 
@@ -40,43 +43,29 @@ def get_gwei():
     return gwei_data['fast'], gwei_data['fastest']
 
 
-def get_my_balance():
-    my_provider = Web3.HTTPProvider(NETWORK)
-    w3 = Web3(my_provider)
-    return w3.eth.getBalance(Web3.toChecksumAddress(ACC))
-
-def get_my_token_balance():
-    minABI = [
-    {
-        "constant": "true",
-        "inputs": [{"name": "_owner", "type": "address"}],
-        "name": "balanceOf",
-        "outputs": [{"name": "balance", "type": "uint256"}],
-        "type": "function"
-    },
-    {
-        "constant": "true",
-        "inputs": [],
-        "name": "decimals",
-        "outputs": [{"name": "", "type": "uint8"}],
-        "type": "function"
-    }
-    ]
-
-    my_provider = Web3.HTTPProvider(NETWORK)
-    w3 = Web3(my_provider)
-    return w3.eth.contract(Web3.toChecksumAddress(ACC), abi=minABI)
+def get_my_balance(client):
+    return client.conn.eth.getBalance(Web3.toChecksumAddress(ACC))
+
+def get_my_token_balance(client, tokens):
+    token = tokens.get(B_TOKEN)
+    erc20 = client.conn.eth.contract(Web3.toChecksumAddress(B_TOKEN), abi=UniswapV2Client.ERC20_ABI)
+    balance = erc20.functions.balanceOf(Web3.toChecksumAddress(ACC)).call()
+    print(token["symbol"] + " balance: " + str(balance / 10 ** token["decimals"]))
+    return balance
 
 
 if __name__ == "__main__":
     print("bot start!!!")
 
-    client = UniswapV2Client(ACC, PRIVATE_KEY, provider=NETWORK_WSS)
+    '''stay within the Infura request budget, sends and receipts go first'''
+    provider = RateLimitedProvider(Web3.WebsocketProvider(NETWORK_WSS), requests_per_second=10)
+    client = UniswapV2Client(ACC, PRIVATE_KEY, provider=provider)
 
-    my_balance = get_my_balance()
+    my_balance = get_my_balance(client)
     print('my balance: ' + str(my_balance))
 
-    b_token_balance = get_my_token_balance()
+    tokens = TokenStore(client.conn, path="tokens.db")
+    b_token_balance = get_my_token_balance(client, tokens)
     print("B token = " + B_TOKEN)
     print("B token balance: " + str(b_token_balance))
 
@@ -84,115 +73,87 @@ if __name__ == "__main__":
     WETH_ADDRESS = client.get_weth_address()
     print("W-eth address = " + WETH_ADDRESS)
 
-    ''' check liquid added or not'''
-    while True:
-        pair = client.get_pair(WETH_ADDRESS, B_TOKEN)
-
-        if pair == '0x0000000000000000000000000000000000000000':
-            time.sleep(3)
-            continue
-        else:
-            print("pair = " + pair)
-            while True:
-
-                try:
-                    fast, fastest = get_gwei()
-                    estimate_wei = (fast + fastest) / 2
-                except:
-                    print("can't get gwei, try again")
-                    continue
-
-                print("estimate Gwei = " + str(estimate_wei))
-
-
-                while True:
-                    try:
-                        reverse_weth, reverse_b, liquidity = client.get_reserves((Web3.toChecksumAddress(WETH_ADDRESS)), Web3.toChecksumAddress(B_TOKEN))
-                        break
-                    except:
-                        print("network error!!!")
-                        time.sleep(3)
-                        continue
-
-                print("Current ETH in pool (by wei) = " + str(reverse_weth) + ", current B token in pool (10^18) = " + str(reverse_b) + ", total liquid (10^18) = " + str(liquidity))
-                price_token = ( reverse_weth/reverse_b)*ETH_PRICE
-                print(price_token)
-
-                if reverse_weth == 0:
-                    time.sleep(0.1)
-                    continue
-                elif reverse_weth < ESTIMATED_LIQUID:
-                    print("not enough liquid, estimated liquid = " + str(ESTIMATED_LIQUID))
-                    try:
-                        fast, fastest = get_gwei()
-                        estimate_wei = fast
-                    except:
-                        estimate_wei = estimate_wei
-                    time.sleep(0.1)
-                    continue
-                else:
-                    print("Liquid is added, start trading")
-
-                    gas_price = math.floor( estimate_wei*(10**8))
-
-                    now = datetime.now()
-
-                    '''20 mins'''
-                    timestamp = math.floor(datetime.timestamp(now)) + 72000
-
-                    print(timestamp)
-
-
-                    while True:
-
-                        if buy:
-
-                            if price_token > price_to_buy:
-                                continue
-
-                            try:
-
-                                print("on buy tx")
-                                slip_page = math.floor(estimate_wei * (10 ** 8) * 250000)
-                                amount_in = math.floor(my_balance - (slip_page * 1.5))
-
-                                path = [
-                                    Web3.toChecksumAddress(WETH_ADDRESS),
-                                    Web3.toChecksumAddress(B_TOKEN)
-                                ]
-                                print("gas price = " + str(gas_price) + " amount_in = " + str(
-                                    amount_in) + " time " + str(now))
-
-                                '''print(tx)'''
-                                tx = client.swap_exact_eth_for_tokens(amount_in, 0, path, Web3.toChecksumAddress(ACC), timestamp, gas_price)
-                                print("transaction created:")
-                                print("https://etherscan.io/tx/" + str(Web3.toHex(tx)))
-
-
-                                break
-                            except Exception:
-                                traceback.print_exc()
-                                continue
-
-                        else:
-
-                            if price_token < price_to_sell:
-                                continue
-
-                            try:
-                                print("on sell tx")
-                                amount_in = math.floor(b_token_balance)
-
-                                path = [
-                                    Web3.toChecksumAddress(B_TOKEN),
-                                    Web3.toChecksumAddress(WETH_ADDRESS)
-                                ]
-                                client.gasPrice = gas_price
-                                tx = client.swap_exact_tokens_for_eth(amount_in, 0, path, Web3.toChecksumAddress(ACC), timestamp)
-                                print("transaction created:")
-                                print("https://etherscan.io/tx/" + str(Web3.toHex(tx)))
-
-                            except Exception:
-                                traceback.print_exc()
 
-        continue
+    scheduler = BlockScheduler(client)
+
+    def on_pair_created(block, pair):
+        print("pair = " + pair)
+
+    def on_block(block, reverse_weth, reverse_b):
+        print("Current ETH in pool (by wei) = " + str(reverse_weth) + ", current B token in pool (10^18) = " + str(reverse_b))
+        price_token = (reverse_weth / reverse_b) * ETH_PRICE
+        print(price_token)
+
+        if buy and price_token > price_to_buy:
+            return
+        if not buy and price_token < price_to_sell:
+            return
+
+        try:
+            fast, fastest = get_gwei()
+            estimate_wei = (fast + fastest) / 2
+        except Exception:
+            print("can't get gwei, wait for next block")
+            return
+
+        print("estimate Gwei = " + str(estimate_wei))
+        gas_price = math.floor(estimate_wei * (10 ** 8))
+
+        now = datetime.now()
+
+        '''20 mins'''
+        timestamp = math.floor(datetime.timestamp(now)) + 72000
+
+        print(timestamp)
+
+        try:
+            if buy:
+                print("on buy tx")
+                slip_page = math.floor(estimate_wei * (10 ** 8) * 250000)
+                amount_in = math.floor(my_balance - (slip_page * 1.5))
+
+                path = [
+                    Web3.toChecksumAddress(WETH_ADDRESS),
+                    Web3.toChecksumAddress(B_TOKEN)
+                ]
+                print("gas price = " + str(gas_price) + " amount_in = " + str(
+                    amount_in) + " time " + str(now))
+
+                client.gasPrice = gas_price
+                tx = client.swap_exact_eth_for_tokens(amount_in, 0, path, Web3.toChecksumAddress(ACC), timestamp)
+            else:
+                print("on sell tx")
+                amount_in = math.floor(b_token_balance)
+
+                path = [
+                    Web3.toChecksumAddress(B_TOKEN),
+                    Web3.toChecksumAddress(WETH_ADDRESS)
+                ]
+                client.gasPrice = gas_price
+                tx = client.swap_exact_tokens_for_eth(amount_in, 0, path, Web3.toChecksumAddress(ACC), timestamp)
+            print("transaction created:")
+            print("https://etherscan.io/tx/" + str(Web3.toHex(tx)))
+            scheduler.stop()
+        except Exception:
+            traceback.print_exc()
+
+    def on_liquidity(event, hashes):
+        print("Liquid is added in block " + str(event.block_number) + ", start trading")
+        monitor.stop()
+
+    ''' check liquid added or not, reacting to the pair logs instead of polling'''
+    monitor = LiquidityMonitor(client)
+    monitor.on_pair_created(WETH_ADDRESS, B_TOKEN, lambda event, hashes: on_pair_created(event.block_number, event.pair))
+    monitor.on_reserve_threshold(WETH_ADDRESS, B_TOKEN, WETH_ADDRESS, ESTIMATED_LIQUID, on_liquidity)
+
+    ''' a pool already holding the liquidity may see no Sync for a long time, check its reserves once'''
+    monitor.poll()  # installs the log filter first, so no Sync is missed after the check
+    pair = client.get_pair(WETH_ADDRESS, B_TOKEN)
+    if int(pair, 16) != 0 and client.get_reserves(WETH_ADDRESS, B_TOKEN)[0] >= ESTIMATED_LIQUID:
+        print("Liquid is already added, start trading")
+    else:
+        monitor.run()
+        print(monitor.metrics())
+
+    scheduler.watch_pair(WETH_ADDRESS, B_TOKEN, on_block)
+    scheduler.run()
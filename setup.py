@@ -17,6 +17,7 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     package_data={"uniswap": ["assets/*"]},
     install_requires=["web3"],
+    entry_points={"console_scripts": ["uniswap-v2=uniswap.cli:main"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
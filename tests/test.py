@@ -37,8 +37,8 @@ class BaseTest(unittest.TestCase):
             token_tx = uniswap.add_liquidity(
                 token_a=cls.token_0["address"],
                 token_b=cls.token_1["address"],
-                amount_a=int(cls.token_0["supply"] * 10 ** -1),                   # 1/10 of the total supply of A
-                amount_b=int(cls.token_1["supply"] * 10 ** -1),                   # 1/10 of the total supply of B
+                amount_a=cls.token_0["supply"] // 10,                   # 1/10 of the total supply of A
+                amount_b=cls.token_1["supply"] // 10,                   # 1/10 of the total supply of B
                 min_a=int(cls.token_1["supply"] / cls.token_0["supply"] * 1.01),  # allow 1% slippage on B/A
                 min_b=int(cls.token_0["supply"] / cls.token_1["supply"] * 1.01),  # allow 1% slippage on B/A
                 to=cls.address,
@@ -52,7 +52,7 @@ class BaseTest(unittest.TestCase):
             print("Creating ERC20-WETH pair...")
             weth_tx = uniswap.add_liquidity_eth(
                 token=cls.token_2["address"],
-                amount_token=int(cls.token_2["supply"] * 10 ** -1),  # 1/10 of the total supply of the token
+                amount_token=cls.token_2["supply"] // 10,  # 1/10 of the total supply of the token
                 amount_eth=100,                                      # 100 wei
                 min_token=int(1000 / cls.token_2["supply"] * 1.01),  # allow 1% slippage on B/A
                 min_eth=int(cls.token_2["supply"] / 1000 * 1.01),    # allow 1% slippage on B/A
@@ -104,8 +104,8 @@ class UniswapV2ClientTest(BaseTest):
         self.assertEqual(address, self.weth_token)
 
     def test_add_liquidity(self):
-        amount_a = int(self.token_0["supply"] * 10 ** -3)  # 1/1000 of the total supply of A
-        amount_b = int(self.token_1["supply"] * 10 ** -3)  # 1/1000 of the total supply of B
+        amount_a = self.token_0["supply"] // 1000  # 1/1000 of the total supply of A
+        amount_b = self.token_1["supply"] // 1000  # 1/1000 of the total supply of B
         min_a = 0  # int((amount_b / amount_a) * 1.01)  # allow 1% slippage on B/A
         min_b = 0  # int((amount_a / amount_b) * 1.01)  # allow 1% slippage on A/B
         deadline = int(time.time()) + 1000
@@ -119,7 +119,7 @@ class UniswapV2ClientTest(BaseTest):
 
     def test_add_liquidity_eth(self):
         token = self.token_2["address"]
-        amount_token = int(self.token_2["supply"] * 10 ** -3)  # 1/1000 of the total supply of the token
+        amount_token = self.token_2["supply"] // 1000  # 1/1000 of the total supply of the token
         amount_eth = 1  # 1 wei
         deadline = int(time.time()) + 1000
 
@@ -173,8 +173,8 @@ class UniswapV2ClientTest(BaseTest):
         pass  # TODO
 
     def test_swap_exact_tokens_for_tokens(self):
-        amount = int(self.token_0["supply"] * 10 ** -3)
-        min_out = int(self.token_1["supply"] * 10 ** -5)
+        amount = self.token_0["supply"] // 1000
+        min_out = self.token_1["supply"] // 10 ** 5
         path = [self.token_0["address"], self.token_1["address"]]
         deadline = int(time.time()) + 1000
 
@@ -185,8 +185,8 @@ class UniswapV2ClientTest(BaseTest):
         self.assertTrue(receipt["status"])
 
     def test_swap_tokens_for_exact_tokens(self):
-        amount_out = int(self.token_1["supply"] * 10 ** -5)
-        amount_in_max = int(self.token_0["supply"] * 10 ** -3)
+        amount_out = self.token_1["supply"] // 10 ** 5
+        amount_in_max = self.token_0["supply"] // 1000
         path = [self.token_0["address"], self.token_1["address"]]
         deadline = int(time.time()) + 1000
 
@@ -198,7 +198,7 @@ class UniswapV2ClientTest(BaseTest):
 
     def test_swap_exact_eth_for_tokens(self):
         amount = 10  # 10 wei
-        min_out = int(self.token_2["supply"] * 10 ** -5)
+        min_out = self.token_2["supply"] // 10 ** 5
         path = [self.uniswap.get_weth_address(), self.token_2["address"]]
         deadline = int(time.time()) + 1000
 
@@ -210,7 +210,7 @@ class UniswapV2ClientTest(BaseTest):
 
     def test_swap_tokens_for_exact_eth(self):
         amount_out = 1  # 1 wei
-        amount_in_max = int(self.token_2["supply"] * 10 ** -3)
+        amount_in_max = self.token_2["supply"] // 1000
         path = [self.token_2["address"], self.uniswap.get_weth_address()]
         deadline = int(time.time()) + 1000
 
@@ -221,7 +221,7 @@ class UniswapV2ClientTest(BaseTest):
         self.assertTrue(receipt["status"])
 
     def test_swap_exact_tokens_for_eth(self):
-        amount = int(self.token_2["supply"] * 10 ** -3)
+        amount = self.token_2["supply"] // 1000
         min_out = 1  # 1 wei
         path = [self.token_2["address"], self.uniswap.get_weth_address()]
         deadline = int(time.time()) + 1000
@@ -232,7 +232,7 @@ class UniswapV2ClientTest(BaseTest):
         self.assertTrue(receipt["status"])
 
     def test_swap_eth_for_exact_tokens(self):
-        amount_out = int(self.token_2["supply"] * 10 ** -5)
+        amount_out = self.token_2["supply"] // 10 ** 5
         amount = 100  # 100 wei
         path = [self.uniswap.get_weth_address(), self.token_2["address"]]
         deadline = int(time.time()) + 1000
@@ -0,0 +1,54 @@
+import pickle
+import unittest
+
+from web3 import Web3
+
+from uniswap.address import Address
+from uniswap.uniswap import UniswapV2Utils
+
+
+class AddressTest(unittest.TestCase):
+    link_token = "0x20fe562d797a42dcb3399062ae9546cd06f63280"
+    weth_token = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+
+    def test_interned(self):
+        address = Address.of(self.link_token)
+        self.assertIs(Address.of(self.link_token.upper().replace("0X", "0x")), address)
+        self.assertIs(Address.of(bytes(address)), address)
+        self.assertIs(Address.of(address), address)
+        self.assertIs(pickle.loads(pickle.dumps(address)), address)
+
+    def test_only_checksum_strings_interned(self):
+        lower = "0x" + "ab" * 20
+        address = Address.of(lower)
+        self.assertNotIn(lower, Address._interned)
+        self.assertIs(Address.of(address.checksum), address)
+        self.assertIn(address.checksum, Address._interned)
+
+    def test_checksum(self):
+        self.assertEqual(Address.of(self.link_token).checksum, Web3.toChecksumAddress(self.link_token))
+        self.assertEqual(str(Address.of(self.weth_token)), self.weth_token)
+
+    def test_zero(self):
+        self.assertIs(Address.of("0x0"), Address.ZERO)
+        self.assertEqual(int(Address.ZERO), 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Address.of("0x" + "1" * 41)
+        with self.assertRaises(ValueError):
+            Address.of(b"\x01" * 19)
+
+    def test_sort_tokens_mixed_case(self):
+        token_0, token_1 = UniswapV2Utils.sort_tokens(self.weth_token.lower(), self.link_token.upper()[2:])
+        self.assertEqual(token_0, self.link_token.upper()[2:])
+        self.assertEqual(token_1, self.weth_token.lower())
+
+    def test_sort_tokens_equal_mixed_case(self):
+        with self.assertRaises(AssertionError):
+            UniswapV2Utils.sort_tokens(self.weth_token, self.weth_token.lower())
+
+    def test_pair_for(self):
+        factory = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+        pair = UniswapV2Utils.pair_for(factory, self.weth_token.lower(), self.link_token)
+        self.assertEqual(pair, "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a")
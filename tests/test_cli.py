@@ -0,0 +1,84 @@
+import io
+import json
+import unittest
+
+from uniswap.cli import quote_batch, quote_stream
+from uniswap.profiles import UNISWAP_V2
+from uniswap.uniswap import UniswapV2Client, UniswapV2Utils
+
+
+class StubMulticall(object):
+    """Returns the reserves of known pairs, None for the others."""
+
+    def __init__(self, reserves):
+        self.reserves = reserves
+        self.calls = []
+
+    def block_and_call(self, calls, block_identifier="latest"):
+        self.calls.append((len(calls), block_identifier))
+        if not calls:
+            return None, []
+        return 7, [self.reserves.get(target.checksum) for target, _, _ in calls]
+
+
+class QuoteTest(unittest.TestCase):
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    token_2 = "0xc778417E063141139Fce010982780140Aa0cD5Ac"
+
+    def setUp(self):
+        factory = UniswapV2Client.ADDRESS
+        self.pair = UniswapV2Utils.pair_for(factory, self.token_0, self.token_1)
+        self.other = UniswapV2Utils.pair_for(factory, self.token_1, self.token_2)
+        self.multicall = StubMulticall({self.pair: (1000, 4000, 0), self.other: (5000, 0, 0)})
+
+    def test_quote_batch(self):
+        rows = [
+            {"token_in": self.token_0, "token_out": self.token_1, "amount": "100"},
+            {"token_in": self.token_1.lower(), "token_out": self.token_0, "amount": "100"},
+            {"path": [self.token_0, self.token_1, self.token_0], "amount": 100},
+            {"token_in": self.token_0, "token_out": self.token_2, "amount": "100"},
+            {"token_in": self.token_1, "token_out": self.token_2, "amount": "100"},
+            {"token_in": self.token_0, "token_out": self.token_1, "amount": "abc"},
+        ]
+        block, quotes = quote_batch(self.multicall, UNISWAP_V2, rows)
+        self.assertEqual(block, 7)
+        first = UniswapV2Utils.get_amount_out(100, 1000, 4000)
+        self.assertEqual(quotes[0], (first, None))
+        self.assertEqual(quotes[1], (UniswapV2Utils.get_amount_out(100, 4000, 1000), None))
+        self.assertEqual(quotes[2], (UniswapV2Utils.get_amount_out(first, 4000, 1000), None))
+        self.assertTrue(quotes[3][1].startswith("pair not found"))
+        self.assertTrue(quotes[4][1].startswith("insufficient liquidity"))
+        self.assertTrue(quotes[5][1].startswith("invalid row"))
+        # every pair is read once per batch
+        self.assertEqual(self.multicall.calls, [(3, "latest")])
+
+    def test_quote_stream_csv(self):
+        f_in = io.StringIO("token_in,token_out,amount\n" + "{},{},100\n".format(self.token_0, self.token_1) * 3)
+        f_out = io.StringIO()
+        self.assertEqual(quote_stream(self.multicall, UNISWAP_V2, f_in, f_out, batch_size=2), 3)
+        lines = f_out.getvalue().splitlines()
+        self.assertEqual(lines[0], "token_in,token_out,amount,amount_out,block,error")
+        self.assertEqual(lines[1], "{},{},100,{},7,".format(self.token_0, self.token_1, UniswapV2Utils.get_amount_out(100, 1000, 4000)))
+        self.assertEqual(len(lines), 4)
+        # later batches are pinned to the block of the first one
+        self.assertEqual(self.multicall.calls, [(1, "latest"), (1, 7)])
+
+    def test_quote_stream_invalid_batch(self):
+        rows = [{"token_in": self.token_0, "token_out": self.token_1, "amount": 100},
+                {"token_in": self.token_0, "token_out": self.token_1, "amount": "abc"},
+                {"token_in": self.token_0, "token_out": self.token_1, "amount": 100}]
+        f_in = io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+        f_out = io.StringIO()
+        self.assertEqual(quote_stream(self.multicall, UNISWAP_V2, f_in, f_out, "jsonl", batch_size=1), 3)
+        # the batch without a valid row keeps the stream pinned
+        self.assertEqual([block for _, block in self.multicall.calls], ["latest", 7, 7])
+        self.assertEqual([json.loads(line)["block"] for line in f_out.getvalue().splitlines()], [7, 7, 7])
+
+    def test_quote_stream_jsonl(self):
+        f_in = io.StringIO(json.dumps({"path": "{} {}".format(self.token_1, self.token_0), "amount": 10}) + "\n\n")
+        f_out = io.StringIO()
+        quote_stream(self.multicall, UNISWAP_V2, f_in, f_out, "jsonl")
+        row = json.loads(f_out.getvalue())
+        self.assertEqual(row["amount_out"], UniswapV2Utils.get_amount_out(10, 4000, 1000))
+        self.assertIsNone(row["error"])
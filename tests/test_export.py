@@ -0,0 +1,81 @@
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+
+from uniswap.export import PairExporter, K_LAST, COLUMNS, CSV, PARQUET, pyarrow
+from uniswap.multicall import Multicall
+from uniswap.uniswap import UniswapV2Client
+
+
+class StubMulticall(object):
+    """Factory with num_pairs pairs, pair i holding reserves (i, 2 ** 100 + i)."""
+
+    def __init__(self, num_pairs):
+        self.pairs = ["0x" + "{:040x}".format(0x1000 + i) for i in range(num_pairs)]
+        self.blocks = []
+
+    def block_and_call(self, calls, block_identifier="latest"):
+        self.blocks.append(block_identifier)
+        results = []
+        for target, data, _ in calls:
+            if data == Multicall.ALL_PAIRS_LENGTH:
+                results.append(len(self.pairs))
+            elif data[:4] == bytes.fromhex("1e3dd18b"):  # allPairs(uint256)
+                results.append(self.pairs[int.from_bytes(data[4:], "big")])
+            else:
+                i = self.pairs.index(target.lower())
+                results.append({
+                    Multicall.TOKEN_0: "0x" + "0" * 39 + "a",
+                    Multicall.TOKEN_1: "0x" + "0" * 39 + "b",
+                    Multicall.GET_RESERVES: (i, 2 ** 100 + i, 1600000000),
+                    K_LAST: None,
+                }.get(data, 2 ** 200))
+        return 42, results
+
+
+class PairExporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.multicall = StubMulticall(25)
+        self.exporter = PairExporter(self.multicall, UniswapV2Client.ADDRESS, chunk_size=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_export_csv(self):
+        block, paths = self.exporter.export(self.directory, CSV, workers=3, part_size=10)
+        self.assertEqual(block, 42)
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ["pairs-42-00000000.csv", "pairs-42-00000010.csv", "pairs-42-00000020.csv"])
+        rows = []
+        for path in paths:
+            with open(path) as f:
+                rows += list(csv.DictReader(f))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(list(rows[0]), [name for name, _ in COLUMNS])
+        self.assertEqual(rows[24]["pair_index"], "24")
+        self.assertEqual(rows[24]["reserve_1"], str(2 ** 100 + 24))
+        self.assertEqual(rows[24]["k_last"], "")
+        self.assertEqual(rows[24]["price_0_cumulative_last"], str(2 ** 200))
+        # every read after the first is pinned to its block
+        self.assertEqual(self.multicall.blocks[0], "latest")
+        self.assertEqual(set(self.multicall.blocks[1:]), {42})
+
+    def test_export_range(self):
+        _, paths = self.exporter.export(self.directory, CSV, start=5, stop=8)
+        with open(paths[0]) as f:
+            self.assertEqual([row["pair_index"] for row in csv.DictReader(f)], ["5", "6", "7"])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_export_parquet(self):
+        import pyarrow.parquet
+        _, paths = self.exporter.export(self.directory, PARQUET, part_size=100)
+        table = pyarrow.parquet.read_table(paths[0])
+        self.assertEqual(table.num_rows, 25)
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_export_parquet_without_pyarrow(self):
+        self.assertRaises(RuntimeError, self.exporter.export, self.directory, PARQUET)
@@ -0,0 +1,156 @@
+import unittest
+
+from uniswap.liquidity import (
+    LiquidityPlanner, Zap, zap_amount, balanced_amounts, liquidity_minted, minimum, CREATE_PAIR_GAS)
+from uniswap.multicall import Multicall
+from uniswap.profiles import UNISWAP_V2
+from uniswap.uniswap import UniswapV2Utils
+
+
+class StubFunction(object):
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def buildTransaction(self, params):
+        return dict(params, function=self.name)
+
+
+class StubFunctions(object):
+
+    def __getattr__(self, name):
+        return lambda *args: StubFunction(name, args)
+
+
+class StubContract(object):
+
+    def __init__(self, address):
+        self.address = address
+        self.functions = StubFunctions()
+
+
+class StubAccount(object):
+
+    def sign_transaction(self, tx, private_key):
+        return type("Signed", (), {"rawTransaction": tx})
+
+
+class StubEth(object):
+
+    def __init__(self):
+        self.account = StubAccount()
+        self.sent = []
+
+    def contract(self, address, abi):
+        return StubContract(address)
+
+    def getTransactionCount(self, address, block_identifier="latest"):
+        return 7
+
+    def sendRawTransaction(self, tx):
+        self.sent.append(tx)
+        return len(self.sent)
+
+
+class StubMulticall(object):
+    """Answers reserve, supply and allowance reads from dicts, counting batches."""
+
+    def __init__(self, reserves, supplies, allowances):
+        self.reserves = reserves
+        self.supplies = supplies
+        self.allowances = allowances
+        self.batches = []
+
+    def call(self, calls, block_identifier="latest"):
+        self.batches.append(len(calls))
+        results = []
+        for target, data, _ in calls:
+            if data == Multicall.GET_RESERVES:
+                results.append(self.reserves.get(target))
+            elif len(data) == 4:
+                results.append(self.supplies.get(target))
+            else:
+                results.append(self.allowances.get(target, 0))
+        return results
+
+
+class StubClient(object):
+    profile = UNISWAP_V2
+    address = "0x1563915e194D8CfBA1943570603F7606A3115508"
+    private_key = "0x" + "2" * 64
+
+    def __init__(self, multicall):
+        self.multicall = multicall
+        self.router = StubContract(UNISWAP_V2.router)
+        self.conn = type("Conn", (), {"eth": StubEth()})
+
+    def _create_transaction_params(self, value=0, gas=None, nonce="latest"):
+        assert nonce is None, "planned transactions take their nonce when sent"
+        return {"from": self.address, "value": value, "gas": gas, "nonce": nonce}
+
+
+class LiquidityMathTest(unittest.TestCase):
+
+    def test_zap_amount(self):
+        for amount_in, reserve_in, reserve_out in [(10 ** 18, 10 ** 21, 3 * 10 ** 24), (5 * 10 ** 20, 10 ** 21, 10 ** 21)]:
+            swap_in = zap_amount(amount_in, reserve_in)
+            self.assertEqual(swap_in, (UniswapV2Utils.sqrt(reserve_in * (reserve_in * 3988009 + amount_in * 3988000))
+                                       - reserve_in * 1997) // 1994)
+            swap_out = UniswapV2Utils.get_amount_out(swap_in, reserve_in, reserve_out)
+            # the rest of the input and the output are in the ratio of the reserves after the swap
+            rest = amount_in - swap_in
+            amount_a, amount_b = balanced_amounts(rest, swap_out, reserve_in + swap_in, reserve_out - swap_out)
+            self.assertLessEqual(rest - amount_a, amount_in // 10 ** 15 + 1)
+            self.assertLessEqual(swap_out - amount_b, swap_out // 10 ** 15 + 1)
+
+    def test_balanced_amounts(self):
+        self.assertEqual(balanced_amounts(100, 100, 1000, 2000), (50, 100))
+        self.assertEqual(balanced_amounts(100, 500, 1000, 2000), (100, 200))
+        self.assertEqual(balanced_amounts(100, 500, 0, 0), (100, 500))
+
+    def test_liquidity_minted(self):
+        self.assertEqual(liquidity_minted(4000, 9000, 0, 0, 0), 6000 - 1000)
+        self.assertEqual(liquidity_minted(100, 200, 1000, 2000, 500), 50)
+        self.assertEqual(minimum(1000, 50), 995)
+
+
+class LiquidityPlannerTest(unittest.TestCase):
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    token_2 = "0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
+
+    def setUp(self):
+        self.pair = UniswapV2Utils.pair_for(UNISWAP_V2.factory, self.token_0, self.token_1)
+        self.new_pair = UniswapV2Utils.pair_for(UNISWAP_V2.factory, self.token_0, self.token_2)
+        self.multicall = StubMulticall({self.pair: (10 ** 21, 2 * 10 ** 21, 0)}, {self.pair: 10 ** 21},
+                                       {self.token_1: 2 ** 256 - 1})
+        self.client = StubClient(self.multicall)
+        self.planner = LiquidityPlanner(self.client)
+
+    def test_plan_deposits(self):
+        deposit, new = self.planner.plan_deposits([
+            (self.token_1, self.token_0, 10 ** 18, 10 ** 18),
+            (self.token_0, self.token_2, 10 ** 18, 4 * 10 ** 18),
+        ])
+        self.assertEqual(self.multicall.batches, [4])
+        self.assertEqual((deposit.amount_a, deposit.amount_b), (10 ** 18, 5 * 10 ** 17))
+        self.assertEqual((deposit.min_a, deposit.min_b), (995 * 10 ** 15, 4975 * 10 ** 14))
+        self.assertEqual(deposit.liquidity, 5 * 10 ** 17)
+        self.assertEqual((new.min_a, new.min_b, new.liquidity), (10 ** 18, 4 * 10 ** 18, 2 * 10 ** 18 - 1000))
+
+    def test_zap_transactions(self):
+        zap, = self.planner.plan_zaps([(self.token_0, self.token_1, 10 ** 19)])
+        self.assertIsInstance(zap, Zap)
+        self.assertEqual(zap.deposit.amount_b, zap.min_swap_out)
+        deposit, = self.planner.plan_deposits([(self.token_0, self.token_2, 10 ** 18, 10 ** 18)])
+
+        transactions = self.planner.transactions([zap, deposit], self.client.address, 2 ** 32)
+        functions = [func.name for func, _ in transactions]
+        # token_1 is already approved, token_0 is approved once for both plans
+        self.assertEqual(functions, ["approve", "approve", "swapExactTokensForTokens", "addLiquidity", "addLiquidity"])
+        self.assertEqual(transactions[0][0].args[1], zap.swap_in + zap.deposit.amount_a + deposit.amount_a)
+        self.assertEqual(transactions[-1][1]["gas"], CREATE_PAIR_GAS)
+
+        self.assertEqual(self.planner.send(transactions), [1, 2, 3, 4, 5])
+        self.assertEqual([tx["nonce"] for tx in self.client.conn.eth.sent], [7, 8, 9, 10, 11])
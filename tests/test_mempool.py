@@ -0,0 +1,129 @@
+import unittest
+
+from eth_abi import encode_abi
+from eth_utils import function_signature_to_4byte_selector
+
+from uniswap.mempool import MempoolWatcher
+from uniswap.profiles import UNISWAP_V2
+from uniswap.simulator import UniswapV2Simulator
+from uniswap.uniswap import UniswapV2Utils
+
+
+class StubClient(object):
+    profile = UNISWAP_V2
+
+    class router(object):
+        address = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+
+    @staticmethod
+    def get_weth_address():
+        return MempoolWatcherTest.weth
+
+
+class MempoolWatcherTest(unittest.TestCase):
+    token = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    weth = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+
+    def setUp(self):
+        self.simulator = UniswapV2Simulator()
+        self.simulator.add_pool("0x01", self.token, self.weth, 10 ** 21, 10 ** 20, 10 ** 20)
+        self.watcher = MempoolWatcher(StubClient(), self.simulator)
+
+    def _tx(self, signature, types, values, value=0):
+        data = function_signature_to_4byte_selector(signature) + encode_abi(types, values)
+        return {"hash": "0xab", "from": self.token, "to": StubClient.router.address, "input": "0x" + data.hex(),
+                "value": value}
+
+    def test_selector_table(self):
+        names = set(entry[0] for entry in MempoolWatcher.SELECTORS.values())
+        self.assertIn("swapExactETHForTokens", names)
+        self.assertIn("removeLiquidityETHWithPermit", names)
+        self.assertNotIn("getAmountsOut", names)
+
+    def test_swap_exact_eth_for_tokens(self):
+        tx = self._tx("swapExactETHForTokens(uint256,address[],address,uint256)",
+                      ["uint256", "address[]", "address", "uint256"], [0, [self.weth, self.token], self.token, 1],
+                      value=10 ** 18)
+        seen = []
+        call = self.watcher.process(tx, lambda c, hops: seen.append(hops))
+        self.assertEqual(call.function, "swapExactETHForTokens")
+        self.assertEqual(call.args["path"], [self.weth, self.token])
+        hop = seen[0][0]
+        self.assertEqual(hop.amount_out, UniswapV2Utils.get_amount_out(10 ** 18, 10 ** 20, 10 ** 21))
+        self.assertEqual(hop.reserve_in, 10 ** 20 + 10 ** 18)
+        # projecting must not touch the local reserves
+        self.assertEqual(self.simulator.get_reserves(self.token, self.weth), (10 ** 21, 10 ** 20))
+
+    def test_profile_fee(self):
+        watcher = MempoolWatcher(type("Client", (StubClient,), {"profile": UNISWAP_V2._replace(fee_bps=25)})(),
+                                 self.simulator)
+        tx = self._tx("swapTokensForExactTokens(uint256,uint256,address[],address,uint256)",
+                      ["uint256", "uint256", "address[]", "address", "uint256"],
+                      [10 ** 17, 10 ** 19, [self.token, self.weth], self.token, 1])
+        hops = watcher.project(MempoolWatcher.decode(tx))
+        self.assertEqual(hops[0].amount_in, UniswapV2Utils.get_amount_in(10 ** 17, 10 ** 21, 10 ** 20, 25))
+
+    def test_swap_reverts_on_min_out(self):
+        tx = self._tx("swapExactTokensForETH(uint256,uint256,address[],address,uint256)",
+                      ["uint256", "uint256", "address[]", "address", "uint256"],
+                      [10 ** 18, 10 ** 18, [self.token, self.weth], self.token, 1])
+        call = MempoolWatcher.decode(tx)
+        self.assertEqual(self.watcher.project(call), [])
+
+    def test_swap_tokens_for_exact_tokens(self):
+        tx = self._tx("swapTokensForExactTokens(uint256,uint256,address[],address,uint256)",
+                      ["uint256", "uint256", "address[]", "address", "uint256"],
+                      [10 ** 17, 10 ** 19, [self.token, self.weth], self.token, 1])
+        hops = self.watcher.project(MempoolWatcher.decode(tx))
+        self.assertEqual(hops[0].amount_in, UniswapV2Utils.get_amount_in(10 ** 17, 10 ** 21, 10 ** 20))
+
+    def test_ignores_other_recipients(self):
+        tx = dict(self._tx("WETH()", [], []), to=self.weth)
+        self.assertIsNone(self.watcher.process(tx, lambda c, hops: None))
+
+    def test_unknown_pool(self):
+        other = "0xAE14A3B9F6B333BfF64bEAe1C70a93c0781D6A3F"
+        tx = self._tx("swapExactTokensForTokens(uint256,uint256,address[],address,uint256)",
+                      ["uint256", "uint256", "address[]", "address", "uint256"],
+                      [10 ** 18, 0, [self.weth, self.token, other], self.token, 1])
+        seen = []
+        self.assertIsNotNone(self.watcher.process(tx, lambda c, hops: seen.append(hops)))
+        self.assertEqual(seen, [[]])
+
+    def test_zero_value(self):
+        tx = self._tx("swapExactETHForTokens(uint256,address[],address,uint256)",
+                      ["uint256", "address[]", "address", "uint256"], [0, [self.weth, self.token], self.token, 1])
+        self.assertEqual(self.watcher.project(MempoolWatcher.decode(tx)), [])
+        tx = self._tx("addLiquidityETH(address,uint256,uint256,uint256,address,uint256)",
+                      ["address", "uint256", "uint256", "uint256", "address", "uint256"],
+                      [self.token, 10 ** 18, 0, 0, self.token, 1])
+        self.assertEqual(self.watcher.project(MempoolWatcher.decode(tx)), [])
+
+    def test_malformed_calldata(self):
+        tx = self._tx("swapExactETHForTokens(uint256,address[],address,uint256)",
+                      ["uint256", "address[]", "address", "uint256"], [0, [self.weth, self.token], self.token, 1])
+        tx["input"] = tx["input"][:80]
+        self.assertIsNone(MempoolWatcher.decode(tx))
+        self.assertIsNone(self.watcher.process(tx, lambda c, hops: None))
+
+    def test_watch_skips_failures(self):
+        txs = {"0x01": dict(self._tx("WETH()", [], []), input="0x7ff36ab5"), "0x02": self._tx(
+            "swapExactETHForTokens(uint256,address[],address,uint256)",
+            ["uint256", "address[]", "address", "uint256"], [0, [self.weth, self.token], self.token, 1], 10 ** 18)}
+
+        class Pending(object):
+            def get_new_entries(_):
+                return list(txs)
+
+        seen = []
+
+        def callback(call, hops):
+            seen.append(call)
+            self.watcher.stop()
+            raise ValueError("callback failure")
+
+        eth = type("Eth", (), {"filter": lambda _, name: Pending(), "getTransaction": lambda _, h: txs[h]})()
+        self.watcher.client.conn = type("Conn", (), {"eth": eth})
+        self.watcher.watch(callback)
+        self.assertEqual(len(seen), 1)
+        self.assertEqual(self.watcher.errors, 1)
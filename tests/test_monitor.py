@@ -0,0 +1,175 @@
+import itertools
+import unittest
+
+from eth_abi import encode_abi
+
+from uniswap.address import Address
+from uniswap.monitor import LiquidityMonitor, TOPICS, PAIR_CREATED, MINT, SYNC
+from uniswap.profiles import SUSHISWAP, UNISWAP_V2
+from uniswap.uniswap import UniswapV2Utils
+
+TOPIC = {name: topic for topic, name in TOPICS.items()}
+LOG_INDEX = itertools.count()
+
+
+def log(address, name, topics, data, block=10):
+    index = next(LOG_INDEX)
+    return {"address": address, "blockNumber": block, "blockHash": "0x" + block.to_bytes(32, "big").hex(),
+            "logIndex": index, "topics": [TOPIC[name]] + topics, "data": "0x" + data.hex()}
+
+
+def matches(entry, params):
+    addresses = params["address"] if isinstance(params["address"], list) else [params["address"]]
+    return Address.of(entry["address"]) in [Address.of(address) for address in addresses]
+
+
+class StubFilter(object):
+    """Delivers the logs of its addresses added to the chain after it is installed."""
+
+    def __init__(self, params, chain, filter_id):
+        self.params = params
+        self.filter_id = filter_id
+        self.chain = chain
+        self.position = len(chain)
+
+    def get_new_entries(self):
+        entries, self.position = self.chain[self.position:], len(self.chain)
+        return [entry for entry in entries if matches(entry, self.params)]
+
+
+class StubEth(object):
+
+    def __init__(self):
+        self.entries = []  # logs mined, in chain order
+        self.logs = []  # logs only returned by getLogs
+        self.filters = []
+        self.uninstalled = []
+        self.on_filter = None
+
+    def filter(self, params):
+        self.filters.append(StubFilter(params, self.entries, len(self.filters)))
+        if self.on_filter is not None:
+            self.on_filter()
+        return self.filters[-1]
+
+    def uninstallFilter(self, filter_id):
+        self.uninstalled.append(filter_id)
+
+    def getLogs(self, params):
+        to_block = float("inf") if params["toBlock"] == "latest" else params["toBlock"]
+        return [entry for entry in self.entries + self.logs
+                if matches(entry, params) and params["fromBlock"] <= entry["blockNumber"] <= to_block]
+
+
+class StubProvider(object):
+
+    def __init__(self):
+        self.sent = []
+
+    def make_request(self, method, params):
+        self.sent.append(params[0])
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x" + "ab" * 32}
+
+
+class StubClient(object):
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.conn = type("Conn", (), {"eth": StubEth(), "provider": StubProvider()})
+
+    def get_pair(self, token_a, token_b):
+        return "0x" + "0" * 40
+
+
+class LiquidityMonitorTest(unittest.TestCase):
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    pair = "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a"
+
+    def pair_created(self, factory, pair):
+        return log(factory, PAIR_CREATED, ["0x" + encode_abi(["address"], [t]).hex() for t in (self.token_0, self.token_1)],
+                   encode_abi(["address", "uint256"], [pair, 1]))
+
+    def test_threshold_fires_presigned(self):
+        client = StubClient(UNISWAP_V2)
+        monitor = LiquidityMonitor(client)
+        fired = []
+        monitor.on_reserve_threshold(self.token_1, self.token_0, self.token_1, 100,
+                                     lambda event, hashes: fired.append((event, hashes)), transactions=[b"\x01\x02"])
+        pair = UniswapV2Utils.pair_for(UNISWAP_V2.factory, self.token_0, self.token_1)
+        self.assertEqual(monitor.poll(), [])
+
+        client.conn.eth.entries += [
+            log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [1000, 50])),
+            log(pair, MINT, ["0x" + "0" * 64], encode_abi(["uint256", "uint256"], [10, 5])),
+            log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [1000, 150]), block=11),
+        ]
+        events = monitor.poll()
+        self.assertEqual([event.name for event in events], [SYNC, MINT, SYNC])
+        self.assertEqual((events[1].amount_0, events[1].reserve_1), (10, 50))
+        self.assertEqual(client.conn.eth.filters[0].params["address"], [UNISWAP_V2.factory, pair])
+
+        self.assertEqual(len(fired), 1)
+        self.assertEqual(fired[0][0].block_number, 11)
+        self.assertEqual(fired[0][1], ["0x" + "ab" * 32])
+        self.assertEqual(client.conn.provider.sent, ["0x0102"])
+        self.assertEqual(monitor.triggers[tuple(monitor.pairs.values())[0]], [])
+        metrics = monitor.metrics()
+        self.assertEqual((metrics["events"], metrics["fired"]), (3, 1))
+        self.assertGreaterEqual(metrics["max"], 0)
+
+    def test_pair_created_backfills(self):
+        client = StubClient(SUSHISWAP)
+        monitor = LiquidityMonitor(client)
+        created = []
+        monitor.on_pair_created(self.token_0, self.token_1, lambda event, hashes: created.append(event.pair))
+        synced = []
+        monitor.on_event(self.token_0, self.token_1, lambda event: event.name == SYNC,
+                         lambda event, hashes: synced.append(event.reserve_0))
+        self.assertIsNone(monitor.watch(self.token_0, self.token_1))
+        monitor.poll()
+
+        client.conn.eth.entries.append(self.pair_created(SUSHISWAP.factory, self.pair))
+        client.conn.eth.logs.append(log(self.pair, SYNC, [], encode_abi(["uint112", "uint112"], [7, 8])))
+        monitor.poll()
+        self.assertEqual(created, [self.pair])
+        self.assertEqual(synced, [7])
+        self.assertEqual(monitor.watch(self.token_0, self.token_1), self.pair)
+
+        monitor.poll()
+        self.assertEqual(client.conn.eth.filters[-1].params["address"], [SUSHISWAP.factory, self.pair])
+
+    def test_ignores_other_factories_and_pairs(self):
+        client = StubClient(SUSHISWAP)
+        monitor = LiquidityMonitor(client)
+        monitor.watch(self.token_0, self.token_1)
+        events = monitor.process([self.pair_created(UNISWAP_V2.factory, self.pair),
+                                  log(self.pair, SYNC, [], encode_abi(["uint112", "uint112"], [7, 8]))])
+        self.assertEqual(events, [])
+
+    def test_filter_change_keeps_logs(self):
+        client = StubClient(UNISWAP_V2)
+        eth = client.conn.eth
+        monitor = LiquidityMonitor(client)
+        monitor.watch(self.token_0, self.token_1)
+        monitor.poll()
+        pair = UniswapV2Utils.pair_for(UNISWAP_V2.factory, self.token_0, self.token_1)
+        eth.entries.append(log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [1, 2]), block=20))
+        self.assertEqual(len(monitor.poll()), 1)
+
+        # unread when the filter is replaced, and mined once the new one is installed, seen by both
+        eth.entries.append(log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [3, 4]), block=21))
+        # mined for the new pair before its filter exists, read back from the logs
+        token_2 = "0xAE14A3B9F6B333BfF64bEAe1C70a93c0781D6A3F"
+        new_pair = UniswapV2Utils.pair_for(UNISWAP_V2.factory, self.token_0, token_2)
+        eth.entries.append(log(new_pair, SYNC, [], encode_abi(["uint112", "uint112"], [9, 9]), block=21))
+        eth.on_filter = lambda: eth.entries.append(log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [5, 6]), block=22))
+        monitor.watch(self.token_0, token_2)
+        events = monitor.poll()
+        self.assertEqual([(event.block_number, event.reserve_0) for event in events], [(21, 3), (21, 9), (22, 5)])
+        self.assertEqual(eth.uninstalled, [0])
+        self.assertEqual(monitor.block, 22)
+
+        eth.on_filter = None
+        eth.entries.append(log(pair, SYNC, [], encode_abi(["uint112", "uint112"], [7, 8]), block=23))
+        self.assertEqual([event.reserve_0 for event in monitor.poll()], [7])
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from uniswap.ohlcv import OHLCVAggregator, Candle, event_from_log
+from uniswap.simulator import SYNC, SWAP
+
+
+class OHLCVTest(unittest.TestCase):
+    pair = "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a"
+
+    events = [
+        (1, pair, SYNC, 100, 200),
+        (1, pair, SWAP, 10 ** 4, 0, 0, 18),
+        (1, pair, SYNC, 110, 182),
+        (2, pair, SWAP, 0, 2000, 10, 0),
+        (2, pair, SYNC, 100, 400),
+        (3, pair, SYNC, 100, 300),
+    ]
+    timestamps = {1: 0, 2: 30, 3: 70}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check(self, aggregator):
+        self.assertEqual(aggregator.replay(self.events, self.timestamps.get), 6)
+        minutes = aggregator.candles(self.pair, 60)
+        self.assertEqual(minutes, [
+            Candle(0, 2.0, 4.0, 182 / 110, 4.0, 10 ** 4 + 10, 2018, 30, 6, 2),
+            Candle(60, 4.0, 4.0, 3.0, 3.0, 0, 0, 0, 0, 0),
+        ])
+        hours = aggregator.candles(self.pair, 3600)
+        self.assertEqual(hours, [Candle(0, 2.0, 4.0, 182 / 110, 3.0, 10 ** 4 + 10, 2018, 30, 6, 2)])
+        self.assertEqual(aggregator.candles(self.pair, 60, start=60), minutes[1:])
+        self.assertEqual(aggregator.candles(self.pair, 60, end=60), minutes[:1])
+
+    def test_memory(self):
+        self.check(OHLCVAggregator(resolutions=(60, 3600)))
+
+    def test_database(self):
+        path = os.path.join(self.directory, "candles.db")
+        aggregator = OHLCVAggregator(resolutions=(60, 3600), path=path, flush_size=1)
+        self.check(aggregator)
+        aggregator.close()
+
+        reopened = OHLCVAggregator(resolutions=(60, 3600), path=path)
+        self.assertEqual(len(reopened.candles(self.pair, 60)), 1)
+        self.assertEqual(reopened.compact({60: 60}, now=120), 1)
+        self.assertEqual(reopened.candles(self.pair, 60), [])
+        reopened.close()
+
+    def test_event_from_log(self):
+        log = {"event": "Swap", "address": self.pair.lower(), "blockNumber": 7,
+               "args": {"amount0In": 1, "amount1In": 0, "amount0Out": 0, "amount1Out": 2}}
+        self.assertEqual(event_from_log(log), (7, self.pair, SWAP, 1, 0, 0, 2))
+        self.assertIsNone(event_from_log(dict(log, event="Mint")))
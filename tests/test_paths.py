@@ -0,0 +1,52 @@
+import unittest
+
+from uniswap.paths import PathEvaluator
+from uniswap.simulator import UniswapV2Simulator
+from uniswap.uniswap import UniswapV2Utils
+
+
+class PathEvaluatorTest(unittest.TestCase):
+    token_a = "0x20fe562d797a42dcb3399062ae9546cd06f63280"
+    token_b = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    token_c = "0xAE14A3B9F6B333BfF64bEAe1C70a93c0781D6A3F"
+    token_d = "0x1F9840a85d5aF5bf1D1762F925BDADdC4201F984"
+
+    def setUp(self):
+        self.simulator = UniswapV2Simulator()
+        self.simulator.add_pool("0x01", self.token_a, self.token_b, 10 ** 21, 2 * 10 ** 21, 10 ** 21)
+        self.simulator.add_pool("0x02", self.token_c, self.token_b, 5 * 10 ** 20, 10 ** 21, 10 ** 20)
+        self.simulator.add_pool("0x03", self.token_c, self.token_d, 10 ** 20, 10 ** 22, 10 ** 20)
+        self.simulator.add_pool("0x04", self.token_b, self.token_d, 10 ** 21, 10 ** 23, 10 ** 20)
+        self.evaluator = PathEvaluator(self.simulator)
+        self.paths = [
+            [self.token_a, self.token_b, self.token_d],
+            [self.token_a, self.token_b, self.token_c, self.token_d],
+            [self.token_a, self.token_b, self.token_c],
+        ]
+
+    def amounts_out(self, amount_in, path):
+        amounts = [amount_in]
+        for token_in, token_out in zip(path, path[1:]):
+            reserve_in, reserve_out = self.simulator.get_reserves(token_in, token_out)
+            amounts.append(UniswapV2Utils.get_amount_out(amounts[-1], reserve_in, reserve_out))
+        return amounts
+
+    def test_amounts_out_share_prefixes(self):
+        vectors = self.evaluator.amounts_out(10 ** 18, self.paths)
+        self.assertEqual(vectors, [self.amounts_out(10 ** 18, path) for path in self.paths])
+        # a->b once, b->d, b->c, c->d
+        self.assertEqual(self.evaluator.hops, 4)
+
+    def test_amounts_in(self):
+        vectors = self.evaluator.amounts_in([10 ** 18, 10 ** 18, 10 ** 24], [self.paths[0], self.paths[1], self.paths[0]])
+        for vector, path in zip(vectors[:2], self.paths):
+            amounts = self.amounts_out(vector[0], path)
+            self.assertGreaterEqual(amounts[-1], 10 ** 18)
+        # more than the reserve of the last pair
+        self.assertEqual(vectors[2], [None, None, 10 ** 24])
+
+    def test_best_out(self):
+        index, vector = self.evaluator.best_out(10 ** 18, self.paths[:2])
+        outputs = [self.amounts_out(10 ** 18, path)[-1] for path in self.paths[:2]]
+        self.assertEqual(index, outputs.index(max(outputs)))
+        self.assertEqual(vector[-1], max(outputs))
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from uniswap.address import Address
+from uniswap.pool_store import PoolStore
+
+
+class PoolStoreTest(unittest.TestCase):
+    weth = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+
+    def setUp(self):
+        self.store = PoolStore.from_pools_json()
+        self.path = os.path.join(tempfile.mkdtemp(), "pools.bin")
+
+    def test_from_pools_json(self):
+        self.assertEqual(len(self.store), 42)
+        self.assertEqual(self.store.pair(0), Address.of("0x39444e8Ee494c6212054CFaDF67abDBE97e70207"))
+        self.assertEqual(self.store.pair_id("0x39444e8ee494c6212054cfadf67abdbe97e70207"), 0)
+
+    def test_pairs_for_token(self):
+        pair_ids = self.store.pairs_for_token(self.weth)
+        self.assertIn(0, pair_ids)
+        weth = self.store.token_id(self.weth)
+        for pair_id in pair_ids:
+            self.assertIn(weth, (self.store.token_0[pair_id], self.store.token_1[pair_id]))
+        self.assertEqual(self.store.pair_for_tokens(self.weth, "0xb93152b59e65a6De8D3464061BcC1d68f6749F98"), 0)
+
+    def test_reserves(self):
+        self.store.set_reserves(3, 2 ** 112 - 1, 5, 100)
+        self.assertEqual(self.store.get_reserves(3), (2 ** 112 - 1, 5))
+        self.assertEqual(self.store.block[3], 100)
+
+    def test_save_and_load(self):
+        self.store.set_reserves(1, 10 ** 30, 7, 12)
+        self.store.save(self.path)
+        for memory_map in (True, False):
+            store = PoolStore.load(self.path, memory_map=memory_map)
+            self.assertEqual(len(store), 42)
+            self.assertEqual(store.get_reserves(1), (10 ** 30, 7))
+            self.assertEqual(store.pairs_for_token(self.weth), self.store.pairs_for_token(self.weth))
+            store.set_reserves(1, 1, 2, 13)
+            self.assertEqual(store.get_reserves(1), (1, 2))
+
+    def test_add_pair_after_load(self):
+        self.store.save(self.path)
+        store = PoolStore.load(self.path)
+        pair_id = store.add_pair("0x" + "12" * 20, self.weth, "0x" + "34" * 20, 1, 2, 3)
+        self.assertEqual(pair_id, 42)
+        self.assertIn(pair_id, store.pairs_for_token("0x" + "34" * 20))
+        self.assertEqual(store.get_reserves(pair_id), (1, 2))
+        self.assertEqual(PoolStore.load(self.path).get_reserves(0), (0, 0))
@@ -0,0 +1,94 @@
+import unittest
+
+import rlp
+from eth_abi import decode_abi, encode_abi
+from eth_utils import keccak
+from web3.providers.base import BaseProvider
+
+from uniswap.uniswap import UniswapV2Client, PreflightError
+
+
+class StubProvider(BaseProvider):
+    """Node where swaps revert when asking for more than 100 tokens out."""
+
+    def __init__(self):
+        self.requests = []
+        self.sent = []
+
+    def make_request(self, method, params):
+        self.requests.append((method, params))
+        result = None
+        if method == "eth_chainId":
+            result = "0x1"
+        elif method == "eth_getTransactionCount":
+            result = "0x5"
+        elif method == "eth_sendRawTransaction":
+            self.sent.append(params[0])
+            result = "0x" + keccak(hexstr=params[0]).hex()
+        elif method in ("eth_call", "eth_estimateGas"):
+            data = bytes.fromhex(params[0]["data"][2:])
+            if data[:4] == bytes.fromhex("dd62ed3e"):  # allowance(address,address)
+                result = "0x" + encode_abi(["uint256"], [2 ** 256 - 1]).hex()
+            else:  # swapExactTokensForTokens
+                amount, min_out = decode_abi(["uint256", "uint256"], data[4:68])
+                if min_out > 100:
+                    return {"jsonrpc": "2.0", "id": 1, "error": {
+                        "code": 3, "message": "execution reverted: UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT"}}
+                if method == "eth_call":
+                    result = "0x" + encode_abi(["uint256[]"], [[amount, 100]]).hex()
+                else:
+                    result = hex(100000)
+        return {"jsonrpc": "2.0", "id": 1, "result": result}
+
+    def isConnected(self):
+        return True
+
+    def is_connected(self):
+        return True
+
+
+class PreflightTest(unittest.TestCase):
+    address = "0x1563915e194D8CfBA1943570603F7606A3115508"
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+
+    def setUp(self):
+        self.provider = StubProvider()
+        self.client = UniswapV2Client(self.address, "0x" + "2" * 64, provider=self.provider)
+
+    def swap(self, min_out):
+        return self.client.swap_exact_tokens_for_tokens(1000, min_out, [self.token_0, self.token_1], self.address, 2 ** 32)
+
+    def test_simulate_all(self):
+        with self.client.collect() as transactions:
+            self.assertIsNone(self.swap(100))
+            self.swap(101)
+        self.assertEqual(self.provider.sent, [])
+        passed, reverted = self.client.simulate_all(transactions)
+        self.assertEqual(passed, ((1000, 100), 120000))
+        self.assertIsInstance(reverted, PreflightError)
+        self.assertEqual(reverted.reason, "UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT")
+
+    def test_send_all(self):
+        with self.client.collect() as transactions:
+            self.swap(101)
+            self.swap(50)
+            self.swap(100)
+        results = self.client.send_all(transactions)
+        self.assertIsInstance(results[0], PreflightError)
+        self.assertEqual(len(self.provider.sent), 2)
+        # passing transactions get consecutive nonces from the pending count
+        nonces = [int.from_bytes(rlp.decode(bytes.fromhex(raw[2:]))[0], "big") for raw in self.provider.sent]
+        self.assertEqual(nonces, [5, 6])
+
+    def test_preflight_send(self):
+        self.client.preflight = True
+        self.assertRaises(PreflightError, self.swap, 101)
+        self.assertEqual(self.provider.sent, [])
+        self.swap(100)
+        self.assertEqual(len(self.provider.sent), 1)
+
+    def test_gas_from_estimate(self):
+        self.swap(100)
+        estimates = [params for method, params in self.provider.requests if method == "eth_estimateGas"]
+        self.assertEqual(estimates[0][1], "pending")
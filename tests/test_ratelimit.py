@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from web3.providers.base import BaseProvider
+
+from uniswap.ratelimit import RateLimitedProvider, TokenBucket, LIMIT_EXCEEDED
+
+
+class StubProvider(BaseProvider):
+    """Throttles the first requests, and blocks requests until released when gated."""
+
+    def __init__(self, throttled=0):
+        self.throttled = throttled
+        self.requests = []
+        self.gate = None
+
+    def make_request(self, method, params):
+        if self.gate is not None:
+            self.gate.wait()
+        self.requests.append(method)
+        if self.throttled:
+            self.throttled -= 1
+            return {"jsonrpc": "2.0", "id": 1, "error": {"code": LIMIT_EXCEEDED, "message": "project ID request rate exceeded"}}
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+
+    def isConnected(self):
+        return True
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_wait_time(self):
+        bucket = TokenBucket(10, now=0)
+        self.assertEqual(bucket.wait_time(10, 0), 0)
+        bucket.take(10)
+        self.assertAlmostEqual(bucket.wait_time(5, 0), 0.5)
+        self.assertEqual(bucket.wait_time(5, 0.5), 0)
+        # larger than the capacity, waits for a full bucket then goes into debt
+        bucket.take(5)
+        self.assertAlmostEqual(bucket.wait_time(50, 0.5), 1)
+        self.assertEqual(bucket.wait_time(50, 1.5), 0)
+
+
+class RateLimitedProviderTest(unittest.TestCase):
+
+    def test_retries_and_backs_off(self):
+        provider = StubProvider(throttled=2)
+        limiter = RateLimitedProvider(provider, requests_per_second=None, max_concurrency=8, backoff=0)
+        self.assertEqual(limiter.make_request("eth_call", [])["result"], "0x1")
+        self.assertEqual(len(provider.requests), 3)
+        self.assertEqual(limiter.throttled, 2)
+        self.assertEqual(limiter.concurrency, 2 + 1 / 2)
+
+    def test_gives_up(self):
+        provider = StubProvider(throttled=5)
+        limiter = RateLimitedProvider(provider, requests_per_second=None, max_retries=1, backoff=0)
+        self.assertEqual(limiter.make_request("eth_call", [])["error"]["code"], LIMIT_EXCEEDED)
+        self.assertEqual(len(provider.requests), 2)
+
+    def test_request_budget(self):
+        clock = [0.0]
+        limiter = RateLimitedProvider(StubProvider(), requests_per_second=2, clock=lambda: clock[0])
+        limiter.make_request("eth_call", [])
+        limiter.make_request("eth_call", [])
+        self.assertEqual(limiter.requests.wait_time(1, clock[0]), 0.5)
+        clock[0] = 0.5
+        limiter.make_request("eth_call", [])
+
+    def test_priority(self):
+        provider = StubProvider()
+        provider.gate = threading.Event()
+        limiter = RateLimitedProvider(provider, requests_per_second=None, max_concurrency=1)
+
+        def background():
+            with limiter.background():
+                limiter.make_request("eth_call", [])
+
+        threads = [threading.Thread(target=limiter.make_request, args=("eth_blockNumber", []))]
+        threads[0].start()
+        while limiter.in_flight == 0:
+            time.sleep(0.001)
+        for target, args in ((background, ()), (limiter.make_request, ("eth_sendRawTransaction", []))):
+            threads.append(threading.Thread(target=target, args=args))
+            threads[-1].start()
+            while len(limiter._waiting) < len(threads) - 1:
+                time.sleep(0.001)
+        provider.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(provider.requests, ["eth_blockNumber", "eth_sendRawTransaction", "eth_call"])
@@ -0,0 +1,86 @@
+import unittest
+
+from eth_abi import decode_abi, encode_abi
+from web3.exceptions import BadFunctionCallOutput
+from web3.providers.base import BaseProvider
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall
+from uniswap.raw import RawReader, decode_reserves, decode_uint
+from uniswap.uniswap import UniswapV2Client, UniswapV2Utils
+
+
+class StubProvider(BaseProvider):
+    """Serves return data per (target, calldata), executing Multicall2 batches."""
+
+    def __init__(self, returns):
+        self.returns = returns
+        self.requests = []
+
+    def execute(self, target, data):
+        return self.returns.get((Address.of(target), data))
+
+    def make_request(self, method, params):
+        self.requests.append((method, params))
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+        target, data = params[0]["to"], bytes.fromhex(params[0]["data"][2:])
+        if Address.of(target) == Address.of(Multicall.ADDRESS):
+            _, calls = decode_abi(["bool", "(address,bytes)[]"], data[4:])
+            results = [(self.execute(*call) is not None, self.execute(*call) or b"") for call in calls]
+            result = encode_abi(["uint256", "bytes32", "(bool,bytes)[]"], [12, b"\x00" * 32, results])
+        else:
+            result = self.execute(target, data)
+            if result is None:
+                return {"jsonrpc": "2.0", "id": 1, "error": {"code": 3, "message": "execution reverted"}}
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x" + result.hex()}
+
+    def isConnected(self):
+        return True
+
+    def is_connected(self):
+        return True
+
+
+class RawReaderTest(unittest.TestCase):
+    address = "0x1563915e194D8CfBA1943570603F7606A3115508"
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+
+    def setUp(self):
+        self.pair = Address.of(UniswapV2Utils.pair_for(UniswapV2Client.ADDRESS, self.token_0, self.token_1))
+        allowance = bytes.fromhex("dd62ed3e") + encode_abi(["address", "address"], [self.address, UniswapV2Client.ROUTER_ADDRESS])
+        self.provider = StubProvider({
+            (self.pair, Multicall.GET_RESERVES): encode_abi(["uint112", "uint112", "uint32"], [10 ** 30, 7, 99]),
+            (self.pair, Multicall.TOKEN_0): encode_abi(["address"], [self.token_0]),
+            (Address.of(self.token_0), allowance): encode_abi(["uint256"], [2 ** 256 - 1]),
+            (Address.of(self.token_1), Multicall.GET_RESERVES): b"",
+        })
+        self.reader = RawReader(self.provider)
+
+    def test_reads(self):
+        self.assertEqual(self.reader.get_reserves(self.pair, 5), (10 ** 30, 7, 99))
+        self.assertEqual(self.provider.requests[-1][1][1], "0x5")
+        self.assertIs(self.reader.token_0(self.pair), Address.of(self.token_0))
+        self.assertEqual(self.reader.allowance(self.token_0, self.address, UniswapV2Client.ROUTER_ADDRESS), 2 ** 256 - 1)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self.reader.token_1, self.pair)
+        self.assertRaises(BadFunctionCallOutput, self.reader.get_reserves, self.token_1)
+
+    def test_batch(self):
+        self.reader.batch_size = 2
+        calls = [(self.pair, Multicall.GET_RESERVES, decode_reserves), (self.token_1, Multicall.GET_RESERVES, decode_reserves),
+                 (self.pair, Multicall.TOKEN_0, decode_uint)]
+        block, results = self.reader.batch(calls)
+        self.assertEqual(block, 12)
+        self.assertEqual(results, [(10 ** 30, 7, 99), None, int(Address.of(self.token_0))])
+        # the second chunk is pinned to the block of the first
+        self.assertEqual([params[1] for _, params in self.provider.requests], ["latest", "0xc"])
+        self.assertEqual(self.reader.get_reserves_many([self.pair]), [(10 ** 30, 7, 99)])
+
+    def test_client_reads(self):
+        client = UniswapV2Client(self.address, "0x" + "2" * 64, provider=self.provider)
+        self.assertEqual(client.get_reserves(self.token_1, self.token_0), [7, 10 ** 30, 99])
+        self.assertEqual(client.get_token_0(self.pair), self.token_0)
+        self.assertTrue(client.is_approved(self.token_0))
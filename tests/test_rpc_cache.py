@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+import unittest
+
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from uniswap.rpc_cache import CachingProvider, is_pinned, RECORD, REPLAY, PINNED
+
+
+class StubProvider(BaseProvider):
+    """Answers with the number of requests made so far."""
+
+    def __init__(self):
+        self.requests = []
+
+    def make_request(self, method, params):
+        self.requests.append(method)
+        return {"jsonrpc": "2.0", "id": len(self.requests), "result": hex(len(self.requests))}
+
+    def isConnected(self):
+        return True
+
+
+class CachingProviderTest(unittest.TestCase):
+    call = [{"to": "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a", "data": "0x0902f1ac"}]
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.stub = StubProvider()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_is_pinned(self):
+        self.assertTrue(is_pinned("eth_call", self.call + ["0x10"]))
+        self.assertFalse(is_pinned("eth_call", self.call + ["latest"]))
+        self.assertFalse(is_pinned("eth_blockNumber", []))
+        self.assertTrue(is_pinned("eth_chainId", []))
+
+    def test_record_then_replay(self):
+        recorder = CachingProvider(self.stub, self.path, RECORD)
+        recorded = [recorder.make_request("eth_blockNumber", [])["result"] for _ in range(2)]
+        recorded.append(recorder.make_request("eth_call", self.call + ["0x10"])["result"])
+        recorded.append(recorder.make_request("eth_call", self.call + ["0x10"])["result"])
+        self.assertEqual(recorded, ["0x1", "0x2", "0x3", "0x3"])
+
+        replayer = CachingProvider(StubProvider(), self.path, REPLAY, strict=True)
+        replayed = [replayer.make_request("eth_blockNumber", [])["result"] for _ in range(2)]
+        replayed.append(replayer.make_request("eth_call", self.call + ["0x10"])["result"])
+        self.assertEqual(replayed, recorded[:3])
+        self.assertEqual(replayer.provider.requests, [])
+        self.assertRaises(RuntimeError, replayer.make_request, "eth_blockNumber", [])
+
+    def test_replay_records_misses(self):
+        provider = CachingProvider(self.stub, self.path, REPLAY)
+        self.assertEqual(provider.make_request("eth_chainId", [])["result"], "0x1")
+        self.assertEqual(CachingProvider(self.stub, self.path, REPLAY).make_request("eth_chainId", [])["result"], "0x1")
+        self.assertEqual(self.stub.requests, ["eth_chainId"])
+
+    def test_pinned(self):
+        provider = CachingProvider(self.stub, self.path, PINNED)
+        for _ in range(2):
+            provider.make_request("eth_call", self.call + ["0x10"])
+            provider.make_request("eth_call", self.call + ["latest"])
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_web3(self):
+        conn = Web3(CachingProvider(self.stub, self.path, PINNED))
+        self.assertTrue(conn.isConnected())
+        self.assertEqual(conn.eth.getBalance("0x98A608D3f29EebB496815901fcFe8eCcC32bE54a", 16), 1)
+        self.assertEqual(conn.eth.getBalance("0x98A608D3f29EebB496815901fcFe8eCcC32bE54a", 16), 1)
+        self.assertEqual(len(self.stub.requests), 1)
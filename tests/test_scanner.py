@@ -0,0 +1,80 @@
+import unittest
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall
+from uniswap.profiles import UNISWAP_V2, SUSHISWAP
+from uniswap.scanner import MultiFactoryScanner
+from uniswap.uniswap import UniswapV2Utils
+
+
+class StubMulticall(object):
+    """Factories created pairs of (token_0, token_1) in order, with reserves per pair."""
+
+    def __init__(self, factories, reserves):
+        self.factories = factories
+        self.reserves = reserves
+        self.batches = []
+
+    def block_and_call(self, calls, block_identifier="latest"):
+        self.batches.append((len(calls), block_identifier))
+        results = []
+        for target, data, _ in calls:
+            target = Address.of(target).checksum.lower()
+            if target in self.factories:
+                pairs = self.factories[target]
+                if data == Multicall.ALL_PAIRS_LENGTH:
+                    results.append(len(pairs))
+                else:
+                    results.append(pairs[int.from_bytes(data[4:], "big")][0])
+                continue
+            for pairs in self.factories.values():
+                for pair, token_0, token_1 in pairs:
+                    if pair == target:
+                        results.append({
+                            Multicall.TOKEN_0: token_0,
+                            Multicall.TOKEN_1: token_1,
+                            Multicall.GET_RESERVES: self.reserves.get(pair),
+                        }[data])
+        return 9, results
+
+    def call(self, calls, block_identifier="latest"):
+        return self.block_and_call(calls, block_identifier)[1]
+
+
+class MultiFactoryScannerTest(unittest.TestCase):
+    weth = "0x" + "0" * 39 + "a"
+    usdc = "0x" + "0" * 39 + "b"
+    dai = "0x" + "0" * 39 + "c"
+
+    def setUp(self):
+        self.uniswap = [("0x" + "1" * 40, self.weth, self.usdc), ("0x" + "2" * 40, self.weth, self.dai)]
+        self.sushi = [("0x" + "3" * 40, self.weth, self.usdc)]
+        self.multicall = StubMulticall(
+            {UNISWAP_V2.factory.lower(): self.uniswap, SUSHISWAP.factory.lower(): self.sushi},
+            {"0x" + "1" * 40: (1000, 2000, 0), "0x" + "2" * 40: (10, 10, 0), "0x" + "3" * 40: (2000, 3000, 0)})
+        self.scanner = MultiFactoryScanner(self.multicall, [UNISWAP_V2, SUSHISWAP], chunk_size=1)
+
+    def test_update(self):
+        self.assertEqual(self.scanner.update(), 9)
+        store = self.scanner.store
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.factory(store.venue[store.pair_id("0x" + "3" * 40)]).checksum, SUSHISWAP.factory)
+        self.assertEqual(len(store.pairs_for_tokens(self.weth, self.usdc)), 2)
+        # reserves of every venue are read in one batch
+        self.assertEqual(self.multicall.batches[-1], (3, 9))
+
+    def test_index_incremental(self):
+        self.scanner.index()
+        self.uniswap.append(("0x" + "4" * 40, self.usdc, self.dai))
+        self.multicall.batches = []
+        self.scanner.index()
+        self.assertEqual(len(self.scanner.store), 4)
+        # only the new pair is read
+        self.assertEqual(self.multicall.batches, [(2, "latest"), (1, 9), (2, 9)])
+
+    def test_quotes(self):
+        self.scanner.update()
+        self.assertEqual(self.scanner.quotes(100, self.usdc, self.weth), [
+            (SUSHISWAP.factory, "0x" + "3" * 40, UniswapV2Utils.get_amount_out(100, 3000, 2000)),
+            (UNISWAP_V2.factory, "0x" + "1" * 40, UniswapV2Utils.get_amount_out(100, 2000, 1000)),
+        ])
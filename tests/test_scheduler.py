@@ -0,0 +1,99 @@
+import unittest
+
+from uniswap.scheduler import BlockScheduler
+
+
+class StubClient(object):
+    conn = None
+
+    @staticmethod
+    def get_factory():
+        return "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+
+
+class StubMulticall(object):
+    """Returns the pair once created, then the queued reserves of token_0/token_1."""
+
+    def __init__(self):
+        self.pair = "0x" + "0" * 40
+        self.reserves = []
+        self.block = 0
+        self.identifiers = []
+
+    def block_and_call(self, calls, block_identifier="latest"):
+        self.identifiers.append(block_identifier)
+        self.block += 1
+        results = []
+        for target, data, decode in calls:
+            results.append(self.pair if target == StubClient.get_factory() else self.reserves.pop(0))
+        return self.block, results
+
+
+class BlockSchedulerTest(unittest.TestCase):
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    pair = "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a"
+
+    def setUp(self):
+        self.multicall = StubMulticall()
+        self.scheduler = BlockScheduler(StubClient(), multicall=self.multicall)
+
+    def test_pair_created(self):
+        created = []
+        self.scheduler.on_pair_created(self.token_1, self.token_0, lambda block, pair: created.append((block, pair)))
+        self.scheduler.tick()
+        self.multicall.pair = self.pair.lower()
+        self.scheduler.tick()
+        self.assertEqual(created, [(2, self.pair)])
+        self.assertEqual(self.scheduler.watches, [])
+        self.assertIsNone(self.scheduler.tick())
+
+    def test_reserve_threshold_swapped_order(self):
+        seen = []
+        self.scheduler.on_reserve_threshold(self.token_1, self.token_0, self.token_1, 100,
+                                            lambda block, a, b: seen.append((block, a, b)))
+        self.multicall.pair = self.pair
+        self.scheduler.tick()
+        self.multicall.reserves = [(1000, 50, 0), (1000, 150, 0)]
+        self.scheduler.tick()
+        self.assertEqual(seen, [])
+        self.scheduler.tick()
+        self.assertEqual(seen, [(3, 150, 1000)])
+
+    def test_price_crossing(self):
+        seen = []
+        self.scheduler.on_price_crossing(self.token_0, self.token_1, 2, lambda block, a, b: seen.append(block))
+        self.multicall.pair = self.pair
+        self.scheduler.tick()
+        self.multicall.reserves = [(10, 10, 0), (10, 30, 0), (10, 40, 0), (10, 10, 0)]
+        for _ in range(4):
+            self.scheduler.tick()
+        self.assertEqual(seen, [3, 5])
+
+    def test_run_reads_heads_by_number(self):
+        scheduler = self.scheduler
+        heads = [[b"\x01" * 32, b"\x02" * 32]]
+
+        class Filter(object):
+            def get_new_entries(_):
+                if not heads:
+                    scheduler.stop()
+                    return []
+                return heads.pop(0)
+
+        blocks = []
+
+        def get_block(_, block_hash):
+            blocks.append(block_hash)
+            return {"number": 42}
+
+        eth = type("Eth", (), {"filter": lambda _, name: Filter(), "getBlock": get_block})()
+        StubClient.conn = type("Conn", (), {"eth": eth})
+        try:
+            scheduler.poll_interval = 0
+            scheduler.watch_pair(self.token_0, self.token_1, lambda block, a, b: None)
+            scheduler.run()
+        finally:
+            StubClient.conn = None
+        self.assertEqual(blocks, [b"\x02" * 32])
+        self.assertEqual(self.multicall.identifiers, [42])
@@ -0,0 +1,95 @@
+import unittest
+
+from uniswap.simulator import UniswapV2Simulator, SYNC, SWAP
+from uniswap.uniswap import UniswapV2Utils
+
+
+class UniswapV2SimulatorTest(unittest.TestCase):
+    token_a = "0x20fe562d797a42dcb3399062ae9546cd06f63280"
+    token_b = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    token_c = "0xAE14A3B9F6B333BfF64bEAe1C70a93c0781D6A3F"
+
+    def setUp(self):
+        self.simulator = UniswapV2Simulator()
+        self.pool_ab = self.simulator.add_pool("0x01", self.token_a, self.token_b, 10 ** 21, 2 * 10 ** 21, 10 ** 21)
+        self.pool_cb = self.simulator.add_pool("0x02", self.token_c, self.token_b, 5 * 10 ** 20, 10 ** 21, 10 ** 20)
+
+    def test_add_pool_existing(self):
+        self.assertEqual(self.simulator.add_pool("0x01", self.token_a, self.token_b), self.pool_ab)
+        self.assertEqual(len(self.simulator), 2)
+
+    def test_get_reserves_swapped_order(self):
+        self.assertEqual(self.simulator.get_reserves(self.token_b, self.token_a), (2 * 10 ** 21, 10 ** 21))
+
+    def test_replay(self):
+        events = [
+            (1, self.pool_ab, SYNC, 10 ** 21 + 100, 2 * 10 ** 21 - 199),
+            (1, self.pool_ab, SWAP, 100, 0, 0, 199),
+            None,
+            (2, self.pool_cb, SYNC, 7, 8),
+        ]
+        seen = []
+        count = self.simulator.replay(events, on_block=lambda simulator, block: seen.append(block))
+        self.assertEqual(count, 3)
+        self.assertEqual(seen, [1, 2])
+        self.assertEqual(self.simulator.get_reserves(self.token_a, self.token_b), (10 ** 21 + 100, 2 * 10 ** 21 - 199))
+        self.assertEqual(self.simulator.get_reserves(self.token_c, self.token_b), (7, 8))
+        self.assertEqual(self.simulator.block[self.pool_cb], 2)
+
+    def test_replay_logs_in_chain_order(self):
+        logs = [
+            {"address": "0x01", "event": "Sync", "blockNumber": 1, "args": {"reserve0": 1100, "reserve1": 1819}},
+            {"address": "0x01", "event": "Swap", "blockNumber": 1,
+             "args": {"amount0In": 100, "amount1In": 0, "amount0Out": 0, "amount1Out": 181}},
+            {"address": "0x01", "event": "Approval", "blockNumber": 1, "args": {}},
+        ]
+        self.simulator.reserve_0[self.pool_ab], self.simulator.reserve_1[self.pool_ab] = 1000, 2000
+        self.assertEqual(self.simulator.replay(self.simulator.event_from_log(log) for log in logs), 2)
+        self.assertEqual(self.simulator.get_reserves(self.token_a, self.token_b), (1100, 1819))
+
+    def test_replay_swaps_only(self):
+        self.simulator.replay([(1, self.pool_ab, SWAP, 100, 0, 0, 199), (2, self.pool_ab, SWAP, 0, 50, 25, 0)])
+        self.assertEqual(self.simulator.get_reserves(self.token_a, self.token_b), (10 ** 21 + 75, 2 * 10 ** 21 - 149))
+
+    def test_event_from_log(self):
+        log = {"address": "0x01", "event": "Sync", "blockNumber": 5, "args": {"reserve0": 1, "reserve1": 2}}
+        self.assertEqual(self.simulator.event_from_log(log), (5, self.pool_ab, SYNC, 1, 2))
+
+    def test_swap_exact_tokens_for_tokens(self):
+        path = [self.token_a, self.token_b, self.token_c]
+        expected_b = UniswapV2Utils.get_amount_out(10 ** 18, 10 ** 21, 2 * 10 ** 21)
+        expected_c = UniswapV2Utils.get_amount_out(expected_b, 10 ** 21, 5 * 10 ** 20)
+        amounts = self.simulator.swap_exact_tokens_for_tokens(10 ** 18, 0, path)
+        self.assertEqual(amounts, [10 ** 18, expected_b, expected_c])
+        self.assertEqual(self.simulator.get_reserves(self.token_a, self.token_b),
+                         (10 ** 21 + 10 ** 18, 2 * 10 ** 21 - expected_b))
+        self.assertEqual(self.simulator.get_reserves(self.token_b, self.token_c),
+                         (10 ** 21 + expected_b, 5 * 10 ** 20 - expected_c))
+
+    def test_swap_fee(self):
+        simulator = UniswapV2Simulator(fee_bps=25)
+        simulator.add_pool("0x01", self.token_a, self.token_b, 10 ** 21, 2 * 10 ** 21, 10 ** 21)
+        amounts = simulator.swap_exact_tokens_for_tokens(10 ** 18, 0, [self.token_a, self.token_b])
+        self.assertEqual(amounts[1], UniswapV2Utils.get_amount_out(10 ** 18, 10 ** 21, 2 * 10 ** 21, 25))
+        reserve_b, reserve_a = simulator.get_reserves(self.token_b, self.token_a)
+        amounts = simulator.swap_tokens_for_exact_tokens(10 ** 18, 10 ** 19, [self.token_b, self.token_a])
+        self.assertEqual(amounts[0], UniswapV2Utils.get_amount_in(10 ** 18, reserve_b, reserve_a, 25))
+
+    def test_swap_exact_tokens_for_tokens_min_out(self):
+        with self.assertRaises(AssertionError):
+            self.simulator.swap_exact_tokens_for_tokens(10 ** 18, 10 ** 19, [self.token_a, self.token_b])
+
+    def test_swap_tokens_for_exact_tokens(self):
+        amounts = self.simulator.swap_tokens_for_exact_tokens(10 ** 18, 10 ** 19, [self.token_b, self.token_a])
+        self.assertEqual(amounts, [UniswapV2Utils.get_amount_in(10 ** 18, 2 * 10 ** 21, 10 ** 21), 10 ** 18])
+
+    def test_add_and_remove_liquidity(self):
+        amount_a, amount_b, liquidity = self.simulator.add_liquidity(self.token_b, self.token_a, 4 * 10 ** 18, 10 ** 19)
+        self.assertEqual((amount_a, amount_b, liquidity), (4 * 10 ** 18, 2 * 10 ** 18, 2 * 10 ** 18))
+        self.assertEqual(self.simulator.remove_liquidity(self.token_b, self.token_a, liquidity), (amount_a, amount_b))
+        self.assertEqual(self.simulator.total_supply[self.pool_ab], 10 ** 21)
+
+    def test_add_liquidity_new_pool(self):
+        self.simulator.add_pool("0x03", self.token_a, self.token_c)
+        amount_a, amount_c, liquidity = self.simulator.add_liquidity(self.token_a, self.token_c, 10 ** 6, 4 * 10 ** 6)
+        self.assertEqual(liquidity, 2 * 10 ** 6 - UniswapV2Simulator.MINIMUM_LIQUIDITY)
@@ -0,0 +1,94 @@
+import unittest
+
+from uniswap.multicall import Multicall, PinnedMulticall
+from uniswap.profiles import UNISWAP_V2
+from uniswap.uniswap import UniswapV2Snapshot, UniswapV2Utils
+
+
+class StubFunction(object):
+
+    def __init__(self, contract, calls):
+        self.contract = contract
+        self.calls = calls
+
+    def call(self, block_identifier="latest"):
+        self.contract.executed.append((block_identifier, len(self.calls)))
+        return block_identifier, b"", [(True, data) for _, data in self.calls]
+
+
+class StubContract(object):
+
+    def __init__(self):
+        self.executed = []
+        self.functions = self
+
+    def tryBlockAndAggregate(self, require_success, calls):
+        return StubFunction(self, calls)
+
+
+class StubEth(object):
+
+    def __init__(self):
+        self.contract_instance = StubContract()
+
+    def contract(self, address, abi):
+        return self.contract_instance
+
+
+class StubConn(object):
+
+    def __init__(self):
+        self.eth = StubEth()
+
+
+class StubClient(object):
+    """Returns reserves of token_0/token_1 and counts the reads per block."""
+
+    profile = UNISWAP_V2
+
+    def __init__(self):
+        self.conn = StubConn()
+        self.multicall = Multicall(self.conn, batch_size=2)
+        self.reads = []
+
+    def get_reserves(self, token_a, token_b, block_identifier="latest"):
+        self.reads.append(block_identifier)
+        return [10, 20, 0] if token_a < token_b else [20, 10, 0]
+
+
+class SnapshotTest(unittest.TestCase):
+    token_0 = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+    token_1 = "0xc778417E063141139Fce010982780140Aa0cD5Ab"
+    pair = "0x98A608D3f29EebB496815901fcFe8eCcC32bE54a"
+
+    def setUp(self):
+        self.client = StubClient()
+        self.snapshot = UniswapV2Snapshot(self.client, 100)
+
+    def test_reads_are_pinned_and_cached(self):
+        self.assertEqual(self.snapshot.get_reserves(self.token_0, self.token_1), [10, 20, 0])
+        self.assertEqual(self.snapshot.get_reserves(self.token_1.lower(), self.token_0), [20, 10, 0])
+        self.assertEqual(self.snapshot.get_reserves(self.token_0, self.token_1, "latest"), [10, 20, 0])
+        self.assertEqual(self.client.reads, [100])
+
+    def test_amounts_out_use_snapshot(self):
+        self.snapshot.get_amounts_out(1000, [self.token_0, self.token_1, self.token_0])
+        self.assertEqual(self.client.reads, [100])
+
+    def test_amounts_in_use_snapshot(self):
+        amounts = self.snapshot.get_amounts_in(5, [self.token_0, self.token_1, self.token_0])
+        self.assertEqual(amounts[1:], [UniswapV2Utils.get_amount_in(5, 20, 10), 5])
+        self.assertEqual(amounts[0], UniswapV2Utils.get_amount_in(amounts[1], 10, 20))
+        self.assertEqual(self.client.reads, [100])
+
+    def test_pinned_multicall(self):
+        multicall = self.snapshot.multicall
+        identity = lambda data: data
+        block, results = multicall.block_and_call(
+            [(self.pair, b"a", identity), (self.pair.lower(), b"a", identity), (self.pair, b"b", identity)], "latest")
+        self.assertEqual((block, results), (100, [b"a", b"a", b"b"]))
+        block, results = multicall.block_and_call(
+            [(self.pair, b"b", identity), (self.pair, b"c", identity)])
+        self.assertEqual((block, results), (100, [b"b", b"c"]))
+        self.assertEqual(self.client.conn.eth.contract_instance.executed, [(100, 2), (100, 1)])
+        self.assertIsInstance(multicall, PinnedMulticall)
@@ -0,0 +1,161 @@
+import unittest
+from decimal import Decimal
+
+from uniswap.splitter import (Route, RouterCall, allocate, execute, get_amount_out, router_calls, split_order,
+                              virtual_reserves)
+from uniswap.uniswap import UniswapV2Utils
+
+
+class StubFunction(object):
+
+    def __init__(self, contract, name, args):
+        self.contract = contract
+        self.name = name
+        self.args = args
+
+    def buildTransaction(self, params):
+        return dict(params, to=self.contract, function=self.name, args=self.args)
+
+
+class StubContract(object):
+
+    def __init__(self, address):
+        self.address = address
+        self.functions = type("Functions", (), {
+            "__getattr__": lambda _, name: lambda *args: StubFunction(address, name, args)})()
+
+
+class StubNode(object):
+    """Holds the allowances of one account, mined as soon as approvals are sent."""
+
+    def __init__(self):
+        self.allowances = {}
+        self.nonce = 3
+        self.sent = []
+        self.account = type("Account", (), {
+            "sign_transaction": lambda _, tx, private_key: type("Signed", (), {"rawTransaction": tx})})()
+
+    def contract(self, address, abi):
+        return StubContract(address)
+
+    def getTransactionCount(self, address, block_identifier="latest"):
+        return self.nonce
+
+    def sendRawTransaction(self, tx):
+        assert tx["nonce"] == self.nonce, "nonce reused"
+        self.nonce += 1
+        self.sent.append(tx)
+        if tx["function"] == "approve":
+            spender, amount = tx["args"]
+            self.allowances[(tx["to"], spender)] = amount
+        else:
+            amount_in, _, path = tx["args"][:3]
+            key = (path[0], tx["router"])
+            assert self.allowances.get(key, 0) >= amount_in, "TRANSFER_FROM_FAILED"
+            self.allowances[key] -= amount_in
+        return tx["nonce"]
+
+    def waitForTransactionReceipt(self, tx, timeout):
+        return {"status": 1}
+
+
+class StubClient(object):
+    """Sends through a StubNode shared by the clients of the same account."""
+
+    address = "0x1563915e194D8CfBA1943570603F7606A3115508"
+    private_key = "0x" + "2" * 64
+
+    def __init__(self, router, node):
+        self.router = StubContract(router)
+        self.conn = type("Conn", (), {"eth": node})
+        self.multicall = self
+        self.batches = 0
+
+    def call(self, calls, block_identifier="latest"):
+        self.batches += 1
+        return [self.conn.eth.allowances.get((target, self.router.address)) for target, _, _ in calls]
+
+    def _create_transaction_params(self, value=0, gas=None, nonce="latest"):
+        assert nonce is None
+        return {"from": self.address, "value": value, "gas": gas, "nonce": nonce}
+
+    def send_all(self, transactions):
+        nonce = self.conn.eth.getTransactionCount(self.address, "pending")
+        sent = []
+        for func, params in transactions:
+            tx = dict(func.buildTransaction(dict(params, gas=1, nonce=nonce)), router=self.router.address)
+            sent.append(self.conn.eth.sendRawTransaction(tx))
+            nonce += 1
+        return sent
+
+
+class SplitterTest(unittest.TestCase):
+    token_0 = "0x" + "1" * 40
+    token_1 = "0x" + "2" * 40
+    token_2 = "0x" + "3" * 40
+    router_a = "0x" + "a" * 40
+    router_b = "0x" + "b" * 40
+
+    def setUp(self):
+        self.routes = [
+            Route([self.token_0, self.token_1], [(10 ** 21, 2 * 10 ** 24)], 30, self.router_a),
+            Route([self.token_0, self.token_1], [(5 * 10 ** 20, 10 ** 24)], 30, self.router_b),
+            Route([self.token_0, self.token_2, self.token_1], [(10 ** 21, 3 * 10 ** 24), (3 * 10 ** 24, 2 * 10 ** 24)],
+                  30, self.router_a),
+        ]
+
+    def test_virtual_reserves(self):
+        route = self.routes[2]
+        a, b = virtual_reserves(route.reserves, route.fee_bps)
+        amount = 10 ** 19
+        self.assertAlmostEqual(float(Decimal("0.997") * amount * b / (a + Decimal("0.997") * amount)) / get_amount_out(amount, route), 1, places=9)
+
+    def test_split_beats_grid_search(self):
+        amount_in = 10 ** 20
+        splits = split_order(amount_in, self.routes)
+        self.assertEqual(sum(split.amount_in for split in splits), amount_in)
+        total = sum(split.amount_out for split in splits)
+        best = 0
+        for i in range(0, 51):
+            for j in range(0, 51 - i):
+                a, b = amount_in * i // 50, amount_in * j // 50
+                outs = [get_amount_out(a, self.routes[0]), get_amount_out(b, self.routes[1]),
+                        get_amount_out(amount_in - a - b, self.routes[2])]
+                best = max(best, sum(outs))
+        self.assertGreaterEqual(total, best)
+
+    def test_small_order_uses_best_route(self):
+        self.routes[1] = self.routes[1]._replace(reserves=[(5 * 10 ** 20, 9 * 10 ** 23)])
+        splits = split_order(1000, self.routes)
+        self.assertEqual(len(splits), 1)
+        self.assertEqual(splits[0].amount_out, UniswapV2Utils.get_amount_out(1000, 10 ** 21, 2 * 10 ** 24))
+
+    def test_inactive_route(self):
+        routes = self.routes[:1] + [Route([self.token_0, self.token_1], [(10 ** 21, 10 ** 21)], 30, self.router_b)]
+        self.assertEqual(allocate(10 ** 18, routes)[1], 0)
+
+    def test_shared_pairs(self):
+        self.assertRaises(AssertionError, split_order, 100, [self.routes[0], self.routes[0]])
+
+    def test_router_calls(self):
+        splits = split_order(10 ** 20, self.routes)
+        calls = router_calls(splits, self.token_2, 1700000000, slippage_bps=100)
+        self.assertEqual(len(calls), len(splits))
+        amount_in, min_out, path, to, deadline = calls[0].args
+        self.assertEqual(calls[0].function, "swapExactTokensForTokens")
+        self.assertEqual(min_out, splits[0].amount_out * 9900 // 10000)
+        self.assertEqual(path, splits[0].route.path)
+
+    def test_execute_shared_allowance(self):
+        node = StubNode()
+        clients = [StubClient(self.router_a, node), StubClient(self.router_b, node)]
+        node.allowances[(self.token_0, self.router_b)] = 10 ** 30
+        calls = [RouterCall(router, "swapExactTokensForTokens", (amount, 0, [self.token_0, self.token_1], self.token_2, 1))
+                 for router, amount in [(self.router_a, 60), (self.router_b, 25), (self.router_a, 40)]]
+        hashes = execute(clients, calls)
+        # one approval of the total for router a, none for router b, then the swaps in call order
+        self.assertEqual([(tx["function"], tx["args"][-1]) for tx in node.sent[:1]], [("approve", 100)])
+        self.assertEqual(len(node.sent), 4)
+        self.assertEqual(hashes, [4, 6, 5])
+        self.assertEqual(node.allowances[(self.token_0, self.router_a)], 0)
+        self.assertEqual([client.batches for client in clients], [1, 1])
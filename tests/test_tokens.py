@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from eth_abi import encode_abi
+
+from uniswap.tokens import TokenStore, decode_string
+
+
+class StubMulticall(object):
+    def __init__(self, failing=(), decimals=None):
+        self.calls = 0
+        self.failing = set(failing)
+        self.decimals = decimals or {}
+
+    def call(self, calls, block_identifier="latest"):
+        self.calls += 1
+        results = []
+        for target, data, decode in calls:
+            if target in self.failing:
+                results.append(None)
+            elif data == TokenStore.DECIMALS and target in self.decimals:
+                results.append(decode(encode_abi(["uint256"], [self.decimals[target]])))
+            elif data == TokenStore.DECIMALS:
+                results.append(decode(encode_abi(["uint8"], [18])))
+            elif data == TokenStore.SYMBOL:
+                results.append(decode(b"MKR".ljust(32, b"\x00")))
+            else:
+                results.append(decode(encode_abi(["string"], ["Maker"])))
+        return results
+
+
+class TokenStoreTest(unittest.TestCase):
+    token = "0x9f8F72aA9304c8B593d555F12eF6589cC3A579A2"
+    other = "0x20fE562d797A42Dcb3399062AE9546cd06f63280"
+
+    def test_decode_string(self):
+        self.assertEqual(decode_string(encode_abi(["string"], ["Wrapped Ether"])), "Wrapped Ether")
+        self.assertEqual(decode_string(b"MKR".ljust(32, b"\x00")), "MKR")
+
+    def test_get_cached(self):
+        multicall = StubMulticall()
+        store = TokenStore(None, multicall=multicall)
+        token = store.get(self.token.lower())
+        self.assertEqual(token, {"address": self.token, "decimals": 18, "symbol": "MKR", "name": "Maker"})
+        store.get_many([self.token, self.token])
+        self.assertEqual(multicall.calls, 1)
+
+    def test_persisted(self):
+        path = os.path.join(tempfile.mkdtemp(), "tokens.db")
+        store = TokenStore(None, path=path, multicall=StubMulticall())
+        store.get(self.token)
+        store.close()
+
+        multicall = StubMulticall()
+        store = TokenStore(None, path=path, multicall=multicall)
+        self.assertEqual(store.get(self.token)["symbol"], "MKR")
+        self.assertEqual(multicall.calls, 0)
+        store.close()
+
+    def test_failures_not_cached(self):
+        path = os.path.join(tempfile.mkdtemp(), "tokens.db")
+        multicall = StubMulticall(failing=[self.token], decimals={self.other: 300})
+        store = TokenStore(None, path=path, multicall=multicall)
+        tokens = store.get_many([self.token, self.other])
+        self.assertEqual([token["decimals"] for token in tokens], [None, None])
+        self.assertEqual(tokens[1]["symbol"], "MKR")
+        store.get(self.token)
+        self.assertEqual(multicall.calls, 2)
+        store.close()
+
+        multicall = StubMulticall()
+        store = TokenStore(None, path=path, multicall=multicall)
+        self.assertEqual(store.get(self.token)["decimals"], 18)
+        self.assertEqual(multicall.calls, 1)
+        store.close()
@@ -0,0 +1,41 @@
+import unittest
+
+from uniswap.uniswap import UniswapV2Utils
+
+
+class UniswapV2UtilsOfflineTest(unittest.TestCase):
+    def test_get_amount_out_rounding(self):
+        # large reserves overflow float precision
+        amount = UniswapV2Utils.get_amount_out(10 ** 24 + 1, 10 ** 30 + 7, 10 ** 30 + 3)
+        self.assertEqual(amount, (10 ** 24 + 1) * 997 * (10 ** 30 + 3) // ((10 ** 30 + 7) * 1000 + (10 ** 24 + 1) * 997))
+
+    def test_get_amount_in_rounding(self):
+        amount = UniswapV2Utils.get_amount_in(10 ** 24 + 1, 10 ** 30 + 7, 10 ** 30 + 3)
+        self.assertEqual(amount, (10 ** 30 + 7) * (10 ** 24 + 1) * 1000 // ((10 ** 30 + 3 - 10 ** 24 - 1) * 997) + 1)
+
+    def test_get_amount_out_fee(self):
+        self.assertEqual(UniswapV2Utils.get_amount_out(1000, 10 ** 6, 10 ** 6, fee_bps=25),
+                         1000 * 9975 * 10 ** 6 // (10 ** 6 * 10000 + 1000 * 9975))
+        self.assertEqual(UniswapV2Utils.get_amount_out(1000, 10 ** 6, 10 ** 6),
+                         1000 * 997 * 10 ** 6 // (10 ** 6 * 1000 + 1000 * 997))
+
+    def test_pair_for_unknown_init_code_hash(self):
+        self.assertRaises(RuntimeError, UniswapV2Utils.pair_for, "0x" + "1" * 40, "0x" + "2" * 40, "0x" + "3" * 40, None)
+
+    def test_sqrt(self):
+        for y in [0, 1, 2, 3, 4, 15, 16, 17, 10 ** 36 - 1, 10 ** 36]:
+            z = UniswapV2Utils.sqrt(y)
+            self.assertTrue(z * z <= y < (z + 1) * (z + 1))
+
+    def test_get_position(self):
+        self.assertEqual(UniswapV2Utils.get_position(10, 100, 1000, 4000), (100, 400, 0))
+
+    def test_get_position_protocol_fee(self):
+        # reserves grew from k_last = 1000 * 1000 to 1100 * 1100 through fees
+        amount_0, amount_1, fee_liquidity = UniswapV2Utils.get_position(
+            100, 1000, 1100, 1100, k_last=1000 * 1000, fee_on=True)
+        self.assertEqual(fee_liquidity, 1000 * 100 // (1100 * 5 + 1000))
+        self.assertEqual(amount_0, 100 * 1100 // (1000 + fee_liquidity))
+
+    def test_get_position_fee_off(self):
+        self.assertEqual(UniswapV2Utils.get_position(100, 1000, 1100, 1100, k_last=10 ** 6)[2], 0)
@@ -0,0 +1,77 @@
+from eth_utils import keccak
+
+
+class Address(bytes):
+    """
+    Canonical 20-byte address. Instances are interned, so parsing the same
+    address twice returns the same object, and the EIP-55 checksum form is
+    computed at most once per address. Checksum strings are interned too, so
+    parsing them again is a lookup; other casings are parsed every time rather
+    than kept forever.
+
+    Being bytes, addresses hash cheaply and sort in numeric order, as tokens
+    are sorted by the pair contracts.
+    """
+
+    _interned = {}
+
+    @staticmethod
+    def of(value):
+        """
+        Parses an address.
+
+        :param value: Address as a hex string of any casing, 20 raw bytes or an Address.
+        :return: The interned Address.
+        """
+        if type(value) is Address:
+            return value
+        if isinstance(value, (str, bytes)):
+            address = Address._interned.get(value)
+            if address is not None:
+                return address
+
+        if isinstance(value, str):
+            digits = value[2:] if value[:2] in ("0x", "0X") else value
+            if len(digits) > 40:
+                raise ValueError("Invalid address " + value)
+            raw = bytes.fromhex(digits.zfill(40))
+        elif isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 20:
+            raw = bytes(value)
+        else:
+            raise ValueError("Invalid address {!r}".format(value))
+
+        address = Address._interned.get(raw)
+        if address is None:
+            address = bytes.__new__(Address, raw)
+            address._checksum = None
+            Address._interned[raw] = address
+        if isinstance(value, str) and value == address.checksum:
+            Address._interned[value] = address  # later lookups of the same string skip parsing
+        return address
+
+    @property
+    def checksum(self):
+        """
+        :return: EIP-55 checksum encoded form of the address.
+        """
+        if self._checksum is None:
+            digits = bytes.hex(self)
+            hashed = keccak(digits.encode("ascii")).hex()
+            self._checksum = "0x" + "".join(
+                c.upper() if int(h, 16) >= 8 else c for c, h in zip(digits, hashed))
+        return self._checksum
+
+    def __int__(self):
+        return int.from_bytes(self, "big")
+
+    def __str__(self):
+        return self.checksum
+
+    def __repr__(self):
+        return "Address('{}')".format(self.checksum)
+
+    def __reduce__(self):
+        return Address.of, (bytes(self),)
+
+
+Address.ZERO = Address.of(b"\x00" * 20)
@@ -0,0 +1,237 @@
+import sys
+import csv
+import json
+import argparse
+from itertools import islice
+
+from uniswap.address import Address
+from uniswap.export import PairExporter, PARQUET, ARROW, CSV
+from uniswap.multicall import Multicall, encode_call, decoder
+from uniswap.profiles import PROFILES, UNISWAP_V2
+from uniswap.uniswap import UniswapV2Utils, connect
+
+
+def read_rows(f, fmt):
+    """
+    :param f: Input file.
+    :param fmt: Either csv or jsonl.
+    :return: Iterator over the rows of the file as dicts.
+    """
+    if fmt == "jsonl":
+        return (json.loads(line) for line in f if line.strip())
+    return csv.DictReader(f)
+
+
+def _parse(row):
+    path = row.get("path")
+    if not path:
+        path = [row["token_in"], row["token_out"]]
+    elif isinstance(path, str):
+        path = path.split()
+    path = [Address.of(token) for token in path]
+    amount = int(row["amount"])
+    if len(path) < 2:
+        raise ValueError("path needs at least two tokens")
+    return amount, [(UniswapV2Utils.sort_tokens(token_in, token_out), token_in < token_out)
+                    for token_in, token_out in zip(path, path[1:])]
+
+
+def quote_batch(multicall, profile, rows, block_identifier="latest"):
+    """
+    Quotes a batch of swaps, reading the reserves of every pair the batch
+    touches in a single batched call.
+
+    Rows either have token_in and token_out, or a path of token addresses
+    (a list, or a space separated string), and an integer amount in.
+
+    :param multicall: Multicall used for the batched reads.
+    :param profile: FactoryProfile of the exchange. Pair addresses are computed
+        offline, or read in an extra batched call when the init code hash is unknown.
+    :param rows: Rows to quote.
+    :param block_identifier: Block to read the reserves at.
+    :return:
+        - block_number - Number of the block the reserves were read at, None if no row was valid.
+        - quotes - List of ``(amount_out, error)`` in row order, error is None for valid quotes.
+    """
+    parsed = []
+    pairs = {}
+    for row in rows:
+        try:
+            amount, hops = _parse(row)
+        except (KeyError, ValueError, AssertionError) as e:
+            parsed.append("invalid row: {}".format(e))
+            continue
+        parsed.append((amount, hops))
+        for tokens, _ in hops:
+            pairs[tokens] = None
+
+    if profile.init_code_hash is None:
+        address = decoder("address")
+        block_number, results = multicall.block_and_call(
+            [(profile.factory, encode_call("getPair(address,address)", ["address", "address"],
+                                           [token_0.checksum, token_1.checksum]), address)
+             for token_0, token_1 in pairs], block_identifier)
+        if block_number is not None:
+            block_identifier = block_number
+        pairs = {tokens: Address.of(pair) if pair else Address.ZERO for tokens, pair in zip(pairs, results)}
+    else:
+        pairs = {tokens: Address.of(UniswapV2Utils.pair_for(profile.factory, *tokens, profile.init_code_hash))
+                 for tokens in pairs}
+
+    decode = decoder("uint112", "uint112", "uint32")
+    block_number, results = multicall.block_and_call(
+        [(pair, Multicall.GET_RESERVES, decode) for pair in pairs.values()], block_identifier)
+    reserves = {tokens: reserve for tokens, reserve in zip(pairs, results)}
+
+    quotes = []
+    for row in parsed:
+        if isinstance(row, str):
+            quotes.append((None, row))
+            continue
+        amount, hops = row
+        error = None
+        for tokens, forward in hops:
+            pair = pairs[tokens]
+            reserve = reserves[tokens]
+            if reserve is None or pair is Address.ZERO:
+                error = "pair not found " + pair.checksum
+                break
+            reserve_in, reserve_out = (reserve[0], reserve[1]) if forward else (reserve[1], reserve[0])
+            if amount <= 0:
+                error = "insufficient input amount"
+                break
+            if reserve_in == 0 or reserve_out == 0:
+                error = "insufficient liquidity " + pair.checksum
+                break
+            amount = UniswapV2Utils.get_amount_out(amount, reserve_in, reserve_out, profile.fee_bps)
+        quotes.append((None, error) if error else (amount, None))
+    return block_number, quotes
+
+
+def quote_stream(multicall, profile, f_in, f_out, fmt="csv", batch_size=5000, block_identifier="latest"):
+    """
+    Quotes the swaps of an input file batch by batch, writing each batch as
+    soon as it is quoted. Every batch is read at the same block.
+
+    :param multicall: Multicall used for the batched reads.
+    :param profile: FactoryProfile of the exchange.
+    :param f_in: Input file.
+    :param f_out: Output file, the input rows with amount_out, block and error columns added.
+    :param fmt: Either csv or jsonl, for both the input and the output.
+    :param batch_size: Number of rows quoted per batched call.
+    :param block_identifier: Block to read the reserves at.
+    :return: Number of rows quoted.
+    """
+    rows = read_rows(f_in, fmt)
+    writer = None
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return count
+        block, quotes = quote_batch(multicall, profile, batch, block_identifier)
+        if block is not None:
+            block_identifier = block
+        elif isinstance(block_identifier, int):
+            block = block_identifier  # nothing was read, report the block the stream is pinned to
+        for row, (amount_out, error) in zip(batch, quotes):
+            row["amount_out"] = amount_out
+            row["block"] = block
+            row["error"] = error
+        if fmt == "jsonl":
+            f_out.writelines(json.dumps(row) + "\n" for row in batch)
+        else:
+            if writer is None:
+                writer = csv.DictWriter(f_out, fieldnames=list(batch[0]), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerows(batch)
+        f_out.flush()
+        count += len(batch)
+
+
+def _open(path, mode):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, newline="")
+
+
+def _profile(args):
+    profile = PROFILES[args.profile]
+    if args.factory:
+        profile = profile._replace(factory=args.factory, init_code_hash=None)
+    return profile
+
+
+def quote(args):
+    fmt = args.format or ("jsonl" if args.input.endswith((".jsonl", ".ndjson")) else "csv")
+    block = int(args.block) if args.block.isdigit() else args.block
+    multicall = Multicall(connect(args.provider), batch_size=args.multicall_size)
+    f_in = _open(args.input, "r")
+    f_out = _open(args.output, "w")
+    try:
+        quote_stream(multicall, _profile(args), f_in, f_out, fmt, args.batch_size, block)
+    finally:
+        if f_in is not sys.stdin:
+            f_in.close()
+        if f_out is not sys.stdout:
+            f_out.close()
+    return 0
+
+
+def export(args):
+    multicall = Multicall(connect(args.provider), batch_size=args.multicall_size)
+    exporter = PairExporter(multicall, _profile(args).factory, args.chunk_size)
+    block = int(args.block) if args.block.isdigit() else args.block
+    block_number, paths = exporter.export(args.directory, args.format, args.workers, args.part_size,
+                                          args.start, args.stop, block)
+    for path in paths:
+        print(path)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="uniswap-v2", description="Uniswap V2 command line tools.")
+    parser.add_argument("--provider", help="Provider URI, defaults to the PROVIDER environment variable.")
+    commands = parser.add_subparsers(dest="command")
+
+    quote_parser = commands.add_parser(
+        "quote", help="Quote swaps from a CSV or JSONL file.",
+        description="Quotes the swaps of a CSV or JSONL file with token_in, token_out (or path) and amount "
+                    "columns, streaming the rows with amount_out, block and error columns added.")
+    quote_parser.add_argument("input", nargs="?", default="-", help="Input file, defaults to stdin.")
+    quote_parser.add_argument("-o", "--output", default="-", help="Output file, defaults to stdout.")
+    quote_parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the input file extension.")
+    quote_parser.add_argument("--profile", choices=sorted(PROFILES), default=UNISWAP_V2.name, help="Exchange to quote on.")
+    quote_parser.add_argument("--factory", help="Address of the factory, overrides the one of the profile.")
+    quote_parser.add_argument("--block", default="latest", help="Block to quote at, defaults to the latest.")
+    quote_parser.add_argument("--batch-size", type=int, default=5000, help="Rows quoted per batch.")
+    quote_parser.add_argument("--multicall-size", type=int, default=500, help="Calls per eth_call.")
+    quote_parser.set_defaults(func=quote)
+
+    export_parser = commands.add_parser(
+        "export", help="Export the pairs of a factory to columnar files.",
+        description="Exports the tokens, reserves, kLast and cumulative prices of every pair of a factory, "
+                    "read at a single block, to part files written by parallel workers.")
+    export_parser.add_argument("directory", help="Directory of the part files.")
+    export_parser.add_argument("--format", choices=[PARQUET, ARROW, CSV],
+                               help="Defaults to parquet when pyarrow is installed, csv otherwise.")
+    export_parser.add_argument("--profile", choices=sorted(PROFILES), default=UNISWAP_V2.name, help="Exchange to export.")
+    export_parser.add_argument("--factory", help="Address of the factory, overrides the one of the profile.")
+    export_parser.add_argument("--block", default="latest", help="Block to export at, defaults to the latest.")
+    export_parser.add_argument("--start", type=int, default=0, help="Index of the first pair.")
+    export_parser.add_argument("--stop", type=int, help="Index after the last pair.")
+    export_parser.add_argument("--workers", type=int, default=4, help="Parts exported concurrently.")
+    export_parser.add_argument("--part-size", type=int, default=50000, help="Pairs per part file.")
+    export_parser.add_argument("--chunk-size", type=int, default=1000, help="Pairs read and written at once.")
+    export_parser.add_argument("--multicall-size", type=int, default=500, help="Calls per eth_call.")
+    export_parser.set_defaults(func=export)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
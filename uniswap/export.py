@@ -0,0 +1,222 @@
+import os
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, encode_call, decoder
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PARQUET = "parquet"
+ARROW = "arrow"
+CSV = "csv"
+
+# reserves and cumulative prices overflow 64-bit integers, they are written as decimal strings
+COLUMNS = [
+    ("block", "int"),
+    ("pair_index", "int"),
+    ("pair", "str"),
+    ("token_0", "str"),
+    ("token_1", "str"),
+    ("reserve_0", "str"),
+    ("reserve_1", "str"),
+    ("block_timestamp_last", "int"),
+    ("k_last", "str"),
+    ("price_0_cumulative_last", "str"),
+    ("price_1_cumulative_last", "str"),
+]
+
+K_LAST = encode_call("kLast()")
+PRICE_0_CUMULATIVE_LAST = encode_call("price0CumulativeLast()")
+PRICE_1_CUMULATIVE_LAST = encode_call("price1CumulativeLast()")
+
+
+def default_format():
+    """
+    :return: parquet if pyarrow is installed, csv otherwise.
+    """
+    return PARQUET if pyarrow is not None else CSV
+
+
+class _CsvWriter(object):
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in COLUMNS])
+
+    def write(self, columns):
+        self.writer.writerows(zip(*columns))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowWriter(object):
+
+    def __init__(self, path, fmt):
+        types = {"int": pyarrow.int64(), "str": pyarrow.string()}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS])
+        if fmt == PARQUET:
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write(self, columns):
+        batch = pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema)
+        if isinstance(self.writer, pyarrow.parquet.ParquetWriter):
+            self.writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, fmt):
+    """
+    :param path: Path of the file.
+    :param fmt: One of parquet, arrow (IPC file) or csv.
+    :return: Writer with ``write(columns)`` and ``close()`` methods.
+    """
+    if fmt == CSV:
+        return _CsvWriter(path)
+    if fmt not in (PARQUET, ARROW):
+        raise RuntimeError("Unknown export format " + fmt)
+    if pyarrow is None:
+        raise RuntimeError("Writing {} files requires pyarrow, install it or use csv".format(fmt))
+    return _ArrowWriter(path, fmt)
+
+
+class PairExporter(object):
+    """
+    Exports the pairs of a factory (tokens, reserves, kLast and cumulative
+    prices) to columnar files. Pairs are read in chunks of batched calls and
+    each chunk is written as soon as it is read, so memory use does not
+    depend on the number of pairs. Pair index ranges are exported to
+    separate part files by parallel workers.
+    """
+
+    def __init__(self, multicall, factory, chunk_size=1000):
+        """
+        :param multicall: Multicall used for the batched reads.
+        :param factory: Address of the factory.
+        :param chunk_size: Number of pairs read and written at once.
+        """
+        self.multicall = multicall
+        self.factory = Address.of(factory).checksum
+        self.chunk_size = chunk_size
+
+    def get_num_pairs(self, block_identifier="latest"):
+        """
+        :param block_identifier: Block to read at.
+        :return:
+            - block_number - Number of the block read at.
+            - num_pairs - Number of pairs created by the factory.
+        """
+        block_number, results = self.multicall.block_and_call(
+            [(self.factory, Multicall.ALL_PAIRS_LENGTH, decoder("uint256"))], block_identifier)
+        return block_number, results[0]
+
+    def read_chunk(self, start, stop, block_number):
+        """
+        Reads the pairs with index in [start, stop).
+
+        :param start: Index of the first pair.
+        :param stop: Index after the last pair.
+        :param block_number: Block to read at.
+        :return: List of columns, in COLUMNS order.
+        """
+        address = decoder("address")
+        calls = [(self.factory, encode_call("allPairs(uint256)", ["uint256"], [i]), address)
+                 for i in range(start, stop)]
+        _, pairs = self.multicall.block_and_call(calls, block_number)
+        if None in pairs:
+            raise RuntimeError("Unable to read the pairs {} to {} at block {}".format(start, stop, block_number))
+
+        reserves = decoder("uint112", "uint112", "uint32")
+        uint = decoder("uint256")
+        calls = []
+        for pair in pairs:
+            calls += [
+                (pair, Multicall.TOKEN_0, address),
+                (pair, Multicall.TOKEN_1, address),
+                (pair, Multicall.GET_RESERVES, reserves),
+                (pair, K_LAST, uint),
+                (pair, PRICE_0_CUMULATIVE_LAST, uint),
+                (pair, PRICE_1_CUMULATIVE_LAST, uint),
+            ]
+        _, results = self.multicall.block_and_call(calls, block_number)
+
+        columns = [[] for _ in COLUMNS]
+        for i, pair in enumerate(pairs):
+            token_0, token_1, reserve, k_last, price_0, price_1 = results[6 * i:6 * i + 6]
+            reserve = reserve or (None, None, None)
+            row = [block_number, start + i, Address.of(pair).checksum,
+                   Address.of(token_0).checksum if token_0 else None,
+                   Address.of(token_1).checksum if token_1 else None,
+                   _str(reserve[0]), _str(reserve[1]), reserve[2],
+                   _str(k_last), _str(price_0), _str(price_1)]
+            for column, value in zip(columns, row):
+                column.append(value)
+        return columns
+
+    def export_range(self, path, start, stop, block_number, fmt=None):
+        """
+        Exports the pairs with index in [start, stop) to a single file.
+
+        :param path: Path of the file.
+        :param start: Index of the first pair.
+        :param stop: Index after the last pair.
+        :param block_number: Block to read at.
+        :param fmt: One of parquet, arrow or csv, defaults to parquet when pyarrow is installed.
+        :return: Path of the file.
+        """
+        writer = open_writer(path, fmt or default_format())
+        try:
+            for chunk in range(start, stop, self.chunk_size):
+                writer.write(self.read_chunk(chunk, min(chunk + self.chunk_size, stop), block_number))
+        finally:
+            writer.close()
+        return path
+
+    def export(self, directory, fmt=None, workers=4, part_size=50000, start=0, stop=None, block_identifier="latest"):
+        """
+        Exports every pair, or the pairs with index in [start, stop), to part
+        files of part_size pairs written by parallel workers. Every part is
+        read at the same block.
+
+        :param directory: Directory of the part files.
+        :param fmt: One of parquet, arrow or csv, defaults to parquet when pyarrow is installed.
+        :param workers: Number of parts exported concurrently.
+        :param part_size: Number of pairs per part file.
+        :param start: Index of the first pair.
+        :param stop: Index after the last pair, defaults to the number of pairs.
+        :param block_identifier: Block to read at.
+        :return:
+            - block_number - Number of the block the pairs were read at.
+            - paths - Paths of the part files.
+        """
+        fmt = fmt or default_format()
+        block_number, num_pairs = self.get_num_pairs(block_identifier)
+        stop = num_pairs if stop is None else min(stop, num_pairs)
+        os.makedirs(directory, exist_ok=True)
+        extension = "feather" if fmt == ARROW else fmt
+        parts = [(os.path.join(directory, "pairs-{}-{:08d}.{}".format(block_number, i, extension)),
+                  i, min(i + part_size, stop))
+                 for i in range(start, stop, part_size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.export_range, path, i, j, block_number, fmt) for path, i, j in parts]
+            return block_number, [future.result() for future in futures]
+
+
+def _str(value):
+    return None if value is None else str(value)
@@ -0,0 +1,306 @@
+from collections import namedtuple
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, encode_call, decoder
+from uniswap.uniswap import UniswapV2Utils, UniswapV2Client
+
+MINIMUM_LIQUIDITY = 1000
+
+Pool = namedtuple("Pool", ["pair", "token_0", "token_1", "reserve_0", "reserve_1", "total_supply"])
+
+Deposit = namedtuple("Deposit", ["pair", "token_a", "token_b", "amount_a", "amount_b", "min_a", "min_b", "liquidity"])
+Deposit.__doc__ = """
+Planned addLiquidity call.
+
+:param pair: Address of the pair.
+:param token_a: Address of a pool token.
+:param token_b: Address of the other pool token.
+:param amount_a: Amount of token_a to deposit, in the ratio of the reserves.
+:param amount_b: Amount of token_b to deposit, in the ratio of the reserves.
+:param min_a: Minimum amount of token_a the deposit may take after price moves.
+:param min_b: Minimum amount of token_b the deposit may take after price moves.
+:param liquidity: Expected amount of liquidity tokens minted.
+"""
+
+Zap = namedtuple("Zap", ["swap_in", "min_swap_out", "deposit"])
+Zap.__doc__ = """
+Planned single-sided deposit, a swap of part of the input followed by a deposit.
+
+:param swap_in: Amount of the input token swapped for the other pool token.
+:param min_swap_out: Minimum output of the swap, which is also the amount of the
+    other token deposited, so that the deposit never exceeds the balance.
+:param deposit: Deposit of the rest of the input and the swap output, at the
+    reserves after the swap.
+"""
+
+# gas limits of the planned transactions, which cannot be estimated before the approvals are mined
+APPROVE_GAS = 60000
+SWAP_GAS = 150000
+ADD_LIQUIDITY_GAS = 250000
+CREATE_PAIR_GAS = 3500000
+
+
+def minimum(amount, slippage_bps):
+    """
+    :param amount: Expected amount.
+    :param slippage_bps: Tolerated decrease in basis points.
+    :return: Smallest acceptable amount.
+    """
+    return amount * (10000 - slippage_bps) // 10000
+
+
+def balanced_amounts(amount_a_desired, amount_b_desired, reserve_a, reserve_b):
+    """
+    Computes the amounts the router deposits given the desired ones, i.e. the
+    largest amounts in the ratio of the reserves within both desired amounts.
+
+    :param amount_a_desired: Maximum amount of token_a to deposit.
+    :param amount_b_desired: Maximum amount of token_b to deposit.
+    :param reserve_a: Reserve of token_a, 0 for a pair without liquidity.
+    :param reserve_b: Reserve of token_b, 0 for a pair without liquidity.
+    :return: ``(amount_a, amount_b)`` deposited.
+    """
+    if reserve_a == 0 and reserve_b == 0:
+        return amount_a_desired, amount_b_desired
+    amount_b_optimal = UniswapV2Utils.calculate_quote(amount_a_desired, reserve_a, reserve_b)
+    if amount_b_optimal <= amount_b_desired:
+        return amount_a_desired, amount_b_optimal
+    return UniswapV2Utils.calculate_quote(amount_b_desired, reserve_b, reserve_a), amount_b_desired
+
+
+def liquidity_minted(amount_0, amount_1, reserve_0, reserve_1, total_supply):
+    """
+    Computes the liquidity tokens minted for a deposit, ignoring the protocol
+    fee minted alongside when it is on.
+
+    :param amount_0: Amount of token_0 deposited.
+    :param amount_1: Amount of token_1 deposited.
+    :param reserve_0: Reserve of token_0 before the deposit.
+    :param reserve_1: Reserve of token_1 before the deposit.
+    :param total_supply: Total supply of liquidity tokens before the deposit.
+    :return: Amount of liquidity tokens minted.
+    """
+    if total_supply == 0:
+        return max(UniswapV2Utils.sqrt(amount_0 * amount_1) - MINIMUM_LIQUIDITY, 0)
+    return min(amount_0 * total_supply // reserve_0, amount_1 * total_supply // reserve_1)
+
+
+def zap_amount(amount_in, reserve_in, fee_bps=30):
+    """
+    Computes the part of a single token input to swap so that the rest and
+    the swap output are in the ratio of the reserves after the swap.
+
+    Solving ``(a - s) / (r + s) = out(s) / (r_out - out(s))`` for the swapped
+    amount s gives ``s = (sqrt(r*(r*(1 + g)^2 + 4*a*g)) - r*(1 + g)) / (2*g)``
+    where g is the fee multiplier, i.e. for a 0.3% fee
+    ``(sqrt(r*(r*3988009 + a*3988000)) - r*1997) / 1994``.
+
+    :param amount_in: Amount of the input token.
+    :param reserve_in: Reserve of the input token.
+    :param fee_bps: Swap fee in basis points.
+    :return: Amount of the input token to swap.
+    """
+    assert amount_in > 0 and reserve_in > 0
+    gamma = 10000 - fee_bps
+    total = 10000 + gamma
+    return (UniswapV2Utils.sqrt(reserve_in * (reserve_in * total * total + 4 * amount_in * gamma * 10000))
+            - reserve_in * total) // (2 * gamma)
+
+
+def approvals(client, amounts, block_identifier="latest"):
+    """
+    Builds the approvals of the tokens whose allowance to the router falls
+    short of the amounts to be spent, reading the allowances in a single batch.
+
+    :param client: UniswapV2Client owning the tokens.
+    :param amounts: Dict of token address to the total amount the router will spend.
+    :param block_identifier: Block to read the allowances at.
+    :return: List of ``(func, params)`` tuples, with gas limits set and no nonce.
+    """
+    allowance = encode_call("allowance(address,address)", ["address", "address"],
+                            [client.address, client.router.address])
+    tokens = list(amounts)
+    allowances = client.multicall.call([(token, allowance, decoder("uint256")) for token in tokens], block_identifier)
+    transactions = []
+    for token, allowed in zip(tokens, allowances):
+        if (allowed or 0) < amounts[token]:
+            erc20 = client.conn.eth.contract(address=Address.of(token).checksum, abi=UniswapV2Client.ERC20_ABI)
+            transactions.append((erc20.functions.approve(client.router.address, amounts[token]),
+                                 dict(client._create_transaction_params(nonce=None), gas=APPROVE_GAS)))
+    return transactions
+
+
+def send_consecutive(client, transactions):
+    """
+    Sends transactions back to back with consecutive nonces from the pending
+    transaction count, without waiting for any of them to be mined.
+
+    :param client: UniswapV2Client owning the account.
+    :param transactions: List of ``(func, params)`` tuples with gas limits set.
+    :return: Hashes of the sent transactions.
+    """
+    nonce = client.conn.eth.getTransactionCount(client.address, "pending")
+    sent = []
+    for func, params in transactions:
+        tx = func.buildTransaction(dict(params, nonce=nonce))
+        signed_tx = client.conn.eth.account.sign_transaction(tx, private_key=client.private_key)
+        sent.append(client.conn.eth.sendRawTransaction(signed_tx.rawTransaction))
+        nonce += 1
+    return sent
+
+
+class LiquidityPlanner(object):
+    """
+    Plans deposits into many pools from reserves read in a single batch, and
+    sends them with their approvals as one pipelined sequence of transactions.
+    """
+
+    def __init__(self, client, slippage_bps=50):
+        """
+        :param client: UniswapV2Client sending the transactions.
+        :param slippage_bps: Tolerated price move between planning and execution, in basis points.
+        """
+        self.client = client
+        self.slippage_bps = slippage_bps
+        self.pools = {}
+
+    # Reserves
+    # -----------------------------------------------------------
+    def _pair(self, token_0, token_1, block_identifier):
+        profile = self.client.profile
+        if profile.init_code_hash is None:
+            return self.client.get_pair(token_0, token_1, block_identifier)
+        return UniswapV2Utils.pair_for(profile.factory, token_0, token_1, profile.init_code_hash)
+
+    def load(self, token_pairs, block_identifier="latest"):
+        """
+        Reads the reserves and liquidity token supplies of pools in a single
+        batch, keeping them for the plans that follow.
+
+        :param token_pairs: List of ``(token_a, token_b)`` tuples.
+        :param block_identifier: Block to read at.
+        :return: List of Pool, in the order of token_pairs.
+        """
+        keys = [tuple(UniswapV2Utils.sort_tokens(Address.of(a), Address.of(b))) for a, b in token_pairs]
+        missing = [key for key in dict.fromkeys(keys) if key not in self.pools]
+        pairs = [self._pair(token_0, token_1, block_identifier) for token_0, token_1 in missing]
+        reserves = decoder("uint112", "uint112", "uint32")
+        uint = decoder("uint256")
+        calls = []
+        for pair in pairs:
+            calls += [(pair, Multicall.GET_RESERVES, reserves), (pair, encode_call("totalSupply()"), uint)]
+        results = self.client.multicall.call(calls, block_identifier) if calls else []
+        for i, (key, pair) in enumerate(zip(missing, pairs)):
+            reserve, supply = results[2 * i:2 * i + 2]
+            # pairs not created yet fail to answer and are planned as empty
+            reserve = reserve or (0, 0, 0)
+            self.pools[key] = Pool(pair, key[0].checksum, key[1].checksum, reserve[0], reserve[1], supply or 0)
+        return [self.pools[key] for key in keys]
+
+    def _oriented(self, token_a, token_b):
+        pool = self.load([(token_a, token_b)])[0]
+        if Address.of(token_a) == Address.of(pool.token_0):
+            return pool, pool.reserve_0, pool.reserve_1
+        return pool, pool.reserve_1, pool.reserve_0
+
+    # Plans
+    # -----------------------------------------------------------
+    def _deposit(self, pool, token_a, token_b, amount_a, amount_b, reserve_a, reserve_b, supply):
+        amount_a, amount_b = balanced_amounts(amount_a, amount_b, reserve_a, reserve_b)
+        if supply == 0:
+            # the first deposit sets the price, there is nothing to slip against
+            min_a, min_b = amount_a, amount_b
+        else:
+            min_a, min_b = minimum(amount_a, self.slippage_bps), minimum(amount_b, self.slippage_bps)
+        return Deposit(pool.pair, Address.of(token_a).checksum, Address.of(token_b).checksum,
+                       amount_a, amount_b, min_a, min_b,
+                       liquidity_minted(amount_a, amount_b, reserve_a, reserve_b, supply))
+
+    def plan_deposits(self, deposits, block_identifier="latest"):
+        """
+        Plans balanced deposits.
+
+        :param deposits: List of ``(token_a, token_b, amount_a_desired, amount_b_desired)`` tuples.
+        :param block_identifier: Block to read the pools missing from the cache at.
+        :return: List of Deposit.
+        """
+        self.load([(a, b) for a, b, _, _ in deposits], block_identifier)
+        plans = []
+        for token_a, token_b, amount_a, amount_b in deposits:
+            pool, reserve_a, reserve_b = self._oriented(token_a, token_b)
+            plans.append(self._deposit(pool, token_a, token_b, amount_a, amount_b, reserve_a, reserve_b,
+                                       pool.total_supply))
+        return plans
+
+    def plan_zaps(self, zaps, block_identifier="latest"):
+        """
+        Plans single-sided deposits, swapping the exact part of the input that
+        leaves the rest balanced with the swap output.
+
+        :param zaps: List of ``(token_in, token_out, amount_in)`` tuples.
+        :param block_identifier: Block to read the pools missing from the cache at.
+        :return: List of Zap.
+        """
+        self.load([(a, b) for a, b, _ in zaps], block_identifier)
+        fee_bps = self.client.profile.fee_bps
+        plans = []
+        for token_in, token_out, amount_in in zaps:
+            pool, reserve_in, reserve_out = self._oriented(token_in, token_out)
+            if pool.total_supply == 0:
+                raise RuntimeError("Unable to zap into a pair without liquidity " + str(pool.pair))
+            swap_in = zap_amount(amount_in, reserve_in, fee_bps)
+            swap_out = UniswapV2Utils.get_amount_out(swap_in, reserve_in, reserve_out, fee_bps)
+            min_swap_out = minimum(swap_out, self.slippage_bps)
+            deposit = self._deposit(pool, token_in, token_out, amount_in - swap_in, min_swap_out,
+                                    reserve_in + swap_in, reserve_out - swap_out, pool.total_supply)
+            plans.append(Zap(swap_in, min_swap_out, deposit))
+        return plans
+
+    # Transactions
+    # -----------------------------------------------------------
+    def transactions(self, plans, to, deadline, block_identifier="latest"):
+        """
+        Builds the transactions executing plans, preceded by the approvals of
+        the tokens whose allowance to the router falls short, read in a single batch.
+
+        :param plans: Deposits and zaps.
+        :param to: Address of the recipient for the liquidity tokens.
+        :param deadline: Unix timestamp after which the transactions will revert.
+        :param block_identifier: Block to read the allowances at.
+        :return: List of ``(func, params)`` tuples, with gas limits set, to be sent by send.
+        """
+        client = self.client
+        to = Address.of(to).checksum
+        needed = {}
+        for plan in plans:
+            deposit = plan.deposit if isinstance(plan, Zap) else plan
+            if isinstance(plan, Zap):
+                needed[deposit.token_a] = needed.get(deposit.token_a, 0) + plan.swap_in
+            needed[deposit.token_a] = needed.get(deposit.token_a, 0) + deposit.amount_a
+            needed[deposit.token_b] = needed.get(deposit.token_b, 0) + deposit.amount_b
+
+        transactions = approvals(client, needed, block_identifier)
+        functions = client.router.functions
+        for plan in plans:
+            deposit = plan.deposit if isinstance(plan, Zap) else plan
+            if isinstance(plan, Zap):
+                func = functions.swapExactTokensForTokens(
+                    plan.swap_in, plan.min_swap_out, [deposit.token_a, deposit.token_b], client.address, deadline)
+                transactions.append((func, dict(client._create_transaction_params(nonce=None), gas=SWAP_GAS)))
+            func = functions.addLiquidity(deposit.token_a, deposit.token_b, deposit.amount_a, deposit.amount_b,
+                                          deposit.min_a, deposit.min_b, to, deadline)
+            pool = self._oriented(deposit.token_a, deposit.token_b)[0]
+            gas = ADD_LIQUIDITY_GAS if pool.total_supply else CREATE_PAIR_GAS
+            transactions.append((func, dict(client._create_transaction_params(nonce=None), gas=gas)))
+        return transactions
+
+    def send(self, transactions):
+        """
+        Sends transactions back to back with consecutive nonces from the
+        pending transaction count, without waiting for the approvals to be
+        mined, so the whole sequence can land in a single block.
+
+        :param transactions: List of ``(func, params)`` tuples returned by transactions.
+        :return: Hashes of the sent transactions.
+        """
+        return send_consecutive(self.client, transactions)
@@ -0,0 +1,234 @@
+import time
+from collections import namedtuple
+
+from eth_abi import decode_abi
+from eth_abi.exceptions import DecodingError
+from eth_utils import function_abi_to_4byte_selector
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from uniswap.address import Address
+from uniswap.uniswap import UniswapV2Client, UniswapV2Utils
+
+PendingCall = namedtuple("PendingCall", ["hash", "sender", "function", "args", "value"])
+PendingCall.__doc__ = "Router call decoded from a pending transaction."
+
+Hop = namedtuple("Hop", ["token_in", "token_out", "amount_in", "amount_out", "reserve_in", "reserve_out"])
+Hop.__doc__ = """Projected effect of a call on one pair; reserves are the values after the call.
+Liquidity additions send both tokens to the pair and report a negative amount_out."""
+
+SWAP_EXACT_IN = frozenset([
+    "swapExactTokensForTokens",
+    "swapExactETHForTokens",
+    "swapExactTokensForETH",
+    "swapExactTokensForTokensSupportingFeeOnTransferTokens",
+    "swapExactETHForTokensSupportingFeeOnTransferTokens",
+    "swapExactTokensForETHSupportingFeeOnTransferTokens",
+])
+ETH_IN = frozenset([
+    "swapExactETHForTokens",
+    "swapExactETHForTokensSupportingFeeOnTransferTokens",
+    "swapETHForExactTokens",
+])
+SWAP_EXACT_OUT = frozenset([
+    "swapTokensForExactTokens",
+    "swapTokensForExactETH",
+    "swapETHForExactTokens",
+])
+
+
+def _build_selectors(abi):
+    selectors = {}
+    for entry in abi:
+        if entry["type"] != "function" or entry.get("stateMutability") in ("view", "pure"):
+            continue
+        types = [i["type"] for i in entry["inputs"]]
+        names = [i["name"] for i in entry["inputs"]]
+        selectors[function_abi_to_4byte_selector(entry)] = (entry["name"], types, names)
+    return selectors
+
+
+class MempoolWatcher(object):
+    """
+    Decodes pending transactions sent to the router and projects their effect
+    on local reserves.
+    """
+
+    SELECTORS = _build_selectors(UniswapV2Client.ROUTER_ABI)
+
+    def __init__(self, client, reserves, router=None, fee_bps=None):
+        """
+        :param client: UniswapV2Client used to subscribe to pending transactions.
+        :param reserves: Source of local reserves, any object exposing
+            ``get_reserves(token_a, token_b)`` such as a UniswapV2Simulator.
+        :param router: Address of the router to watch, defaults to the client router.
+        :param fee_bps: Swap fee of the pairs in basis points, defaults to the fee of the client profile.
+        """
+        self.client = client
+        self.reserves = reserves
+        self.router = Address.of(router or client.router.address)
+        self.fee_bps = client.profile.fee_bps if fee_bps is None else fee_bps
+        self.running = False
+        self.errors = 0
+        self._weth = None
+
+    @property
+    def weth(self):
+        if self._weth is None:
+            self._weth = self.client.get_weth_address()
+        return self._weth
+
+    @staticmethod
+    def decode(tx):
+        """
+        Decodes the calldata of a router transaction.
+
+        :param tx: Transaction as returned by ``eth.getTransaction``.
+        :return: The decoded call, or None if the calldata is not a valid call of a known router function.
+        """
+        data = tx["input"]
+        if isinstance(data, str):
+            data = Web3.toBytes(hexstr=data)
+        entry = MempoolWatcher.SELECTORS.get(bytes(data[:4]))
+        if entry is None:
+            return None
+        name, types, names = entry
+        try:
+            args = dict(zip(names, decode_abi(types, bytes(data[4:]))))
+        except DecodingError:
+            return None
+        # checksum addresses as web3's contract layer would
+        for arg, arg_type in zip(names, types):
+            if arg_type == "address":
+                args[arg] = Address.of(args[arg]).checksum
+            elif arg_type == "address[]":
+                args[arg] = [Address.of(a).checksum for a in args[arg]]
+        return PendingCall(tx["hash"], tx["from"], name, args, tx.get("value", 0))
+
+    def project(self, call):
+        """
+        Projects the effect of a decoded call on the local reserves of the pairs
+        it touches, without modifying them.
+
+        :param call: Decoded router call.
+        :return: List of hops, empty if the call would revert or cannot be projected,
+            e.g. when it trades through a pair missing from the local reserves.
+        """
+        args = call.args
+        if call.function in SWAP_EXACT_IN:
+            amount_in = call.value if call.function in ETH_IN else args["amountIn"]
+            return self._project_exact_in(amount_in, args["amountOutMin"], args["path"])
+        if call.function in SWAP_EXACT_OUT:
+            amount_in_max = call.value if call.function in ETH_IN else args["amountInMax"]
+            return self._project_exact_out(args["amountOut"], amount_in_max, args["path"])
+        if call.function == "addLiquidity":
+            return self._project_add_liquidity(
+                args["tokenA"], args["tokenB"], args["amountADesired"], args["amountBDesired"],
+                args["amountAMin"], args["amountBMin"])
+        if call.function == "addLiquidityETH":
+            return self._project_add_liquidity(
+                args["token"], self.weth, args["amountTokenDesired"], call.value,
+                args["amountTokenMin"], args["amountETHMin"])
+        return []  # removing liquidity depends on the pair total supply
+
+    def _get_reserves(self, token_a, token_b):
+        try:
+            reserve_a, reserve_b = self.reserves.get_reserves(token_a, token_b)[:2]
+        except AssertionError:
+            return None  # no local pool for the pair
+        if reserve_a <= 0 or reserve_b <= 0:
+            return None
+        return reserve_a, reserve_b
+
+    def _project_exact_in(self, amount_in, min_out, path):
+        hops = []
+        for token_in, token_out in zip(path, path[1:]):
+            reserves = self._get_reserves(token_in, token_out)
+            if reserves is None or amount_in <= 0:
+                return []
+            reserve_in, reserve_out = reserves
+            amount_out = UniswapV2Utils.get_amount_out(amount_in, reserve_in, reserve_out, self.fee_bps)
+            hops.append(Hop(token_in, token_out, amount_in, amount_out, reserve_in + amount_in, reserve_out - amount_out))
+            amount_in = amount_out
+        return hops if amount_in >= min_out else []
+
+    def _project_exact_out(self, amount_out, amount_in_max, path):
+        hops = []
+        for token_in, token_out in reversed(list(zip(path, path[1:]))):
+            reserves = self._get_reserves(token_in, token_out)
+            if reserves is None or amount_out <= 0 or amount_out >= reserves[1]:
+                return []
+            reserve_in, reserve_out = reserves
+            amount_in = UniswapV2Utils.get_amount_in(amount_out, reserve_in, reserve_out, self.fee_bps)
+            hops.append(Hop(token_in, token_out, amount_in, amount_out, reserve_in + amount_in, reserve_out - amount_out))
+            amount_out = amount_in
+        hops.reverse()
+        return hops if hops and hops[0].amount_in <= amount_in_max else []
+
+    def _project_add_liquidity(self, token_a, token_b, amount_a, amount_b, min_a, min_b):
+        if amount_a <= 0 or amount_b <= 0:
+            return []
+        try:
+            reserve_a, reserve_b = self.reserves.get_reserves(token_a, token_b)[:2]
+        except AssertionError:
+            return []  # new pairs are created by the router, not projected
+        if reserve_a != 0 or reserve_b != 0:
+            optimal_b = UniswapV2Utils.calculate_quote(amount_a, reserve_a, reserve_b)
+            if optimal_b <= amount_b:
+                if optimal_b < min_b:
+                    return []
+                amount_b = optimal_b
+            else:
+                amount_a = UniswapV2Utils.calculate_quote(amount_b, reserve_b, reserve_a)
+                if amount_a < min_a:
+                    return []
+        return [Hop(token_a, token_b, amount_a, -amount_b, reserve_a + amount_a, reserve_b + amount_b)]
+
+    def process(self, tx, callback):
+        """
+        Decodes and projects a single transaction, calling back if it is a
+        router call. Can be fed recorded transactions directly.
+
+        :param tx: Transaction as returned by ``eth.getTransaction``.
+        :param callback: Callable invoked as ``callback(call, hops)``.
+        :return: The decoded call, or None if the transaction was ignored.
+        """
+        if not tx or not tx["to"]:
+            return None
+        to = tx["to"]
+        if isinstance(to, str):
+            to = bytes.fromhex(to[2:])  # not interned, most pending transactions are not for the router
+        if to != self.router:
+            return None
+        call = MempoolWatcher.decode(tx)
+        if call is not None:
+            callback(call, self.project(call))
+        return call
+
+    def watch(self, callback, poll_interval=0.1):
+        """
+        Subscribes to pending transactions and processes those sent to the
+        router until ``stop`` is called. Transactions that fail to process,
+        including in the callback, are counted in ``errors`` and skipped.
+
+        :param callback: Callable invoked as ``callback(call, hops)``.
+        :param poll_interval: Seconds to wait between filter polls when idle.
+        """
+        pending = self.client.conn.eth.filter("pending")
+        self.running = True
+        while self.running:
+            hashes = pending.get_new_entries()
+            for tx_hash in hashes:
+                try:
+                    tx = self.client.conn.eth.getTransaction(tx_hash)
+                except TransactionNotFound:
+                    continue  # dropped or replaced before we could fetch it
+                try:
+                    self.process(tx, callback)
+                except Exception:
+                    self.errors += 1
+            if not hashes:
+                time.sleep(poll_interval)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,351 @@
+import time
+from collections import deque, namedtuple
+
+from eth_utils import keccak
+
+from uniswap.address import Address
+from uniswap.uniswap import UniswapV2Utils
+
+PAIR_CREATED = "PairCreated"
+MINT = "Mint"
+BURN = "Burn"
+SYNC = "Sync"
+
+TOPICS = {
+    "0x" + keccak(text="PairCreated(address,address,address,uint256)").hex(): PAIR_CREATED,
+    "0x" + keccak(text="Mint(address,uint256,uint256)").hex(): MINT,
+    "0x" + keccak(text="Burn(address,uint256,uint256,address)").hex(): BURN,
+    "0x" + keccak(text="Sync(uint112,uint112)").hex(): SYNC,
+}
+
+LiquidityEvent = namedtuple("LiquidityEvent", [
+    "name", "block_number", "pair", "token_0", "token_1", "amount_0", "amount_1", "reserve_0", "reserve_1", "received"])
+LiquidityEvent.__doc__ = """
+Decoded PairCreated, Mint, Burn or Sync log of a watched pair.
+
+:param name: Event name.
+:param block_number: Number of the block of the log.
+:param pair: Address of the pair.
+:param token_0: Address of the pair token with the lower sort order.
+:param token_1: Address of the pair token with the higher sort order.
+:param amount_0: Amount of token_0 deposited or withdrawn by a Mint or Burn, 0 otherwise.
+:param amount_1: Amount of token_1 deposited or withdrawn by a Mint or Burn, 0 otherwise.
+:param reserve_0: Reserve of token_0 after the last Sync seen, 0 before any.
+:param reserve_1: Reserve of token_1 after the last Sync seen, 0 before any.
+:param received: Monotonic time the log was received at.
+"""
+
+
+def _hex(value):
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+def _bytes(value):
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+
+def _uint(data, i):
+    return int.from_bytes(data[32 * i:32 * i + 32], "big")
+
+
+def presign(client, transactions, gas=None):
+    """
+    Signs transactions ahead of time with consecutive nonces from the pending
+    transaction count, so that they can be sent the moment a condition holds.
+    Gas limits have to be given, as transactions meant for pools that have no
+    liquidity yet cannot be estimated.
+
+    :param client: UniswapObject owning the account.
+    :param transactions: List of ``(func, params)`` tuples, e.g. collected with ``client.collect``.
+    :param gas: Gas limit of the transactions without one.
+    :return: Signed raw transactions.
+    """
+    nonce = client.conn.eth.getTransactionCount(client.address, "pending")
+    signed = []
+    for func, params in transactions:
+        assert params["gas"] or gas, "transactions need a gas limit"
+        tx = func.buildTransaction(dict(params, gas=params["gas"] or gas, nonce=nonce))
+        signed.append(client.conn.eth.account.sign_transaction(tx, private_key=client.private_key).rawTransaction)
+        nonce += 1
+    return signed
+
+
+class _Trigger(object):
+
+    def __init__(self, key, predicate, callback, transactions, once):
+        self.key = key
+        self.predicate = predicate
+        self.callback = callback
+        self.transactions = [_hex(tx) for tx in transactions]
+        self.once = once
+        self.active = True
+
+
+class LiquidityMonitor(object):
+    """
+    Follows the factory PairCreated logs and the Mint, Burn and Sync logs of
+    watched pairs through a single log filter, decoding them in process and
+    reacting within the poll that receives them. Triggers evaluate a predicate
+    on each event of their pair, send pre-signed transactions straight to the
+    provider and then call back.
+    """
+
+    def __init__(self, client, poll_interval=0.2, history=1000):
+        """
+        :param client: UniswapV2Client.
+        :param poll_interval: Seconds to wait before polling the filter again when it had no logs.
+        :param history: Number of trigger latencies kept for metrics.
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.factory = Address.of(client.profile.factory)
+        self.tokens = {}  # sorted token pair -> pair address, None until created
+        self.pairs = {}  # pair address -> sorted token pair
+        self.reserves = {}
+        self.triggers = {}
+        self.latencies = deque(maxlen=history)
+        self.events = 0
+        self.fired = 0
+        self.running = False
+        self.block = None
+        self._filter = None
+        self._filtered = None
+        self.clock = time.monotonic
+
+    # Registration
+    # -----------------------------------------------------------
+    def watch(self, token_a, token_b):
+        """
+        Watches the pair of token_a and token_b. Its address is derived from the
+        factory when the profile has an init code hash, read from the factory
+        otherwise, or taken from the PairCreated log once it is created.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :return: Address of the pair, None if it is not known yet.
+        """
+        key = tuple(UniswapV2Utils.sort_tokens(Address.of(token_a), Address.of(token_b)))
+        if self.tokens.get(key) is None:
+            profile = self.client.profile
+            if profile.init_code_hash is not None:
+                pair = UniswapV2Utils.pair_for(profile.factory, key[0], key[1], profile.init_code_hash)
+            else:
+                pair = self.client.get_pair(key[0].checksum, key[1].checksum)
+            self._add_pair(key, Address.of(pair) if Address.of(pair) is not Address.ZERO else None)
+        return self.tokens[key].checksum if self.tokens[key] is not None else None
+
+    def _add_pair(self, key, pair):
+        self.tokens[key] = pair
+        if pair is not None:
+            self.pairs[pair] = key
+
+    def on_event(self, token_a, token_b, predicate, callback=None, transactions=(), once=True):
+        """
+        Registers a trigger on the events of a pair, watching it.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param predicate: Callable taking a LiquidityEvent, returning whether to fire.
+        :param callback: Callable invoked as ``callback(event, hashes)`` after the transactions are sent.
+        :param transactions: Pre-signed raw transactions to send when firing, e.g. returned by presign.
+        :param once: Whether the trigger is cancelled after firing.
+        :return: Handle that can be passed to cancel.
+        """
+        self.watch(token_a, token_b)
+        key = tuple(UniswapV2Utils.sort_tokens(Address.of(token_a), Address.of(token_b)))
+        trigger = _Trigger(key, predicate, callback, transactions, once)
+        self.triggers.setdefault(key, []).append(trigger)
+        return trigger
+
+    def on_pair_created(self, token_a, token_b, callback=None, transactions=()):
+        """
+        Fires once, when the pair of token_a and token_b is created.
+
+        :return: Handle that can be passed to cancel.
+        """
+        return self.on_event(token_a, token_b, lambda event: event.name == PAIR_CREATED, callback, transactions)
+
+    def on_reserve_threshold(self, token_a, token_b, token, threshold, callback=None, transactions=()):
+        """
+        Fires once, when the reserve of token in the pair reaches threshold.
+
+        :param token: Address of the pool token whose reserve is watched.
+        :param threshold: Reserve amount to reach.
+        :return: Handle that can be passed to cancel.
+        """
+        token = Address.of(token)
+        assert token in (Address.of(token_a), Address.of(token_b))
+
+        def predicate(event):
+            if event.name != SYNC:
+                return False
+            reserve = event.reserve_0 if token == Address.of(event.token_0) else event.reserve_1
+            return reserve >= threshold
+
+        return self.on_event(token_a, token_b, predicate, callback, transactions)
+
+    def cancel(self, trigger):
+        """
+        :param trigger: Handle returned when registering the trigger.
+        """
+        trigger.active = False
+        triggers = self.triggers.get(trigger.key, [])
+        if trigger in triggers:
+            triggers.remove(trigger)
+
+    # Dispatching
+    # -----------------------------------------------------------
+    def _decode(self, log, received):
+        topics = log["topics"]
+        name = TOPICS.get(_hex(topics[0])) if topics else None
+        address = Address.of(log["address"])
+        data = _bytes(log["data"])
+        if name == PAIR_CREATED:
+            if address != self.factory:
+                return None
+            key = (Address.of(_bytes(topics[1])[12:]), Address.of(_bytes(topics[2])[12:]))
+            if key not in self.tokens:
+                return None
+            pair = Address.of(data[12:32])
+            if self.tokens[key] is None:
+                self._add_pair(key, pair)
+            return LiquidityEvent(name, log["blockNumber"], pair.checksum, key[0].checksum, key[1].checksum,
+                                  0, 0, 0, 0, received)
+
+        key = self.pairs.get(address)
+        if name is None or key is None:
+            return None
+        if name == SYNC:
+            self.reserves[address] = (_uint(data, 0), _uint(data, 1))
+            amount_0 = amount_1 = 0
+        else:
+            amount_0, amount_1 = _uint(data, 0), _uint(data, 1)
+        reserve_0, reserve_1 = self.reserves.get(address, (0, 0))
+        return LiquidityEvent(name, log["blockNumber"], address.checksum, key[0].checksum, key[1].checksum,
+                              amount_0, amount_1, reserve_0, reserve_1, received)
+
+    def _fire(self, trigger, event):
+        if trigger.once:
+            self.cancel(trigger)
+        provider = self.client.conn.provider
+        hashes = []
+        for tx in trigger.transactions:
+            response = provider.make_request("eth_sendRawTransaction", [tx])
+            hashes.append(response.get("result") if "error" not in response else ValueError(response["error"]))
+        self.latencies.append(self.clock() - event.received)
+        self.fired += 1
+        if trigger.callback is not None:
+            trigger.callback(event, hashes)
+
+    def process(self, logs, received=None):
+        """
+        Decodes logs and fires the triggers whose predicate holds.
+
+        :param logs: Logs in chain order, as returned by a log filter.
+        :param received: Monotonic time the logs were received at, defaults to now.
+        :return: List of the LiquidityEvent decoded.
+        """
+        received = self.clock() if received is None else received
+        events = []
+        for log in logs:
+            event = self._decode(log, received)
+            if event is None:
+                continue
+            events.append(event)
+            if self.block is None or event.block_number > self.block:
+                self.block = event.block_number
+            for trigger in list(self.triggers.get(self.pairs.get(Address.of(event.pair)), ())):
+                if trigger.active and trigger.predicate(event):
+                    self._fire(trigger, event)
+        self.events += len(events)
+        return events
+
+    def _update_filter(self):
+        # returns the logs the filter being replaced has not delivered, possibly with duplicates
+        addresses = [self.factory] + sorted(self.pairs)
+        if addresses == self._filtered:
+            return None
+        eth = self.client.conn.eth
+        params = {"address": [address.checksum for address in addresses], "topics": [list(TOPICS)]}
+        old, self._filter = self._filter, eth.filter(params)
+        self._filtered = addresses
+        if old is None:
+            return None
+        # the new filter is installed first so that no log falls between the two
+        logs = old.get_new_entries()
+        eth.uninstallFilter(old.filter_id)
+        # filters only deliver logs mined after they are installed, so the logs of the
+        # new pairs since the last block processed are read back, with those of the others
+        if self.block is not None:
+            start = self.block + 1
+        else:
+            start = min([log["blockNumber"] for log in logs], default=None)
+        if start is not None:
+            logs += eth.getLogs(dict(params, fromBlock=start, toBlock="latest"))
+        return logs
+
+    def poll(self):
+        """
+        Processes the logs received since the last poll. Logs of pairs found
+        through PairCreated in the same poll are read from the block of their creation.
+        When the watched pairs change, the new filter is installed before the
+        previous one is drained, and the logs of the watched pairs from the
+        block after the last one processed are backfilled, each log being processed once.
+
+        :return: List of the LiquidityEvent decoded.
+        """
+        logs = self._update_filter()
+        if logs is None:
+            logs = self._filter.get_new_entries()
+        else:
+            seen = set()
+            unique = []
+            for log in logs + self._filter.get_new_entries():
+                key = (_hex(log["blockHash"]), log["logIndex"])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(log)
+            logs = sorted(unique, key=lambda log: (log["blockNumber"], log["logIndex"]))
+        if not logs:
+            return []
+        known = set(self.pairs)
+        events = self.process(logs)
+        for event in events:
+            pair = Address.of(event.pair)
+            if event.name == PAIR_CREATED and pair not in known:
+                known.add(pair)
+                backfill = self.client.conn.eth.getLogs({
+                    "address": pair.checksum, "topics": [list(TOPICS)],
+                    "fromBlock": event.block_number, "toBlock": event.block_number})
+                events += self.process(backfill)
+        return events
+
+    def run(self):
+        """
+        Polls the log filter until stop is called.
+        """
+        self.running = True
+        while self.running:
+            if not self.poll():
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        self.running = False
+
+    def metrics(self):
+        """
+        :return: Dict with the number of events decoded and triggers fired, and the
+            mean, median, 99th percentile and maximum seconds from receiving an event
+            to sending its transactions, over the latest firings.
+        """
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"events": self.events, "fired": self.fired}
+        return {
+            "events": self.events,
+            "fired": self.fired,
+            "mean": sum(latencies) / len(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+            "max": latencies[-1],
+        }
@@ -0,0 +1,157 @@
+import os
+import json
+
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_signature_to_4byte_selector
+
+from uniswap.address import Address
+
+
+def encode_call(signature, types=(), args=()):
+    """
+    Encodes the calldata of a contract function call.
+
+    :param signature: Canonical function signature, e.g. ``balanceOf(address)``.
+    :param types: ABI types of the arguments.
+    :param args: Argument values.
+    :return: Encoded calldata.
+    """
+    return function_signature_to_4byte_selector(signature) + encode_abi(list(types), list(args))
+
+
+def decoder(*types):
+    """
+    Builds a return data decoder for the given ABI types. Single values are
+    unwrapped from the decoded tuple.
+
+    :param types: ABI types of the return values.
+    :return: Callable decoding raw return data.
+    """
+    types = list(types)
+    if len(types) == 1:
+        return lambda data: decode_abi(types, data)[0]
+    return lambda data: decode_abi(types, data)
+
+
+class Multicall(object):
+    """
+    Batches read-only calls into a single eth_call through the Multicall2
+    contract, which is deployed at the same address on the mainnet and the
+    Ropsten, Rinkeby, Gorli and Kovan testnets.
+    """
+
+    ADDRESS = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEaD696"
+    ABI = json.load(open(os.path.abspath(f"{os.path.dirname(os.path.abspath(__file__))}/assets/" + "Multicall2.json")))["abi"]
+
+    GET_RESERVES = encode_call("getReserves()")
+    TOKEN_0 = encode_call("token0()")
+    TOKEN_1 = encode_call("token1()")
+    ALL_PAIRS_LENGTH = encode_call("allPairsLength()")
+
+    def __init__(self, conn, address=None, batch_size=500):
+        """
+        :param conn: Web3 connection.
+        :param address: Address of the Multicall2 contract.
+        :param batch_size: Maximum number of calls per eth_call.
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.contract = conn.eth.contract(
+            address=Address.of(address or Multicall.ADDRESS).checksum, abi=Multicall.ABI)
+
+    def block_and_call(self, calls, block_identifier="latest"):
+        """
+        Executes read-only calls in batches, tolerating individual failures.
+
+        :param calls: List of ``(target, calldata, decode)`` tuples.
+        :param block_identifier: Block to execute the calls at.
+        :return:
+            - block_number - Number of the block the calls were executed at.
+            - results - Decoded results in call order, None for failed calls.
+        """
+        block_number = None
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            block_number, _, returned = self.contract.functions.tryBlockAndAggregate(
+                False, [(Address.of(target).checksum, data) for target, data, _ in chunk]).call(block_identifier=block_identifier)
+            if block_identifier == "latest":
+                block_identifier = block_number  # keep the remaining chunks on the same block
+            for (_, _, decode), (success, data) in zip(chunk, returned):
+                results.append(decode(data) if success and data else None)
+        return block_number, results
+
+    def call(self, calls, block_identifier="latest"):
+        """
+        Executes read-only calls in batches, tolerating individual failures.
+
+        :param calls: List of ``(target, calldata, decode)`` tuples.
+        :param block_identifier: Block to execute the calls at.
+        :return: Decoded results in call order, None for failed calls.
+        """
+        return self.block_and_call(calls, block_identifier)[1]
+
+    def get_reserves(self, pairs, block_identifier="latest"):
+        """
+        Gets the reserves of many pairs at once.
+
+        :param pairs: Addresses of the pairs.
+        :param block_identifier: Block to read the reserves at.
+        :return: List of ``(reserve_0, reserve_1, timestamp)``, None for failed reads.
+        """
+        decode = decoder("uint112", "uint112", "uint32")
+        return self.call([(pair, Multicall.GET_RESERVES, decode) for pair in pairs], block_identifier)
+
+    def get_pairs(self, factory, token_pairs, block_identifier="latest"):
+        """
+        Gets the pair addresses of many token pairs at once.
+
+        :param factory: Address of the factory.
+        :param token_pairs: List of ``(token_a, token_b)`` tuples.
+        :param block_identifier: Block to read the pairs at.
+        :return: List of pair addresses, 0x0 for pairs that have not been created.
+        """
+        decode = decoder("address")
+        factory = Address.of(factory).checksum
+        calls = [(factory, encode_call("getPair(address,address)", ["address", "address"], [a, b]), decode)
+                 for a, b in token_pairs]
+        return [Address.of(pair).checksum if pair else None for pair in self.call(calls, block_identifier)]
+
+
+class PinnedMulticall(Multicall):
+    """
+    Multicall pinned to a single block. Results are cached, so identical
+    calls are only executed once.
+    """
+
+    def __init__(self, multicall, block_number):
+        """
+        :param multicall: Multicall to execute the calls through.
+        :param block_number: Block every call is executed at.
+        """
+        self.conn = multicall.conn
+        self.batch_size = multicall.batch_size
+        self.contract = multicall.contract
+        self.block_number = block_number
+        self.results = {}
+
+    def block_and_call(self, calls, block_identifier=None):
+        """
+        Executes read-only calls at the pinned block, skipping the ones
+        already executed.
+
+        :param calls: List of ``(target, calldata, decode)`` tuples.
+        :param block_identifier: Ignored, calls always execute at the pinned block.
+        :return:
+            - block_number - The pinned block number.
+            - results - Decoded results in call order, None for failed calls.
+        """
+        keys = [(Address.of(target), data) for target, data, _ in calls]
+        missing = {}
+        for key, call in zip(keys, calls):
+            if key not in self.results and key not in missing:
+                missing[key] = call
+        if missing:
+            _, results = Multicall.block_and_call(self, list(missing.values()), self.block_number)
+            self.results.update(zip(missing, results))
+        return self.block_number, [self.results[key] for key in keys]
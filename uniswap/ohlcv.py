@@ -0,0 +1,228 @@
+import sqlite3
+from collections import namedtuple
+
+from uniswap.address import Address
+from uniswap.simulator import SYNC, SWAP
+
+Candle = namedtuple("Candle", [
+    "start", "open", "high", "low", "close", "volume_0", "volume_1", "fee_0", "fee_1", "swaps"])
+Candle.__doc__ = """
+Aggregate of the events of a pair over one period.
+
+Prices are the price of token_0 in token_1 (reserve_1 / reserve_0, in raw token
+units) after each Sync. Volumes and fees are raw token amounts, fees being the
+share of the swap input kept by the pair.
+"""
+
+# positions in the mutable bars
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME_0, _VOLUME_1, _FEE_0, _FEE_1, _SWAPS = range(10)
+
+
+def event_from_log(log):
+    """
+    Converts a decoded IUniswapV2Pair Sync or Swap log into the event tuple
+    form consumed by the aggregator, keyed by pair address.
+
+    :param log: Decoded event log.
+    :return: Event tuple, or None for events other than Sync and Swap.
+    """
+    args = log["args"]
+    pair = Address.of(log["address"]).checksum
+    if log["event"] == "Sync":
+        return log["blockNumber"], pair, SYNC, args["reserve0"], args["reserve1"]
+    if log["event"] == "Swap":
+        return (log["blockNumber"], pair, SWAP,
+                args["amount0In"], args["amount1In"], args["amount0Out"], args["amount1Out"])
+    return None
+
+
+class OHLCVAggregator(object):
+    """
+    Streaming aggregator of Sync and Swap events into OHLCV, volume and fee
+    candles per pair, at several resolutions at once.
+
+    Each event updates the open candle of every resolution in constant time.
+    Closed candles are written to an optional SQLite database in batches,
+    or kept in memory when no database is given.
+    """
+
+    RESOLUTIONS = (60, 3600, 86400)
+
+    def __init__(self, resolutions=RESOLUTIONS, path=None, fee_bps=30, flush_size=1000):
+        """
+        :param resolutions: Candle periods, in the unit of the timestamps passed to update.
+        :param path: Path of the SQLite database, candles are only kept in memory if not given.
+        :param fee_bps: Swap fee of the pairs in basis points.
+        :param flush_size: Number of closed candles buffered before they are written.
+        """
+        self.resolutions = tuple(resolutions)
+        self.fee_bps = fee_bps
+        self.flush_size = flush_size
+        self.prices = {}
+        self.bars = {}  # pool -> open bar of each resolution
+        self.closed = []  # (pool, resolution, bar) not yet written
+        self.history = {}  # (pool, resolution) -> closed bars, without a database
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            # amounts overflow sqlite integers, they are stored as decimal strings
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS candles (pool TEXT, resolution INTEGER, start INTEGER, "
+                "open REAL, high REAL, low REAL, close REAL, volume_0 TEXT, volume_1 TEXT, "
+                "fee_0 TEXT, fee_1 TEXT, swaps INTEGER, PRIMARY KEY (pool, resolution, start))")
+            self.db.commit()
+
+    # Aggregation
+    # -----------------------------------------------------------
+    def update(self, event, timestamp):
+        """
+        Applies an event to the open candles of its pair.
+
+        :param event: ``(block, pool, SYNC, reserve_0, reserve_1)`` or
+            ``(block, pool, SWAP, amount_0_in, amount_1_in, amount_0_out, amount_1_out)``,
+            as returned by event_from_log or UniswapV2Simulator.event_from_log.
+        :param timestamp: Timestamp of the block of the event.
+        """
+        pool = event[1]
+        bars = self.bars.get(pool)
+        if bars is None:
+            bars = self.bars[pool] = [None] * len(self.resolutions)
+        price = self.prices.get(pool)
+
+        if event[2] == SYNC:
+            if event[3] == 0:
+                return
+            last, price = price, event[4] / event[3]
+            self.prices[pool] = price
+            for i, resolution in enumerate(self.resolutions):
+                bar = self._bar(pool, bars, i, resolution, timestamp, last)
+                if bar[_OPEN] is None:
+                    bar[_OPEN] = bar[_HIGH] = bar[_LOW] = price
+                elif price > bar[_HIGH]:
+                    bar[_HIGH] = price
+                elif price < bar[_LOW]:
+                    bar[_LOW] = price
+                bar[_CLOSE] = price
+        else:
+            amount_0_in, amount_1_in, amount_0_out, amount_1_out = event[3:7]
+            fee_0 = amount_0_in * self.fee_bps // 10000
+            fee_1 = amount_1_in * self.fee_bps // 10000
+            for i, resolution in enumerate(self.resolutions):
+                bar = self._bar(pool, bars, i, resolution, timestamp, price)
+                bar[_VOLUME_0] += amount_0_in + amount_0_out
+                bar[_VOLUME_1] += amount_1_in + amount_1_out
+                bar[_FEE_0] += fee_0
+                bar[_FEE_1] += fee_1
+                bar[_SWAPS] += 1
+
+    def _bar(self, pool, bars, i, resolution, timestamp, price):
+        start = timestamp - timestamp % resolution
+        bar = bars[i]
+        if bar is None or bar[_START] != start:
+            if bar is not None:
+                self.closed.append((pool, resolution, bar))
+                if len(self.closed) >= self.flush_size:
+                    self.flush()
+            # a period opens at the last known price
+            bar = bars[i] = [start, price, price, price, price, 0, 0, 0, 0, 0]
+        return bar
+
+    def replay(self, events, timestamp_of):
+        """
+        Applies a stream of events.
+
+        :param events: Iterable of event tuples.
+        :param timestamp_of: Callable returning the timestamp of a block number.
+        :return: Number of events applied.
+        """
+        count = 0
+        current = timestamp = None
+        for event in events:
+            if event is None:
+                continue
+            if event[0] != current:
+                current = event[0]
+                timestamp = timestamp_of(current)
+            self.update(event, timestamp)
+            count += 1
+        return count
+
+    # Persistence
+    # -----------------------------------------------------------
+    def flush(self):
+        """
+        Writes the closed candles buffered so far.
+        """
+        closed, self.closed = self.closed, []
+        if self.db is None:
+            for pool, resolution, bar in closed:
+                self.history.setdefault((pool, resolution), []).append(Candle(*bar))
+            return
+        self.db.executemany(
+            "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(str(pool), resolution, bar[_START], bar[_OPEN], bar[_HIGH], bar[_LOW], bar[_CLOSE],
+              str(bar[_VOLUME_0]), str(bar[_VOLUME_1]), str(bar[_FEE_0]), str(bar[_FEE_1]), bar[_SWAPS])
+             for pool, resolution, bar in closed])
+        self.db.commit()
+
+    def candles(self, pool, resolution, start=0, end=None):
+        """
+        Gets the candles of a pair, including the open one.
+
+        :param pool: Pool key of the events, e.g. the pair address.
+        :param resolution: One of the resolutions of the aggregator.
+        :param start: Earliest candle start to return.
+        :param end: Candle start to stop before, defaults to no limit.
+        :return: List of Candle, oldest first.
+        """
+        assert resolution in self.resolutions
+        self.flush()
+        if self.db is None:
+            candles = list(self.history.get((pool, resolution), []))
+        else:
+            rows = self.db.execute(
+                "SELECT start, open, high, low, close, volume_0, volume_1, fee_0, fee_1, swaps FROM candles "
+                "WHERE pool = ? AND resolution = ? AND start >= ? ORDER BY start",
+                (str(pool), resolution, start))
+            candles = [Candle(row[0], row[1], row[2], row[3], row[4], int(row[5]), int(row[6]),
+                              int(row[7]), int(row[8]), row[9]) for row in rows]
+        bars = self.bars.get(pool)
+        if bars is not None:
+            candles.append(Candle(*bars[self.resolutions.index(resolution)]))
+        return [candle for candle in candles if candle.start >= start and (end is None or candle.start < end)]
+
+    def compact(self, retention, now):
+        """
+        Deletes closed candles older than the retention of their resolution,
+        e.g. to keep minute candles for a day while hourly and daily candles
+        are kept forever, and reclaims the space they used.
+
+        :param retention: Dict of resolution to the age beyond which its candles are deleted.
+        :param now: Current timestamp.
+        :return: Number of candles deleted.
+        """
+        self.flush()
+        deleted = 0
+        for resolution, age in retention.items():
+            if self.db is None:
+                for (pool, bar_resolution), candles in self.history.items():
+                    if bar_resolution == resolution:
+                        kept = [candle for candle in candles if candle.start >= now - age]
+                        deleted += len(candles) - len(kept)
+                        candles[:] = kept
+            else:
+                deleted += self.db.execute(
+                    "DELETE FROM candles WHERE resolution = ? AND start < ?", (resolution, now - age)).rowcount
+        if self.db is not None:
+            self.db.commit()
+            self.db.execute("VACUUM")
+        return deleted
+
+    def close(self):
+        """
+        Writes the buffered candles and closes the database. Open candles are not written.
+        """
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,119 @@
+from uniswap.uniswap import UniswapV2Utils
+
+
+class PathEvaluator(object):
+    """
+    Evaluates the amounts along many swap paths at once from local reserves.
+
+    Paths are walked through a prefix trie built as they are evaluated, so
+    hops shared by several paths, e.g. the first hops of candidates with the
+    same input token and amount, are computed once. Reserves are read once
+    per pair for the lifetime of the evaluator.
+
+    Tokens are compared as given, without parsing them as addresses, so paths
+    should spell each token the same way to share hops.
+    """
+
+    def __init__(self, reserves, fee_bps=30):
+        """
+        :param reserves: Source of local reserves, any object exposing
+            ``get_reserves(token_a, token_b)`` such as a UniswapV2Simulator or a snapshot.
+        :param fee_bps: Swap fee of the pairs in basis points.
+        """
+        self.reserves = reserves
+        self.fee_bps = fee_bps
+        self._reserves = {}
+        self.hops = 0
+
+    def _get_reserves(self, token_a, token_b):
+        reserves = self._reserves.get((token_a, token_b))
+        if reserves is None:
+            reserve_a, reserve_b = self.reserves.get_reserves(token_a, token_b)[:2]
+            reserves = self._reserves[(token_a, token_b)] = (reserve_a, reserve_b)
+            self._reserves[(token_b, token_a)] = (reserve_b, reserve_a)
+        return reserves
+
+    def _hop_out(self, amount_in, token_in, token_out):
+        self.hops += 1
+        reserve_in, reserve_out = self._get_reserves(token_in, token_out)
+        if amount_in is None or amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+            return None
+        return UniswapV2Utils.get_amount_out(amount_in, reserve_in, reserve_out, self.fee_bps)
+
+    def _hop_in(self, amount_out, token_in, token_out):
+        self.hops += 1
+        reserve_in, reserve_out = self._get_reserves(token_in, token_out)
+        if amount_out is None or amount_out <= 0 or reserve_in <= 0 or amount_out >= reserve_out:
+            return None
+        return UniswapV2Utils.get_amount_in(amount_out, reserve_in, reserve_out, self.fee_bps)
+
+    def amounts_out(self, amount_in, paths):
+        """
+        Given input amounts, computes the output amounts along each path, as
+        UniswapV2Client.get_amounts_out does for a single path.
+
+        :param amount_in: Amount of the input token, or a list with one amount per path.
+        :param paths: Token address arrays.
+        :return: List of amount vectors, one per path, input amount first. Amounts
+            are None from the first hop without enough liquidity.
+        """
+        amounts_in = amount_in if isinstance(amount_in, (list, tuple)) else [amount_in] * len(paths)
+        assert len(amounts_in) == len(paths)
+        roots = {}
+        vectors = []
+        for amount, path in zip(amounts_in, paths):
+            assert len(path) >= 2
+            vector = [None] * len(path)
+            vector[0] = amount
+            node = roots.setdefault((amount, path[0]), {})
+            for i in range(1, len(path)):
+                child = node.get(path[i])
+                if child is None:
+                    child = node[path[i]] = (self._hop_out(vector[i - 1], path[i - 1], path[i]), {})
+                vector[i] = child[0]
+                node = child[1]
+            vectors.append(vector)
+        return vectors
+
+    def amounts_in(self, amount_out, paths):
+        """
+        Given output amounts, computes the input amounts required along each
+        path, as UniswapV2Client.get_amounts_in does for a single path. Paths
+        ending with the same hops share them.
+
+        :param amount_out: Amount of the output token, or a list with one amount per path.
+        :param paths: Token address arrays.
+        :return: List of amount vectors, one per path, output amount last. Amounts
+            are None from the last hop without enough liquidity backwards.
+        """
+        amounts_out = amount_out if isinstance(amount_out, (list, tuple)) else [amount_out] * len(paths)
+        assert len(amounts_out) == len(paths)
+        roots = {}
+        vectors = []
+        for amount, path in zip(amounts_out, paths):
+            assert len(path) >= 2
+            last = len(path) - 1
+            vector = [None] * len(path)
+            vector[last] = amount
+            node = roots.setdefault((amount, path[last]), {})
+            for i in range(last - 1, -1, -1):
+                child = node.get(path[i])
+                if child is None:
+                    child = node[path[i]] = (self._hop_in(vector[i + 1], path[i], path[i + 1]), {})
+                vector[i] = child[0]
+                node = child[1]
+            vectors.append(vector)
+        return vectors
+
+    def best_out(self, amount_in, paths):
+        """
+        :param amount_in: Amount of the input token.
+        :param paths: Candidate token address arrays, with the same input and output tokens.
+        :return: Index of the path with the highest output and its amount vector,
+            None if no path has enough liquidity.
+        """
+        best = None
+        for i, vector in enumerate(self.amounts_out(amount_in, paths)):
+            if vector[-1] is not None and (best is None or vector[-1] > best[1][-1]):
+                best = i, vector
+        return best
@@ -0,0 +1,371 @@
+import os
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, decoder
+from uniswap.profiles import UNISWAP_V2
+
+
+class PoolStore(object):
+    """
+    Columnar store of pairs, compact enough to keep every pair of a factory
+    in memory.
+
+    Tokens are referred to by integer ids. Each pair takes its address, two
+    token ids, the id of its factory (venue), two 16-byte little-endian
+    reserve slots (reserves are uint112) and the block of its last update,
+    plus two entries in a token to pairs adjacency index kept in compressed
+    sparse row form. Pairs of several factories can share a store.
+
+    Stores are saved to a single binary file which ``load`` memory maps, so
+    opening a store does not depend on its size.
+    """
+
+    MAGIC = b"UV2POOLS"
+    VERSION = 2
+    HEADER = struct.Struct("<8sIIIII")  # magic, version, byte order, factories, tokens, pairs
+    RESERVE_SIZE = 16
+
+    def __init__(self):
+        self.factories = bytearray()
+        self.tokens = bytearray()
+        self.pairs = bytearray()
+        self.token_0 = array("I")
+        self.token_1 = array("I")
+        self.venue = array("H")
+        self.reserves = bytearray()  # reserve_0 and reserve_1 slots of each pair
+        self.block = array("Q")
+        self._offsets = array("I", [0])
+        self._indices = array("I")
+        self._token_ids = None
+        self._pair_ids = None
+        self._mmap = None
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.token_0)
+
+    @property
+    def num_tokens(self):
+        return len(self.tokens) // 20
+
+    @property
+    def num_factories(self):
+        return len(self.factories) // 20
+
+    # Lookups
+    # -----------------------------------------------------------
+    def token(self, token_id):
+        """
+        :param token_id: Id of the token.
+        :return: Address of the token.
+        """
+        return Address.of(self.tokens[20 * token_id:20 * token_id + 20])
+
+    def pair(self, pair_id):
+        """
+        :param pair_id: Id of the pair.
+        :return: Address of the pair.
+        """
+        return Address.of(self.pairs[20 * pair_id:20 * pair_id + 20])
+
+    def factory(self, venue_id):
+        """
+        :param venue_id: Id of the factory.
+        :return: Address of the factory.
+        """
+        return Address.of(self.factories[20 * venue_id:20 * venue_id + 20])
+
+    def venue_id(self, factory):
+        """
+        :param factory: Address of the factory.
+        :return: Id of the factory, or None if the factory is unknown.
+        """
+        factory = Address.of(factory)
+        for venue_id in range(self.num_factories):
+            if self.factories[20 * venue_id:20 * venue_id + 20] == factory:
+                return venue_id
+        return None
+
+    def _index(self, blob):
+        return {bytes(blob[i:i + 20]): i // 20 for i in range(0, len(blob), 20)}
+
+    def token_id(self, token):
+        """
+        :param token: Address of the token.
+        :return: Id of the token, or None if the token is unknown.
+        """
+        if self._token_ids is None:
+            self._token_ids = self._index(self.tokens)
+        return self._token_ids.get(Address.of(token))
+
+    def pair_id(self, pair):
+        """
+        :param pair: Address of the pair.
+        :return: Id of the pair, or None if the pair is unknown.
+        """
+        if self._pair_ids is None:
+            self._pair_ids = self._index(self.pairs)
+        return self._pair_ids.get(Address.of(pair))
+
+    def get_reserves(self, pair_id):
+        """
+        :param pair_id: Id of the pair.
+        :return: Reserves of token_0 and token_1 of the pair.
+        """
+        offset = 2 * PoolStore.RESERVE_SIZE * pair_id
+        middle = offset + PoolStore.RESERVE_SIZE
+        return (int.from_bytes(self.reserves[offset:middle], "little"),
+                int.from_bytes(self.reserves[middle:middle + PoolStore.RESERVE_SIZE], "little"))
+
+    def pairs_for_token(self, token):
+        """
+        :param token: Address of the token.
+        :return: Ids of the pairs trading the token.
+        """
+        token_id = self.token_id(token)
+        if token_id is None:
+            return []
+        if self._dirty:
+            self._build_adjacency()
+        return list(self._indices[self._offsets[token_id]:self._offsets[token_id + 1]])
+
+    def pair_for_tokens(self, token_a, token_b):
+        """
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :return: Id of the first pair trading token_a against token_b, or None.
+        """
+        pair_ids = self.pairs_for_tokens(token_a, token_b)
+        return pair_ids[0] if pair_ids else None
+
+    def pairs_for_tokens(self, token_a, token_b):
+        """
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :return: Ids of the pairs trading token_a against token_b, one per factory.
+        """
+        token_b = self.token_id(token_b)
+        return [pair_id for pair_id in self.pairs_for_token(token_a)
+                if self.token_0[pair_id] == token_b or self.token_1[pair_id] == token_b]
+
+    # Updates
+    # -----------------------------------------------------------
+    def _materialize(self):
+        # copies memory mapped columns into growable buffers
+        if self._mmap is None:
+            return
+        self.factories = bytearray(self.factories)
+        self.tokens = bytearray(self.tokens)
+        self.pairs = bytearray(self.pairs)
+        self.token_0 = array("I", self.token_0)
+        self.token_1 = array("I", self.token_1)
+        self.venue = array("H", self.venue)
+        self.reserves = bytearray(self.reserves)
+        self.block = array("Q", self.block)
+        self._offsets = array("I", self._offsets)
+        self._indices = array("I", self._indices)
+        self._mmap = None
+
+    def add_token(self, token):
+        """
+        Registers a token, or returns the id of an already registered one.
+
+        :param token: Address of the token.
+        :return: Id of the token.
+        """
+        token = Address.of(token)
+        token_id = self.token_id(token)
+        if token_id is None:
+            self._materialize()
+            token_id = self.num_tokens
+            self.tokens += token
+            self._token_ids[token] = token_id
+            self._dirty = True
+        return token_id
+
+    def add_factory(self, factory):
+        """
+        Registers a factory, or returns the id of an already registered one.
+
+        :param factory: Address of the factory.
+        :return: Id of the factory.
+        """
+        factory = Address.of(factory)
+        venue_id = self.venue_id(factory)
+        if venue_id is None:
+            self._materialize()
+            venue_id = self.num_factories
+            self.factories += factory
+        return venue_id
+
+    def add_pair(self, pair, token_0, token_1, reserve_0=0, reserve_1=0, block=0, factory=None):
+        """
+        Registers a pair, or returns the id of an already registered one.
+
+        :param pair: Address of the pair.
+        :param token_0: Address of the pair token with the lower sort order.
+        :param token_1: Address of the pair token with the higher sort order.
+        :param reserve_0: Reserve of token_0.
+        :param reserve_1: Reserve of token_1.
+        :param block: Block the reserves were read at.
+        :param factory: Address of the factory of the pair, 0x0 if not given.
+        :return: Id of the pair.
+        """
+        pair = Address.of(pair)
+        pair_id = self.pair_id(pair)
+        if pair_id is not None:
+            return pair_id
+        self._materialize()
+        pair_id = len(self)
+        self.pairs += pair
+        self.token_0.append(self.add_token(token_0))
+        self.token_1.append(self.add_token(token_1))
+        self.venue.append(self.add_factory(factory if factory is not None else Address.ZERO))
+        self.reserves += bytes(2 * PoolStore.RESERVE_SIZE)
+        self.block.append(0)
+        self._pair_ids[pair] = pair_id
+        self._dirty = True
+        self.set_reserves(pair_id, reserve_0, reserve_1, block)
+        return pair_id
+
+    def set_reserves(self, pair_id, reserve_0, reserve_1, block):
+        """
+        :param pair_id: Id of the pair.
+        :param reserve_0: Reserve of token_0.
+        :param reserve_1: Reserve of token_1.
+        :param block: Block the reserves were read at.
+        """
+        offset = 2 * PoolStore.RESERVE_SIZE * pair_id
+        middle = offset + PoolStore.RESERVE_SIZE
+        self.reserves[offset:middle] = reserve_0.to_bytes(PoolStore.RESERVE_SIZE, "little")
+        self.reserves[middle:middle + PoolStore.RESERVE_SIZE] = reserve_1.to_bytes(PoolStore.RESERVE_SIZE, "little")
+        self.block[pair_id] = block
+
+    def refresh(self, multicall, pair_ids=None, block_identifier="latest"):
+        """
+        Reads the reserves of the given pairs, or of every pair, in batched calls.
+
+        :param multicall: Multicall used for the batched reads.
+        :param pair_ids: Ids of the pairs to refresh.
+        :param block_identifier: Block to read the reserves at.
+        :return: Number of the block the reserves were read at.
+        """
+        if pair_ids is None:
+            pair_ids = range(len(self))
+        pair_ids = list(pair_ids)
+        decode = decoder("uint112", "uint112", "uint32")
+        calls = [(self.pair(i), Multicall.GET_RESERVES, decode) for i in pair_ids]
+        block_number, results = multicall.block_and_call(calls, block_identifier)
+        for pair_id, reserves in zip(pair_ids, results):
+            if reserves is not None:
+                self.set_reserves(pair_id, reserves[0], reserves[1], block_number)
+        return block_number
+
+    def _build_adjacency(self):
+        num_tokens = self.num_tokens
+        offsets = array("I", bytes(4 * (num_tokens + 1)))
+        for column in (self.token_0, self.token_1):
+            for token_id in column:
+                offsets[token_id + 1] += 1
+        for i in range(num_tokens):
+            offsets[i + 1] += offsets[i]
+        indices = array("I", bytes(4 * 2 * len(self)))
+        cursor = array("I", offsets)
+        for column in (self.token_0, self.token_1):
+            for pair_id, token_id in enumerate(column):
+                indices[cursor[token_id]] = pair_id
+                cursor[token_id] += 1
+        self._offsets = offsets
+        self._indices = indices
+        self._dirty = False
+
+    # Persistence
+    # -----------------------------------------------------------
+    def save(self, path):
+        """
+        Writes the store to a binary file.
+
+        :param path: Path of the file.
+        """
+        if self._dirty:
+            self._build_adjacency()
+        byte_order = 0 if sys.byteorder == "little" else 1
+        sections = [self.factories, self.tokens, self.pairs, self.token_0, self.token_1, self.venue,
+                    self.reserves, self.block, self._offsets, self._indices]
+        with open(path, "wb") as f:
+            f.write(PoolStore.HEADER.pack(
+                PoolStore.MAGIC, PoolStore.VERSION, byte_order, self.num_factories, self.num_tokens, len(self)))
+            f.write(bytes(-PoolStore.HEADER.size % 8))
+            for section in sections:
+                data = bytes(section)
+                f.write(data)
+                f.write(bytes(-len(data) % 8))
+
+    @staticmethod
+    def load(path, memory_map=True):
+        """
+        Opens a store written by save.
+
+        :param path: Path of the file.
+        :param memory_map: Whether to map the file into memory instead of reading it.
+            Updates to a mapped store are private to the process.
+        :return: The store.
+        """
+        with open(path, "rb") as f:
+            if memory_map:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            else:
+                buffer = bytearray(f.read())
+        magic, version, byte_order, num_factories, num_tokens, num_pairs = PoolStore.HEADER.unpack_from(buffer)
+        if magic != PoolStore.MAGIC or version != PoolStore.VERSION:
+            raise RuntimeError("Not a pool store file " + path)
+        if byte_order != (0 if sys.byteorder == "little" else 1):
+            raise RuntimeError("Pool store file written on a machine with a different byte order " + path)
+
+        view = memoryview(buffer)
+        position = PoolStore.HEADER.size + (-PoolStore.HEADER.size % 8)
+
+        def section(size, fmt=None):
+            nonlocal position
+            data = view[position:position + size]
+            position += size + (-size % 8)
+            return data.cast(fmt) if fmt else data
+
+        store = PoolStore()
+        store.factories = section(20 * num_factories)
+        store.tokens = section(20 * num_tokens)
+        store.pairs = section(20 * num_pairs)
+        store.token_0 = section(4 * num_pairs, "I")
+        store.token_1 = section(4 * num_pairs, "I")
+        store.venue = section(2 * num_pairs, "H")
+        store.reserves = section(2 * PoolStore.RESERVE_SIZE * num_pairs)
+        store.block = section(8 * num_pairs, "Q")
+        store._offsets = section(4 * (num_tokens + 1), "I")
+        store._indices = section(4 * 2 * num_pairs, "I")
+        store._mmap = buffer
+        return store
+
+    @staticmethod
+    def from_pools_json(path=None, factory=UNISWAP_V2.factory):
+        """
+        Builds a store from a pools.json style file.
+
+        :param path: Path of the file, defaults to the bundled pools.json.
+        :param factory: Address of the factory of the pools.
+        :return: The store.
+        """
+        if path is None:
+            path = os.path.abspath(f"{os.path.dirname(os.path.abspath(__file__))}/assets/" + "pools.json")
+        with open(path) as f:
+            pools = json.load(f)
+        store = PoolStore()
+        for index in sorted(pools, key=int):
+            pool = pools[index]
+            store.add_pair(pool["pair"], pool["token_0"], pool["token_1"], factory=factory)
+        return store
+
@@ -0,0 +1,36 @@
+from collections import namedtuple
+
+FactoryProfile = namedtuple("FactoryProfile", ["name", "factory", "router", "init_code_hash", "fee_bps", "weth"])
+FactoryProfile.__doc__ = """
+Deployment of a Uniswap V2 compatible exchange.
+
+:param name: Name of the exchange.
+:param factory: Address of the factory.
+:param router: Address of the router.
+:param init_code_hash: Keccak hash of the pair init code as bytes, used to compute pair
+    addresses offline. When None, pair addresses are read from the factory.
+:param fee_bps: Swap fee in basis points.
+:param weth: Address of the wrapped ether token the router uses. When None, it is read
+    from the router, e.g. for deployments sharing an address across networks.
+"""
+
+# same factory and router address on the mainnet and the testnets
+UNISWAP_V2 = FactoryProfile(
+    name="uniswap-v2",
+    factory="0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f",
+    router="0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D",
+    init_code_hash=bytes.fromhex("96e8ac4277198ff8b6f785478aa9a39f403cb768dd02cbee326c3e7da348845f"),
+    fee_bps=30,
+    weth=None,
+)
+
+SUSHISWAP = FactoryProfile(
+    name="sushiswap",
+    factory="0xC0AEe478e3658e2610c5F7A4A2E1777cE9e4f2Ac",
+    router="0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F",
+    init_code_hash=None,
+    fee_bps=30,
+    weth="0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+)
+
+PROFILES = {profile.name: profile for profile in (UNISWAP_V2, SUSHISWAP)}
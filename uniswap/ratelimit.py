@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from web3.providers.base import BaseProvider
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# requests that should never wait behind reads, e.g. a send and the receipt polls following it
+PRIORITIES = {
+    "eth_sendRawTransaction": HIGH,
+    "eth_sendTransaction": HIGH,
+    "eth_getTransactionReceipt": HIGH,
+    "eth_getTransactionCount": HIGH,
+}
+
+# compute units charged per method, as published by providers metering them
+COMPUTE_UNITS = {
+    "eth_blockNumber": 10,
+    "eth_chainId": 0,
+    "net_version": 0,
+    "eth_call": 26,
+    "eth_estimateGas": 87,
+    "eth_getBalance": 19,
+    "eth_getCode": 26,
+    "eth_getTransactionCount": 26,
+    "eth_getStorageAt": 17,
+    "eth_getBlockByNumber": 16,
+    "eth_getBlockByHash": 21,
+    "eth_getTransactionReceipt": 15,
+    "eth_getLogs": 75,
+    "eth_getFilterChanges": 20,
+    "eth_newFilter": 20,
+    "eth_sendRawTransaction": 250,
+}
+DEFAULT_COMPUTE_UNITS = 20
+
+# JSON-RPC error code of requests rejected for exceeding the rate limit
+LIMIT_EXCEEDED = -32005
+
+
+class TokenBucket(object):
+    """
+    Budget refilling continuously at a fixed rate up to a burst capacity.
+    Not thread safe, callers hold their own lock.
+    """
+
+    def __init__(self, rate, capacity=None, now=0.0):
+        """
+        :param rate: Units added per second.
+        :param capacity: Maximum units held, defaults to one second worth.
+        :param now: Current time in seconds.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """
+        :param amount: Units needed.
+        :param now: Current time in seconds.
+        :return: Seconds until the units are available, 0 if they are now.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # requests larger than the capacity go through once the bucket is full
+        needed = min(amount, self.capacity) - self.tokens
+        return needed / self.rate if needed > 0 else 0
+
+    def take(self, amount):
+        """
+        Consumes units, possibly going into debt for requests larger than the capacity.
+
+        :param amount: Units consumed.
+        """
+        self.tokens -= amount
+
+
+class RateLimitedProvider(BaseProvider):
+    """
+    Provider wrapper keeping the request traffic within the budgets of the
+    provider and backing off when it throttles.
+
+    Requests are admitted in priority order when a concurrency slot is free and
+    both the request and compute unit buckets allow them. Sends and receipts
+    go first, then ordinary requests, then those made inside background().
+
+    The concurrency limit adapts additively-increasing, multiplicatively-decreasing:
+    every successful request grows it by one slot per limit's worth of requests,
+    while a throttled request (HTTP 429 or a ``-32005`` error) or one slower
+    than the latency target halves it. Throttled requests are retried after
+    the backoff the provider asks for, or an exponential one.
+    """
+
+    def __init__(self, provider, requests_per_second=10, compute_units_per_second=None, max_concurrency=16,
+                 min_concurrency=1, latency_target=None, max_retries=5, backoff=0.5, clock=time.monotonic):
+        """
+        :param provider: Provider to forward requests to.
+        :param requests_per_second: Request budget, None for no limit.
+        :param compute_units_per_second: Compute unit budget, None for no limit.
+        :param max_concurrency: Maximum requests in flight.
+        :param min_concurrency: Minimum requests in flight the limit decreases to.
+        :param latency_target: Seconds beyond which a response is taken as a congestion signal.
+        :param max_retries: Retries of a throttled request before its error is returned.
+        :param backoff: Seconds to wait before the first retry, doubled on each retry.
+        :param clock: Monotonic time source in seconds.
+        """
+        assert 1 <= min_concurrency <= max_concurrency
+        self.provider = provider
+        self.middlewares = provider.middlewares
+        self.clock = clock
+        now = clock()
+        self.requests = TokenBucket(requests_per_second, now=now) if requests_per_second else None
+        self.compute_units = TokenBucket(compute_units_per_second, now=now) if compute_units_per_second else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.in_flight = 0
+        self.throttled = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def __str__(self):
+        return "rate limited {}".format(self.provider)
+
+    @contextmanager
+    def background(self):
+        """
+        Lowers the priority of the requests made by the current thread in the
+        block, e.g. around pair scans.
+        """
+        previous = getattr(self._local, "priority", None)
+        self._local.priority = LOW
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    # Scheduling
+    # -----------------------------------------------------------
+    def _acquire(self, priority, compute_units):
+        with self._condition:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            while True:
+                timeout = None
+                if self._waiting[0] == entry and self.in_flight < int(self.concurrency):
+                    now = self.clock()
+                    timeout = max(self.requests.wait_time(1, now) if self.requests else 0,
+                                  self.compute_units.wait_time(compute_units, now) if self.compute_units else 0)
+                    if not timeout:
+                        break
+                self._condition.wait(timeout)
+            heapq.heappop(self._waiting)
+            if self.requests:
+                self.requests.take(1)
+            if self.compute_units:
+                self.compute_units.take(compute_units)
+            self.in_flight += 1
+            self._condition.notify_all()
+
+    def _release(self, congested):
+        with self._condition:
+            self.in_flight -= 1
+            if congested:
+                self.concurrency = max(float(self.min_concurrency), self.concurrency / 2)
+            else:
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+
+    # Provider
+    # -----------------------------------------------------------
+    def make_request(self, method, params):
+        priority = PRIORITIES.get(method, NORMAL)
+        if priority == NORMAL and getattr(self._local, "priority", None) is not None:
+            priority = self._local.priority
+        compute_units = COMPUTE_UNITS.get(method, DEFAULT_COMPUTE_UNITS)
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire(priority, compute_units)
+            start = self.clock()
+            response = error = None
+            try:
+                response = self.provider.make_request(method, params)
+            except Exception as e:
+                error = e
+            delay = _throttled(response, error)
+            slow = self.latency_target is not None and self.clock() - start > self.latency_target
+            self._release(delay is not None or slow)
+
+            if delay is None or attempt == self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+            with self._condition:
+                self.throttled += 1
+            time.sleep(delay if delay > 0 else self.backoff * 2 ** attempt)
+
+    def isConnected(self):
+        return self.provider.isConnected()
+
+    def is_connected(self):
+        return self.isConnected()
+
+
+def _throttled(response, error):
+    """
+    :return: None if the request was not throttled, otherwise the seconds to
+        wait before retrying as asked by the provider, 0 if it did not say.
+    """
+    if error is not None:
+        http_response = getattr(error, "response", None)
+        if getattr(http_response, "status_code", None) != 429:
+            return None
+        try:
+            return float(http_response.headers.get("Retry-After", 0))
+        except (TypeError, ValueError):
+            return 0
+    rpc_error = response.get("error") if isinstance(response, dict) else None
+    if not isinstance(rpc_error, dict) or rpc_error.get("code") not in (LIMIT_EXCEEDED, 429):
+        return None
+    data = rpc_error.get("data")
+    rate = data.get("rate") if isinstance(data, dict) else None
+    if isinstance(rate, dict) and rate.get("backoff_seconds"):
+        return float(rate["backoff_seconds"])
+    return 0
@@ -0,0 +1,209 @@
+from eth_utils import function_signature_to_4byte_selector
+from web3.exceptions import BadFunctionCallOutput
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall
+
+GET_RESERVES = "0x" + function_signature_to_4byte_selector("getReserves()").hex()
+TOKEN_0 = "0x" + function_signature_to_4byte_selector("token0()").hex()
+TOKEN_1 = "0x" + function_signature_to_4byte_selector("token1()").hex()
+BALANCE_OF = "0x" + function_signature_to_4byte_selector("balanceOf(address)").hex()
+ALLOWANCE = "0x" + function_signature_to_4byte_selector("allowance(address,address)").hex()
+TRY_BLOCK_AND_AGGREGATE = function_signature_to_4byte_selector("tryBlockAndAggregate(bool,(address,bytes)[])")
+
+_PADDING = "0" * 24
+
+
+def _word(address):
+    return _PADDING + bytes.hex(Address.of(address))
+
+
+def _block(block_identifier):
+    return hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+
+# Decoders of fixed-size return data, reading words at fixed offsets
+# -----------------------------------------------------------
+def decode_uint(data):
+    """
+    :param data: Return data of a function returning a single uint.
+    :return: The value.
+    """
+    return int.from_bytes(data[:32], "big")
+
+
+def decode_address(data):
+    """
+    :param data: Return data of a function returning a single address.
+    :return: The Address.
+    """
+    return Address.of(data[12:32])
+
+
+def decode_reserves(data):
+    """
+    :param data: Return data of getReserves.
+    :return: ``(reserve_0, reserve_1, timestamp)``.
+    """
+    return int.from_bytes(data[:32], "big"), int.from_bytes(data[32:64], "big"), int.from_bytes(data[64:96], "big")
+
+
+def encode_aggregate(calls):
+    """
+    Encodes the calldata of tryBlockAndAggregate(false, calls) without going
+    through the generic ABI encoder.
+
+    :param calls: List of ``(target, calldata)`` tuples.
+    :return: Encoded calldata.
+    """
+    head = []
+    body = []
+    offset = 32 * len(calls)
+    for target, data in calls:
+        padded = data + b"\x00" * (-len(data) % 32)
+        head.append(offset.to_bytes(32, "big"))
+        body += [bytes(12), Address.of(target), (64).to_bytes(32, "big"), len(data).to_bytes(32, "big"), padded]
+        offset += 96 + len(padded)
+    return b"".join([TRY_BLOCK_AND_AGGREGATE, bytes(32), (64).to_bytes(32, "big"),
+                     len(calls).to_bytes(32, "big")] + head + body)
+
+
+def decode_aggregate(data, decoders):
+    """
+    Decodes the return data of tryBlockAndAggregate by offsets.
+
+    :param data: Return data.
+    :param decoders: Decoder of each call, taking a memoryview of its return data.
+    :return:
+        - block_number - Number of the block the calls were executed at.
+        - results - Decoded results in call order, None for failed calls.
+    """
+    view = memoryview(data)
+    block_number = int.from_bytes(view[:32], "big")
+    array = int.from_bytes(view[64:96], "big") + 32
+    results = []
+    for i, decode in enumerate(decoders):
+        start = array + int.from_bytes(view[array + 32 * i:array + 32 * i + 32], "big")
+        success = view[start + 31]
+        start += int.from_bytes(view[start + 32:start + 64], "big")
+        length = int.from_bytes(view[start:start + 32], "big")
+        results.append(decode(view[start + 32:start + 32 + length]) if success and length else None)
+    return block_number, results
+
+
+class RawReader(object):
+    """
+    Read path for the hot calls returning fixed-size words, sending pre-encoded
+    eth_call requests straight to the provider and decoding the results by
+    offset, bypassing the web3 contract and middleware layers.
+
+    Provider wrappers such as CachingProvider or RateLimitedProvider still
+    see every request.
+    """
+
+    def __init__(self, provider, multicall_address=Multicall.ADDRESS, batch_size=500):
+        """
+        :param provider: Web3 provider, e.g. ``conn.provider``.
+        :param multicall_address: Address of the Multicall2 contract used by batch.
+        :param batch_size: Maximum number of calls per eth_call in batch.
+        """
+        self.provider = provider
+        self.multicall_address = Address.of(multicall_address).checksum
+        self.batch_size = batch_size
+
+    def call(self, to, data, block_identifier="latest", size=32):
+        """
+        Executes a read-only call.
+
+        :param to: Address of the contract.
+        :param data: Calldata as a 0x-prefixed hex string.
+        :param block_identifier: Block to execute the call at.
+        :param size: Minimum size of the expected return data.
+        :return: Return data as bytes.
+        :raise ValueError: If the node returns an error, as web3 does.
+        :raise BadFunctionCallOutput: If the return data is shorter than expected,
+            e.g. when calling an address without code.
+        """
+        response = self.provider.make_request(
+            "eth_call", [{"to": Address.of(to).checksum, "data": data}, _block(block_identifier)])
+        if "error" in response:
+            raise ValueError(response["error"])
+        result = bytes.fromhex(response["result"][2:])
+        if len(result) < size:
+            raise BadFunctionCallOutput("Could not decode the return data of {} to {}".format(data[:10], to))
+        return result
+
+    def get_reserves(self, pair, block_identifier="latest"):
+        """
+        :param pair: Address of the pair.
+        :param block_identifier: Block to query.
+        :return: ``(reserve_0, reserve_1, timestamp)``.
+        """
+        return decode_reserves(self.call(pair, GET_RESERVES, block_identifier, 96))
+
+    def token_0(self, pair, block_identifier="latest"):
+        """
+        :param pair: Address of the pair.
+        :param block_identifier: Block to query.
+        :return: Address of the pair token with the lower sort order.
+        """
+        return decode_address(self.call(pair, TOKEN_0, block_identifier))
+
+    def token_1(self, pair, block_identifier="latest"):
+        """
+        :param pair: Address of the pair.
+        :param block_identifier: Block to query.
+        :return: Address of the pair token with the higher sort order.
+        """
+        return decode_address(self.call(pair, TOKEN_1, block_identifier))
+
+    def balance_of(self, token, owner, block_identifier="latest"):
+        """
+        :param token: Address of the token.
+        :param owner: Address of the holder.
+        :param block_identifier: Block to query.
+        :return: Balance of owner.
+        """
+        return decode_uint(self.call(token, BALANCE_OF + _word(owner), block_identifier))
+
+    def allowance(self, token, owner, spender, block_identifier="latest"):
+        """
+        :param token: Address of the token.
+        :param owner: Address of the holder.
+        :param spender: Address of the spender.
+        :param block_identifier: Block to query.
+        :return: Amount spender is allowed to transfer from owner.
+        """
+        return decode_uint(self.call(token, ALLOWANCE + _word(owner) + _word(spender), block_identifier))
+
+    def batch(self, calls, block_identifier="latest"):
+        """
+        Executes read-only calls in batches through the Multicall2 contract,
+        tolerating individual failures.
+
+        :param calls: List of ``(target, calldata, decode)`` tuples, with calldata
+            as bytes and decode taking a memoryview of the return data.
+        :param block_identifier: Block to execute the calls at.
+        :return:
+            - block_number - Number of the block the calls were executed at.
+            - results - Decoded results in call order, None for failed calls.
+        """
+        block_number = None
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            data = "0x" + encode_aggregate([(target, calldata) for target, calldata, _ in chunk]).hex()
+            returned = self.call(self.multicall_address, data, block_identifier, 128)
+            block_number, decoded = decode_aggregate(returned, [decode for _, _, decode in chunk])
+            if block_identifier == "latest":
+                block_identifier = block_number  # keep the remaining chunks on the same block
+            results += decoded
+        return block_number, results
+
+    def get_reserves_many(self, pairs, block_identifier="latest"):
+        """
+        :param pairs: Addresses of the pairs.
+        :param block_identifier: Block to query.
+        :return: List of ``(reserve_0, reserve_1, timestamp)``, None for failed reads.
+        """
+        return self.batch([(pair, Multicall.GET_RESERVES, decode_reserves) for pair in pairs], block_identifier)[1]
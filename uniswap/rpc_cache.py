@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import threading
+
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.base import BaseProvider
+
+RECORD = "record"
+REPLAY = "replay"
+PINNED = "pinned"
+
+# position of the block parameter of the methods reading state at a block
+BLOCK_PARAMS = {
+    "eth_call": 1,
+    "eth_estimateGas": 1,
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getTransactionCount": 1,
+    "eth_getStorageAt": 2,
+    "eth_getBlockByNumber": 0,
+    "eth_getBlockTransactionCountByNumber": 0,
+}
+
+# methods whose result never changes
+IMMUTABLE = {"eth_chainId", "net_version", "eth_getBlockByHash", "eth_getBlockTransactionCountByHash"}
+
+
+def is_pinned(method, params):
+    """
+    :param method: JSON-RPC method.
+    :param params: JSON-RPC params.
+    :return: Whether the result of the request is immutable, i.e. the request
+        reads state at an explicit block number or by hash.
+    """
+    if method in IMMUTABLE:
+        return True
+    position = BLOCK_PARAMS.get(method)
+    if position is None or len(params) <= position:
+        return False
+    block = params[position]
+    if isinstance(block, int):
+        return True
+    return isinstance(block, str) and block.startswith("0x") and len(block) < 66
+
+
+class CachingProvider(BaseProvider):
+    """
+    Provider wrapper keeping JSON-RPC responses in a content-addressed
+    store on disk, one file per request keyed by method and params.
+
+    Requests pinned to an explicit block number are immutable and stored
+    once. Other requests are stored per occurrence, so replaying a run
+    returns the same sequence of responses, e.g. a receipt that is missing
+    on the first polls and present afterwards.
+
+    Modes:
+
+    - ``record`` - forwards every request and stores the responses, pinned
+      requests already stored are served from the store.
+    - ``replay`` - serves stored responses, forwarding and storing misses, or
+      raising on misses when strict.
+    - ``pinned`` - only stores and serves pinned requests, everything else
+      goes to the provider. Meant for production, where historical reads
+      can be cached forever. The block numbers read at should be final.
+    """
+
+    def __init__(self, provider, path, mode=REPLAY, strict=False):
+        """
+        :param provider: Provider to forward requests to.
+        :param path: Directory of the store.
+        :param mode: One of record, replay or pinned.
+        :param strict: Whether to raise on requests missing in replay mode.
+        """
+        assert mode in (RECORD, REPLAY, PINNED)
+        self.provider = provider
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self.middlewares = provider.middlewares
+        self._occurrences = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def __str__(self):
+        return "{} cache at {} of {}".format(self.mode, self.path, self.provider)
+
+    # Store
+    # -----------------------------------------------------------
+    def _key(self, method, params, pinned):
+        request = json.dumps([method, params], sort_keys=True, separators=(",", ":"), cls=Web3JsonEncoder)
+        if not pinned:
+            with self._lock:
+                occurrence = self._occurrences.get(request, 0)
+                self._occurrences[request] = occurrence + 1
+            request += "#" + str(occurrence)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key[2:] + ".json")
+
+    def _read(self, key):
+        try:
+            with open(self._file(key)) as f:
+                return json.load(f)["response"]
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key, method, params, response):
+        file = self._file(key)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp = "{}.{}.tmp".format(file, threading.get_ident())
+        with open(tmp, "w") as f:
+            json.dump({"method": method, "params": params, "response": response}, f, cls=Web3JsonEncoder)
+        os.replace(tmp, file)
+
+    # Provider
+    # -----------------------------------------------------------
+    def make_request(self, method, params):
+        params = list(params or [])
+        pinned = is_pinned(method, params)
+        if self.mode == PINNED and not pinned:
+            return self.provider.make_request(method, params)
+
+        key = self._key(method, params, pinned)
+        if self.mode == REPLAY or pinned:
+            response = self._read(key)
+            if response is not None:
+                return response
+            if self.mode == REPLAY and self.strict:
+                raise RuntimeError("Request missing in the RPC cache {} {}".format(method, params))
+
+        response = self.provider.make_request(method, params)
+        if "error" not in response and (response.get("result") is not None or not pinned):
+            self._write(key, method, params, {"jsonrpc": "2.0", "id": response.get("id"),
+                                              "result": response.get("result")})
+        return response
+
+    def isConnected(self):
+        if self.mode == REPLAY and self.strict:
+            return True
+        return self.provider.isConnected()
+
+    def is_connected(self):
+        return self.isConnected()
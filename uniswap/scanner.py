@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, encode_call, decoder
+from uniswap.pool_store import PoolStore
+from uniswap.uniswap import UniswapV2Utils
+
+
+class MultiFactoryScanner(object):
+    """
+    Indexes the pairs of several Uniswap V2 compatible factories into a
+    single PoolStore, where each pair is tagged with its factory (venue).
+    New pairs of every factory are read concurrently, and the reserves of
+    every venue are refreshed in one batched read per block, so routes can
+    be quoted across venues from the store.
+    """
+
+    def __init__(self, multicall, profiles, store=None, workers=4, chunk_size=1000):
+        """
+        :param multicall: Multicall used for the batched reads.
+        :param profiles: FactoryProfiles of the exchanges to index.
+        :param store: PoolStore to index into, an empty one is created if not given.
+        :param workers: Number of factories indexed concurrently.
+        :param chunk_size: Number of pairs read per batched call when indexing.
+        """
+        self.multicall = multicall
+        self.profiles = list(profiles)
+        self.store = store if store is not None else PoolStore()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.fees = {}
+        self.indexed = {}
+        for profile in self.profiles:
+            venue_id = self.store.add_factory(profile.factory)
+            self.fees[venue_id] = profile.fee_bps
+            self.indexed[venue_id] = sum(1 for venue in self.store.venue if venue == venue_id)
+
+    def _read_pairs(self, profile, start, stop, block_number):
+        address = decoder("address")
+        pairs = []
+        for chunk in range(start, stop, self.chunk_size):
+            calls = [(profile.factory, encode_call("allPairs(uint256)", ["uint256"], [i]), address)
+                     for i in range(chunk, min(chunk + self.chunk_size, stop))]
+            addresses = self.multicall.call(calls, block_number)
+            if None in addresses:
+                raise RuntimeError("Unable to read the pairs of {} at block {}".format(profile.name, block_number))
+            calls = []
+            for pair in addresses:
+                calls += [(pair, Multicall.TOKEN_0, address), (pair, Multicall.TOKEN_1, address)]
+            tokens = self.multicall.call(calls, block_number)
+            pairs += zip(addresses, tokens[0::2], tokens[1::2])
+        return pairs
+
+    def index(self, block_identifier="latest"):
+        """
+        Indexes the pairs created since the last call, reading the factories
+        concurrently.
+
+        :param block_identifier: Block to read at.
+        :return: Number of the block the pairs were read at.
+        """
+        uint = decoder("uint256")
+        block_number, lengths = self.multicall.block_and_call(
+            [(profile.factory, Multicall.ALL_PAIRS_LENGTH, uint) for profile in self.profiles], block_identifier)
+        venues = [self.store.venue_id(profile.factory) for profile in self.profiles]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._read_pairs, profile, self.indexed[venue_id], length, block_number)
+                       for profile, venue_id, length in zip(self.profiles, venues, lengths)]
+            # the store is only updated from this thread
+            for profile, venue_id, future in zip(self.profiles, venues, futures):
+                for pair, token_0, token_1 in future.result():
+                    self.store.add_pair(pair, token_0, token_1, factory=profile.factory)
+                    self.indexed[venue_id] += 1
+        return block_number
+
+    def refresh(self, block_identifier="latest"):
+        """
+        Reads the reserves of every indexed pair of every venue in one batched read.
+
+        :param block_identifier: Block to read the reserves at.
+        :return: Number of the block the reserves were read at.
+        """
+        return self.store.refresh(self.multicall, block_identifier=block_identifier)
+
+    def update(self, block_identifier="latest"):
+        """
+        Indexes new pairs and refreshes every reserve at the same block.
+
+        :param block_identifier: Block to read at.
+        :return: Number of the block read at.
+        """
+        block_number = self.index(block_identifier)
+        self.refresh(block_number)
+        return block_number
+
+    def quotes(self, amount_in, token_in, token_out):
+        """
+        Quotes a swap on every venue trading token_in against token_out,
+        from the stored reserves.
+
+        :param amount_in: Amount of token_in.
+        :param token_in: Address of the input token.
+        :param token_out: Address of the output token.
+        :return: List of ``(factory, pair, amount_out)``, best quote first.
+        """
+        token_in = Address.of(token_in)
+        quotes = []
+        for pair_id in self.store.pairs_for_tokens(token_in, token_out):
+            reserve_0, reserve_1 = self.store.get_reserves(pair_id)
+            if self.store.token(self.store.token_0[pair_id]) is token_in:
+                reserve_in, reserve_out = reserve_0, reserve_1
+            else:
+                reserve_in, reserve_out = reserve_1, reserve_0
+            if reserve_in == 0 or reserve_out == 0:
+                continue
+            venue_id = self.store.venue[pair_id]
+            amount_out = UniswapV2Utils.get_amount_out(amount_in, reserve_in, reserve_out, self.fees.get(venue_id, 30))
+            quotes.append((self.store.factory(venue_id).checksum, self.store.pair(pair_id).checksum, amount_out))
+        quotes.sort(key=lambda quote: quote[2], reverse=True)
+        return quotes
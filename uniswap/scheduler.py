@@ -0,0 +1,193 @@
+import time
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, encode_call, decoder
+
+PAIR = 0
+PAIR_CREATED = 1
+RESERVE_THRESHOLD = 2
+PRICE_CROSSING = 3
+
+
+class _Watch(object):
+
+    def __init__(self, kind, token_a, token_b, callback, token=None, level=None):
+        self.kind = kind
+        self.token_a = Address.of(token_a)
+        self.token_b = Address.of(token_b)
+        self.callback = callback
+        self.token = Address.of(token) if token is not None else None
+        self.level = level
+        self.pair = None
+        self.side = None
+        self.above = None
+        self.active = True
+
+
+class BlockScheduler(object):
+    """
+    Dispatches callbacks on new blocks. Every watched pair is read in a single
+    batched call per block, replacing sleep based polling loops.
+    """
+
+    def __init__(self, client, poll_interval=1.0, multicall=None):
+        """
+        :param client: UniswapV2Client.
+        :param poll_interval: Seconds to wait before checking for a new block again.
+        :param multicall: Multicall used for batched reads, one is created if not given.
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.multicall = multicall or Multicall(client.conn)
+        self.watches = []
+        self.running = False
+
+    # Registration
+    # -----------------------------------------------------------
+    def _add(self, watch):
+        self.watches.append(watch)
+        return watch
+
+    def watch_pair(self, token_a, token_b, callback):
+        """
+        Calls back on every block once the pair exists.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param callback: Callable invoked as ``callback(block_number, reserve_a, reserve_b)``.
+        :return: Handle that can be passed to cancel.
+        """
+        return self._add(_Watch(PAIR, token_a, token_b, callback))
+
+    def on_pair_created(self, token_a, token_b, callback):
+        """
+        Calls back once, as soon as the pair for token_a and token_b exists.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param callback: Callable invoked as ``callback(block_number, pair)``.
+        :return: Handle that can be passed to cancel.
+        """
+        return self._add(_Watch(PAIR_CREATED, token_a, token_b, callback))
+
+    def on_reserve_threshold(self, token_a, token_b, token, threshold, callback):
+        """
+        Calls back once, as soon as the reserve of token in the pair reaches threshold.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param token: Address of the pool token whose reserve is watched.
+        :param threshold: Reserve amount to reach.
+        :param callback: Callable invoked as ``callback(block_number, reserve_a, reserve_b)``.
+        :return: Handle that can be passed to cancel.
+        """
+        assert Address.of(token) in (Address.of(token_a), Address.of(token_b))
+        return self._add(_Watch(RESERVE_THRESHOLD, token_a, token_b, callback, token=token, level=threshold))
+
+    def on_price_crossing(self, token_a, token_b, price, callback):
+        """
+        Calls back every time the price of token_a in units of token_b
+        (reserve_b / reserve_a) crosses price, in either direction.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param price: Price level to watch.
+        :param callback: Callable invoked as ``callback(block_number, reserve_a, reserve_b)``.
+        :return: Handle that can be passed to cancel.
+        """
+        return self._add(_Watch(PRICE_CROSSING, token_a, token_b, callback, level=price))
+
+    def cancel(self, watch):
+        """
+        :param watch: Handle returned when registering the callback.
+        """
+        watch.active = False
+        if watch in self.watches:
+            self.watches.remove(watch)
+
+    # Dispatching
+    # -----------------------------------------------------------
+    def tick(self, block_identifier="latest"):
+        """
+        Reads every watched pair in a single batched call and dispatches the callbacks.
+
+        :param block_identifier: Block to read the pairs at.
+        :return: Number of the block that was read.
+        """
+        watches = list(self.watches)
+        unresolved = [w for w in watches if w.pair is None]
+        resolved = [w for w in watches if w.pair is not None]
+        get_pair = decoder("address")
+        get_reserves = decoder("uint112", "uint112", "uint32")
+        calls = [(self.client.get_factory(),
+                  encode_call("getPair(address,address)", ["address", "address"], [w.token_a.checksum, w.token_b.checksum]),
+                  get_pair) for w in unresolved]
+        calls += [(w.pair, Multicall.GET_RESERVES, get_reserves) for w in resolved]
+        if not calls:
+            return None
+        block_number, results = self.multicall.block_and_call(calls, block_identifier)
+
+        for watch, pair in zip(unresolved, results):
+            if pair is None or Address.of(pair) is Address.ZERO:
+                continue
+            watch.pair = Address.of(pair).checksum
+            watch.side = watch.token_a < watch.token_b
+            if watch.kind == PAIR_CREATED:
+                self.cancel(watch)
+                watch.callback(block_number, watch.pair)
+
+        for watch, reserves in zip(resolved, results[len(unresolved):]):
+            if reserves is None or not watch.active:
+                continue
+            reserve_a, reserve_b = (reserves[0], reserves[1]) if watch.side else (reserves[1], reserves[0])
+            self._dispatch(watch, block_number, reserve_a, reserve_b)
+        return block_number
+
+    def _dispatch(self, watch, block_number, reserve_a, reserve_b):
+        if watch.kind == PAIR:
+            watch.callback(block_number, reserve_a, reserve_b)
+        elif watch.kind == RESERVE_THRESHOLD:
+            reserve = reserve_a if watch.token is watch.token_a else reserve_b
+            if reserve >= watch.level:
+                self.cancel(watch)
+                watch.callback(block_number, reserve_a, reserve_b)
+        elif watch.kind == PRICE_CROSSING:
+            if reserve_a == 0:
+                return
+            above = reserve_b >= watch.level * reserve_a
+            crossed = watch.above is not None and watch.above != above
+            watch.above = above
+            if crossed:
+                watch.callback(block_number, reserve_a, reserve_b)
+
+    def run(self):
+        """
+        Dispatches callbacks on every new block until stop is called. New heads
+        are taken from a block filter, falling back to polling the block number
+        on providers without filter support.
+        """
+        conn = self.client.conn
+        try:
+            block_filter = conn.eth.filter("latest")
+        except ValueError:
+            block_filter = None
+        last_block = None
+        self.running = True
+        while self.running:
+            if block_filter is not None:
+                heads = block_filter.get_new_entries()
+                new_head = heads[-1] if heads else None
+            else:
+                block_number = conn.eth.blockNumber
+                new_head = block_number if block_number != last_block else None
+                last_block = block_number
+            if new_head is None:
+                time.sleep(self.poll_interval)
+                continue
+            if not isinstance(new_head, int):
+                # a hash would be resolved again for every chunk of the batched read
+                new_head = conn.eth.getBlock(new_head)["number"]
+            self.tick(new_head)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,316 @@
+from uniswap.address import Address
+from uniswap.uniswap import UniswapV2Utils
+
+SYNC = 0
+SWAP = 1
+
+
+class UniswapV2Simulator(object):
+    """
+    Offline constant-product pools used to backtest strategies against
+    recorded Sync/Swap event streams.
+
+    Pool state is kept in parallel columns indexed by an integer pool id rather
+    than in per-pool objects, so replaying an event touches two list slots.
+    Reserves are uint112 on-chain and do not fit fixed-width array types, hence
+    plain lists of ints.
+    """
+
+    MINIMUM_LIQUIDITY = 1000
+
+    def __init__(self, fee_bps=30):
+        """
+        :param fee_bps: Swap fee of the pools in basis points.
+        """
+        self.fee_bps = fee_bps
+        self.pairs = []
+        self.token_0 = []
+        self.token_1 = []
+        self.reserve_0 = []
+        self.reserve_1 = []
+        self.total_supply = []
+        self.block = []
+        self._by_pair = {}
+        self._by_tokens = {}
+        self._synced = set()
+
+    def __len__(self):
+        return len(self.pairs)
+
+    # Pool Management
+    # -----------------------------------------------------------
+    def add_pool(self, pair, token_0, token_1, reserve_0=0, reserve_1=0, total_supply=0, block=0):
+        """
+        Registers a pool, or returns the id of an already registered one.
+
+        :param pair: Address of the pair.
+        :param token_0: Address of the pair token with the lower sort order.
+        :param token_1: Address of the pair token with the higher sort order.
+        :param reserve_0: Initial reserve of token_0.
+        :param reserve_1: Initial reserve of token_1.
+        :param total_supply: Initial supply of liquidity tokens.
+        :param block: Block number the initial state was observed at.
+        :return: Id of the pool.
+        """
+        pair = Address.of(pair)
+        if pair in self._by_pair:
+            return self._by_pair[pair]
+        if token_0 is not None and token_1 is not None:
+            token_0, token_1 = Address.of(token_0), Address.of(token_1)
+        index = len(self.pairs)
+        self.pairs.append(pair)
+        self.token_0.append(token_0)
+        self.token_1.append(token_1)
+        self.reserve_0.append(reserve_0)
+        self.reserve_1.append(reserve_1)
+        self.total_supply.append(total_supply)
+        self.block.append(block)
+        self._by_pair[pair] = index
+        if token_0 is not None and token_1 is not None:
+            self._by_tokens[(token_0, token_1)] = index
+        return index
+
+    def index_of(self, pair):
+        """
+        :param pair: Address of the pair.
+        :return: Id of the pool, or None if the pair is unknown.
+        """
+        return self._by_pair.get(Address.of(pair))
+
+    def pool_for(self, token_a, token_b):
+        """
+        Gets the pool trading token_a against token_b.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :return: Tuple of the pool id and whether token_a is token_0 of the pool.
+        """
+        token_a, token_b = Address.of(token_a), Address.of(token_b)
+        index = self._by_tokens.get((token_a, token_b))
+        if index is not None:
+            return index, True
+        index = self._by_tokens.get((token_b, token_a))
+        assert index is not None, "no pool for {}/{}".format(token_a, token_b)
+        return index, False
+
+    def get_reserves(self, token_a, token_b):
+        """
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :return: Reserves of token_a and token_b, in that order.
+        """
+        index, forward = self.pool_for(token_a, token_b)
+        if forward:
+            return self.reserve_0[index], self.reserve_1[index]
+        return self.reserve_1[index], self.reserve_0[index]
+
+    # Event Replay
+    # -----------------------------------------------------------
+    def event_from_log(self, log):
+        """
+        Converts a decoded IUniswapV2Pair Sync or Swap log, as returned by
+        web3's event processing, into the compact tuple form consumed by replay.
+        Unknown pairs are registered with unknown tokens.
+
+        :param log: Decoded event log.
+        :return: Event tuple, or None for events that do not affect reserves.
+        """
+        index = self._by_pair.get(Address.of(log["address"]))
+        if index is None:
+            index = self.add_pool(log["address"], None, None)
+        args = log["args"]
+        if log["event"] == "Sync":
+            return log["blockNumber"], index, SYNC, args["reserve0"], args["reserve1"]
+        if log["event"] == "Swap":
+            return (log["blockNumber"], index, SWAP,
+                    args["amount0In"], args["amount1In"], args["amount0Out"], args["amount1Out"])
+        return None
+
+    def replay(self, events, on_block=None):
+        """
+        Applies a stream of recorded events to the pools.
+
+        Events are tuples in chain order, either
+        ``(block, pool, SYNC, reserve_0, reserve_1)`` or
+        ``(block, pool, SWAP, amount_0_in, amount_1_in, amount_0_out, amount_1_out)``.
+        None entries, as returned by event_from_log for other events, are skipped.
+
+        A pair emits Sync with its new reserves before every Swap, so Sync is
+        authoritative and the amounts of a Swap only move the reserves of pools
+        no Sync has been replayed for, i.e. of Swap-only streams.
+
+        :param events: Iterable of event tuples.
+        :param on_block: Optional callable invoked as ``on_block(simulator, block)``
+            once all events of a block have been applied, where a strategy can
+            inject its own swaps and liquidity actions.
+        :return: Number of events applied.
+        """
+        reserve_0 = self.reserve_0
+        reserve_1 = self.reserve_1
+        blocks = self.block
+        synced = self._synced
+        current = None
+        count = 0
+        for event in events:
+            if event is None:
+                continue
+            block = event[0]
+            if block != current:
+                if on_block is not None and current is not None:
+                    on_block(self, current)
+                current = block
+            index = event[1]
+            if event[2] == SYNC:
+                reserve_0[index] = event[3]
+                reserve_1[index] = event[4]
+                synced.add(index)
+            elif index not in synced:
+                reserve_0[index] += event[3] - event[5]
+                reserve_1[index] += event[4] - event[6]
+            blocks[index] = block
+            count += 1
+        if on_block is not None and current is not None:
+            on_block(self, current)
+        return count
+
+    # Strategy Actions
+    # -----------------------------------------------------------
+    def _apply(self, index, forward, amount_in, amount_out):
+        if forward:
+            self.reserve_0[index] += amount_in
+            self.reserve_1[index] -= amount_out
+        else:
+            self.reserve_1[index] += amount_in
+            self.reserve_0[index] -= amount_out
+
+    def swap_exact_tokens_for_tokens(self, amount_in, min_out, path):
+        """
+        Swaps an exact amount of input tokens along the path, updating the
+        reserves of every pool traversed.
+
+        :param amount_in: Amount of input tokens to send.
+        :param min_out: Minimum amount of output tokens that must be received.
+        :param path: Array of token addresses.
+        :return: Input token amount and all subsequent output token amounts.
+        """
+        assert len(path) >= 2
+        amounts = [amount_in]
+        for i in range(len(path) - 1):
+            index, forward = self.pool_for(path[i], path[i + 1])
+            if forward:
+                amount_out = UniswapV2Utils.get_amount_out(
+                    amounts[i], self.reserve_0[index], self.reserve_1[index], self.fee_bps)
+            else:
+                amount_out = UniswapV2Utils.get_amount_out(
+                    amounts[i], self.reserve_1[index], self.reserve_0[index], self.fee_bps)
+            amounts.append(amount_out)
+        assert amounts[-1] >= min_out, "INSUFFICIENT_OUTPUT_AMOUNT"
+        for i in range(len(path) - 1):
+            index, forward = self.pool_for(path[i], path[i + 1])
+            self._apply(index, forward, amounts[i], amounts[i + 1])
+        return amounts
+
+    def swap_tokens_for_exact_tokens(self, amount_out, amount_in_max, path):
+        """
+        Swaps as few input tokens as possible along the path for an exact
+        amount of output tokens, updating the reserves of every pool traversed.
+
+        :param amount_out: Amount of tokens to receive.
+        :param amount_in_max: Maximum amount of input tokens that can be required.
+        :param path: Array of token addresses.
+        :return: Input token amount and all subsequent output token amounts.
+        """
+        assert len(path) >= 2
+        amounts = [0] * len(path)
+        amounts[-1] = amount_out
+        for i in range(len(path) - 1, 0, -1):
+            index, forward = self.pool_for(path[i - 1], path[i])
+            if forward:
+                amounts[i - 1] = UniswapV2Utils.get_amount_in(
+                    amounts[i], self.reserve_0[index], self.reserve_1[index], self.fee_bps)
+            else:
+                amounts[i - 1] = UniswapV2Utils.get_amount_in(
+                    amounts[i], self.reserve_1[index], self.reserve_0[index], self.fee_bps)
+        assert amounts[0] <= amount_in_max, "EXCESSIVE_INPUT_AMOUNT"
+        for i in range(len(path) - 1):
+            index, forward = self.pool_for(path[i], path[i + 1])
+            self._apply(index, forward, amounts[i], amounts[i + 1])
+        return amounts
+
+    def add_liquidity(self, token_a, token_b, amount_a, amount_b, min_a=0, min_b=0):
+        """
+        Adds liquidity at the current pool ratio following the router rules.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param amount_a: Desired amount of token_a to add as liquidity.
+        :param amount_b: Desired amount of token_b to add as liquidity.
+        :param min_a: Minimum amount of token_a that must be added.
+        :param min_b: Minimum amount of token_b that must be added.
+        :return:
+            - amount_a - Amount of token_a sent to the pool.
+            - amount_b - Amount of token_b sent to the pool.
+            - liquidity - Amount of liquidity tokens minted.
+        """
+        index, forward = self.pool_for(token_a, token_b)
+        reserve_a, reserve_b = self.get_reserves(token_a, token_b)
+        if reserve_a != 0 or reserve_b != 0:
+            optimal_b = UniswapV2Utils.calculate_quote(amount_a, reserve_a, reserve_b)
+            if optimal_b <= amount_b:
+                assert optimal_b >= min_b, "INSUFFICIENT_B_AMOUNT"
+                amount_b = optimal_b
+            else:
+                optimal_a = UniswapV2Utils.calculate_quote(amount_b, reserve_b, reserve_a)
+                assert optimal_a <= amount_a
+                assert optimal_a >= min_a, "INSUFFICIENT_A_AMOUNT"
+                amount_a = optimal_a
+
+        total_supply = self.total_supply[index]
+        if total_supply == 0:
+            assert reserve_a == 0 and reserve_b == 0, "pool total supply is unknown"
+            liquidity = UniswapV2Utils.sqrt(amount_a * amount_b) - UniswapV2Simulator.MINIMUM_LIQUIDITY
+            total_supply = UniswapV2Simulator.MINIMUM_LIQUIDITY
+        else:
+            liquidity = min(amount_a * total_supply // reserve_a, amount_b * total_supply // reserve_b)
+        assert liquidity > 0, "INSUFFICIENT_LIQUIDITY_MINTED"
+
+        self.total_supply[index] = total_supply + liquidity
+        if forward:
+            self.reserve_0[index] += amount_a
+            self.reserve_1[index] += amount_b
+        else:
+            self.reserve_0[index] += amount_b
+            self.reserve_1[index] += amount_a
+        return amount_a, amount_b, liquidity
+
+    def remove_liquidity(self, token_a, token_b, liquidity, min_a=0, min_b=0):
+        """
+        Burns liquidity tokens for a pro-rata share of the reserves.
+
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param liquidity: Amount of liquidity tokens to remove.
+        :param min_a: Minimum amount of token_a that must be received.
+        :param min_b: Minimum amount of token_b that must be received.
+        :return:
+            - amount_a - Amount of token_a received.
+            - amount_b - Amount of token_b received.
+        """
+        index, forward = self.pool_for(token_a, token_b)
+        total_supply = self.total_supply[index]
+        assert 0 < liquidity <= total_supply
+        reserve_a, reserve_b = self.get_reserves(token_a, token_b)
+        amount_a = liquidity * reserve_a // total_supply
+        amount_b = liquidity * reserve_b // total_supply
+        assert amount_a > 0 and amount_b > 0, "INSUFFICIENT_LIQUIDITY_BURNED"
+        assert amount_a >= min_a, "INSUFFICIENT_A_AMOUNT"
+        assert amount_b >= min_b, "INSUFFICIENT_B_AMOUNT"
+
+        self.total_supply[index] = total_supply - liquidity
+        if forward:
+            self.reserve_0[index] -= amount_a
+            self.reserve_1[index] -= amount_b
+        else:
+            self.reserve_0[index] -= amount_b
+            self.reserve_1[index] -= amount_a
+        return amount_a, amount_b
@@ -0,0 +1,223 @@
+from collections import namedtuple
+from decimal import Context, Decimal, localcontext
+
+from uniswap.address import Address
+from uniswap.liquidity import approvals, send_consecutive
+from uniswap.uniswap import UniswapV2Utils
+
+Route = namedtuple("Route", ["path", "reserves", "fee_bps", "router"])
+Route.__doc__ = """
+Path through the pairs of a single exchange.
+
+:param path: Token addresses, input token first.
+:param reserves: ``(reserve_in, reserve_out)`` of the pair of each hop.
+:param fee_bps: Swap fee of the exchange in basis points.
+:param router: Address of the router of the exchange.
+"""
+
+Split = namedtuple("Split", ["route", "amount_in", "amount_out"])
+RouterCall = namedtuple("RouterCall", ["router", "function", "args"])
+
+# allocations are differences of values of the size of the reserves, which floats cannot resolve
+PRECISION = Context(prec=60)
+
+
+def virtual_reserves(reserves, fee_bps=30):
+    """
+    Composes the pairs of a multi-hop route into a single virtual pair
+    giving the same output for any input, with the fee applied on input.
+
+    Two hops (a1, b1), (a2, b2) compose into
+    ``(a1*a2 / (a2 + g*b1), g*b1*b2 / (a2 + g*b1))`` where g is the fee multiplier.
+
+    :param reserves: ``(reserve_in, reserve_out)`` of the pair of each hop.
+    :param fee_bps: Swap fee in basis points.
+    :return: Virtual ``(reserve_in, reserve_out)`` as Decimals.
+    """
+    with localcontext(PRECISION):
+        gamma = Decimal(10000 - fee_bps) / 10000
+        reserve_in, reserve_out = Decimal(reserves[0][0]), Decimal(reserves[0][1])
+        for a, b in reserves[1:]:
+            denominator = a + gamma * reserve_out
+            reserve_in, reserve_out = reserve_in * a / denominator, gamma * reserve_out * b / denominator
+        return +reserve_in, +reserve_out
+
+
+def get_amount_out(amount_in, route):
+    """
+    :param amount_in: Amount of the input token.
+    :param route: Route to swap through.
+    :return: Exact output amount of the route, 0 if it runs out of liquidity.
+    """
+    amount = amount_in
+    for reserve_in, reserve_out in route.reserves:
+        if amount <= 0 or reserve_in <= 0 or reserve_out <= 0:
+            return 0
+        amount = UniswapV2Utils.get_amount_out(amount, reserve_in, reserve_out, route.fee_bps)
+    return amount
+
+
+def allocate(amount_in, routes):
+    """
+    Divides an input amount across routes so as to maximize the total output.
+
+    Each route is reduced to a virtual pair (a, b) with fee multiplier g, whose
+    output ``g*x*b / (a + g*x)`` has marginal price ``g*a*b / (a + g*x)^2``. At the
+    optimum the marginal prices of the routes used are equal, which gives
+    ``x = sqrt(a*b/g) * m - a/g`` for a common m, and routes whose marginal
+    price at x = 0 is below the common one are left out. Routes are added in
+    order of decreasing spot price until the next one would get a negative
+    amount, then m is solved from the total in closed form.
+
+    Routes are assumed not to share pairs.
+
+    :param amount_in: Total amount of the input token.
+    :param routes: Candidate routes.
+    :return: Input amount per route, as Decimals summing to amount_in.
+    """
+    with localcontext(PRECISION):
+        candidates = []
+        for i, route in enumerate(routes):
+            a, b = virtual_reserves(route.reserves, route.fee_bps)
+            if a <= 0 or b <= 0:
+                continue
+            gamma = Decimal(10000 - route.fee_bps) / 10000
+            candidates.append(((a * b / gamma).sqrt(), a / gamma, i))
+        # highest spot price g*b/a first, i.e. lowest c/s
+        candidates.sort(key=lambda candidate: candidate[1] / candidate[0])
+
+        total_s = total_c = Decimal(0)
+        active = 0
+        for s, c, _ in candidates:
+            if active and s * (amount_in + total_c) / total_s <= c:
+                break
+            total_s += s
+            total_c += c
+            active += 1
+
+        amounts = [Decimal(0)] * len(routes)
+        m = (amount_in + total_c) / total_s if active else 0
+        for s, c, i in candidates[:active]:
+            amounts[i] = max(s * m - c, Decimal(0))
+        return amounts
+
+
+def split_order(amount_in, routes):
+    """
+    Splits an exact input swap across routes to maximize the total output.
+    Allocations are rounded to integers that sum to amount_in, and routes
+    whose share would not return any output are dropped.
+
+    :param amount_in: Total amount of the input token.
+    :param routes: Candidate routes, not sharing pairs.
+    :return: List of Split, with the exact output amount of each route.
+    """
+    assert amount_in > 0
+    pairs = [(Address.of(route.router), frozenset(Address.of(token) for token in hop))
+             for route in routes for hop in zip(route.path, route.path[1:])]
+    assert len(set(pairs)) == len(pairs), "routes share pairs"
+
+    amounts = [int(amount) for amount in allocate(amount_in, routes)]
+    if not any(amounts):
+        return []
+    largest = max(range(len(routes)), key=lambda i: amounts[i])
+    amounts[largest] += amount_in - sum(amounts)
+    for i, amount in enumerate(amounts):
+        if i != largest and amount and get_amount_out(amount, routes[i]) == 0:
+            amounts[largest] += amount
+            amounts[i] = 0
+
+    splits = [Split(route, amount, get_amount_out(amount, route)) for route, amount in zip(routes, amounts) if amount]
+    # rounding can only lose a few units, but never return less than the best single route
+    best = max(routes, key=lambda route: get_amount_out(amount_in, route))
+    best_out = get_amount_out(amount_in, best)
+    if sum(split.amount_out for split in splits) < best_out:
+        return [Split(best, amount_in, best_out)]
+    return splits
+
+
+def router_calls(splits, to, deadline, slippage_bps=50):
+    """
+    Builds the router calls executing a split order.
+
+    :param splits: Splits returned by split_order.
+    :param to: Address of the recipient for the output tokens.
+    :param deadline: Unix timestamp after which the transactions will revert.
+    :param slippage_bps: Tolerated decrease of the output of each split, in basis points.
+    :return: List of RouterCall, whose args are those of
+        UniswapV2Client.swap_exact_tokens_for_tokens.
+    """
+    return [RouterCall(split.route.router, "swapExactTokensForTokens",
+                       (split.amount_in, split.amount_out * (10000 - slippage_bps) // 10000,
+                        list(split.route.path), to, deadline))
+            for split in splits]
+
+
+def execute(clients, calls):
+    """
+    Sends router calls through the client of their exchange. The input amounts
+    of the calls sharing a router and an input token are approved together,
+    with all approvals sent back to back and awaited once. The swaps of each
+    client are then sent together with consecutive nonces.
+
+    :param clients: UniswapV2Clients, one per router used.
+    :param calls: Router calls returned by router_calls.
+    :return: Hash of the transaction of each call, or the PreflightError of the ones that revert.
+    """
+    by_router = {Address.of(client.router.address): client for client in clients}
+    needed = {}
+    for call in calls:
+        amounts = needed.setdefault(by_router[Address.of(call.router)], {})
+        token = Address.of(call.args[2][0]).checksum
+        amounts[token] = amounts.get(token, 0) + call.args[0]
+    sent = []
+    for client, amounts in needed.items():
+        sent += [(client, tx) for tx in send_consecutive(client, approvals(client, amounts))]
+    for client, tx in sent:
+        client.conn.eth.waitForTransactionReceipt(tx, timeout=6000)
+
+    collected = {}
+    for i, call in enumerate(calls):
+        client = by_router[Address.of(call.router)]
+        amount_in, min_out, path, to, deadline = call.args
+        func = client.router.functions.swapExactTokensForTokens(
+            amount_in, min_out, [Address.of(token).checksum for token in path], Address.of(to).checksum, deadline)
+        indices, transactions = collected.setdefault(client, ([], []))
+        indices.append(i)
+        transactions.append((func, client._create_transaction_params(nonce=None)))
+    hashes = [None] * len(calls)
+    for client, (indices, transactions) in collected.items():
+        for i, result in zip(indices, client.send_all(transactions)):
+            hashes[i] = result
+    return hashes
+
+
+def candidate_routes(scanner, token_in, token_out, via=()):
+    """
+    Lists the direct routes and the two-hop routes through each intermediate
+    token, on every exchange indexed by a MultiFactoryScanner, from its stored
+    reserves.
+
+    :param scanner: MultiFactoryScanner holding the pairs and reserves.
+    :param token_in: Address of the input token.
+    :param token_out: Address of the output token.
+    :param via: Addresses of intermediate tokens.
+    :return: List of Route.
+    """
+    store = scanner.store
+    paths = [[Address.of(token_in), Address.of(token_out)]]
+    paths += [[Address.of(token_in), Address.of(token), Address.of(token_out)] for token in via]
+    routes = []
+    for profile in scanner.profiles:
+        venue_id = store.venue_id(profile.factory)
+        for path in paths:
+            reserves = []
+            for a, b in zip(path, path[1:]):
+                pair_ids = [i for i in store.pairs_for_tokens(a, b) if store.venue[i] == venue_id]
+                if not pair_ids:
+                    break
+                reserve_0, reserve_1 = store.get_reserves(pair_ids[0])
+                reserves.append((reserve_0, reserve_1) if a < b else (reserve_1, reserve_0))
+            else:
+                routes.append(Route([token.checksum for token in path], reserves, profile.fee_bps, profile.router))
+    return routes
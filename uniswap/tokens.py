@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+
+from eth_abi import decode_abi
+from eth_abi.exceptions import DecodingError
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, encode_call
+
+
+def decode_string(data):
+    """
+    Decodes a string returned by symbol() or name(), including tokens
+    (e.g. MKR) that return a bytes32 instead of an ABI encoded string.
+
+    :param data: Raw return data.
+    :return: Decoded string.
+    """
+    if len(data) == 32:
+        return data.rstrip(b"\x00").decode("utf-8", "replace")
+    try:
+        return decode_abi(["string"], data)[0]
+    except Exception:
+        return data.rstrip(b"\x00").decode("utf-8", "replace")
+
+
+def decode_decimals(data):
+    """
+    Decodes the value returned by decimals().
+
+    :param data: Raw return data.
+    :return: Number of decimals, or None if the data is not a uint8.
+    """
+    try:
+        return decode_abi(["uint8"], data)[0]
+    except DecodingError:
+        return None
+
+
+class TokenStore(object):
+    """
+    Cache of immutable token metadata (decimals, symbol and name) with an
+    in-memory layer and an optional SQLite layer on disk. Missing tokens are
+    fetched in batched calls. Tokens whose decimals cannot be read, e.g. not
+    yet deployed or not ERC20, are not cached and are fetched again on the
+    next request.
+    """
+
+    DECIMALS = encode_call("decimals()")
+    SYMBOL = encode_call("symbol()")
+    NAME = encode_call("name()")
+
+    def __init__(self, conn, path=None, multicall=None):
+        """
+        :param conn: Web3 connection.
+        :param path: Path of the SQLite database, metadata is only kept in memory if not given.
+        :param multicall: Multicall used for batched reads, one is created if not given.
+        """
+        self.multicall = multicall or Multicall(conn)
+        self.tokens = {}
+        self.db = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens (address TEXT PRIMARY KEY, decimals INTEGER, symbol TEXT, name TEXT)")
+            self.db.commit()
+
+    def get(self, token):
+        """
+        Gets the metadata of a token.
+
+        :param token: Address of the token.
+        :return: Dict with keys address, decimals, symbol and name.
+        """
+        return self.get_many([token])[0]
+
+    def get_many(self, tokens):
+        """
+        Gets the metadata of many tokens, fetching the missing ones in batched calls.
+
+        :param tokens: Addresses of the tokens.
+        :return: List of dicts with keys address, decimals, symbol and name. Values
+            the token contract does not expose are None.
+        """
+        tokens = [Address.of(token) for token in tokens]
+        missing = [token for token in dict.fromkeys(tokens) if token not in self.tokens]
+        fetched = {}
+        if missing:
+            with self._lock:
+                missing = self._load(missing)
+                if missing:
+                    fetched = self._fetch(missing)
+        return [self.tokens.get(token) or fetched[token] for token in tokens]
+
+    def _load(self, tokens):
+        if self.db is None:
+            return tokens
+        for start in range(0, len(tokens), 500):
+            chunk = [token.checksum for token in tokens[start:start + 500]]
+            rows = self.db.execute(
+                "SELECT address, decimals, symbol, name FROM tokens WHERE decimals IS NOT NULL AND address IN ({})".format(
+                    ",".join("?" * len(chunk))), chunk)
+            for address, decimals, symbol, name in rows:
+                self.tokens[Address.of(address)] = {
+                    "address": address, "decimals": decimals, "symbol": symbol, "name": name}
+        return [token for token in tokens if token not in self.tokens]
+
+    def _fetch(self, tokens):
+        calls = []
+        for token in tokens:
+            calls += [
+                (token.checksum, TokenStore.DECIMALS, decode_decimals),
+                (token.checksum, TokenStore.SYMBOL, decode_string),
+                (token.checksum, TokenStore.NAME, decode_string),
+            ]
+        results = self.multicall.call(calls)
+        fetched = {}
+        rows = []
+        for i, token in enumerate(tokens):
+            decimals, symbol, name = results[3 * i:3 * i + 3]
+            fetched[token] = {"address": token.checksum, "decimals": decimals, "symbol": symbol, "name": name}
+            if decimals is not None:
+                self.tokens[token] = fetched[token]
+                rows.append((token.checksum, decimals, symbol, name))
+        if self.db is not None and rows:
+            self.db.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?)", rows)
+            self.db.commit()
+        return fetched
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -1,72 +1,204 @@
 import os
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from web3 import Web3
 from web3.exceptions import BadFunctionCallOutput
-import re
+from web3.providers.base import BaseProvider
+from eth_abi import decode_abi
+from eth_utils import keccak
+
+from uniswap.address import Address
+from uniswap.multicall import Multicall, PinnedMulticall, encode_call, decoder
+from uniswap.profiles import UNISWAP_V2
+from uniswap.ratelimit import RateLimitedProvider
+from uniswap.raw import RawReader
+from uniswap.rpc_cache import CachingProvider, REPLAY
+
+
+def _checksum(address):
+    return Address.of(address).checksum
+
+
+def _checksum_path(path):
+    return [Address.of(token).checksum for token in path]
+
+
+def connect(provider=None):
+    """
+    Creates a web3 connection.
+
+    :param provider: Provider URI (http, ws or IPC path) or web3 provider object,
+        defaults to the PROVIDER environment variable. When RPC_RATE_LIMIT is set,
+        the provider is wrapped in a RateLimitedProvider allowing that many requests
+        per second. When RPC_CACHE is set, the provider is wrapped in a CachingProvider
+        storing to that directory.
+    :return: The connection.
+    """
+    uri = os.environ["PROVIDER"] if not provider else provider
+    if isinstance(uri, BaseProvider):
+        provider = uri
+    elif re.match(r'^https*:', uri):
+        provider = Web3.HTTPProvider(uri, request_kwargs={"timeout": 60})
+    elif re.match(r'^ws*:', uri):
+        provider = Web3.WebsocketProvider(uri)
+    elif re.match(r'^/', uri):
+        provider = Web3.IPCProvider(uri)
+    else:
+        raise RuntimeError("Unknown provider type " + uri)
+    if os.environ.get("RPC_RATE_LIMIT") and not isinstance(provider, (RateLimitedProvider, CachingProvider)):
+        compute_units = os.environ.get("RPC_COMPUTE_UNITS")
+        provider = RateLimitedProvider(provider, float(os.environ["RPC_RATE_LIMIT"]),
+                                       float(compute_units) if compute_units else None)
+    if os.environ.get("RPC_CACHE") and not isinstance(provider, CachingProvider):
+        provider = CachingProvider(provider, os.environ["RPC_CACHE"], os.environ.get("RPC_CACHE_MODE", REPLAY),
+                                   os.environ.get("RPC_CACHE_STRICT") == "1")
+    conn = Web3(provider)
+    if not conn.isConnected():
+        raise RuntimeError("Unable to connect to provider at " + str(uri))
+    return conn
+
+
+@lru_cache(maxsize=65536)
+def _pair_for(factory, token_0, token_1, init_code_hash):
+    raw = keccak(b"\xff" + factory + keccak(token_0 + token_1) + init_code_hash)
+    return Address.of(raw[12:])
+
 
 class UniswapV2Utils(object):
 
     ZERO_ADDRESS = Web3.toHex(0x0)
+    INIT_CODE_HASH = UNISWAP_V2.init_code_hash
 
     @staticmethod
     def sort_tokens(token_a, token_b):
-        assert token_a != token_b
-        (token_0, token_1) = (token_a, token_b) if int(token_a, 16) < int(token_b, 16) else (token_b, token_a)
-        assert token_0 != UniswapV2Utils.ZERO_ADDRESS
+        """
+        Sorts two token addresses the way pair contracts do, regardless of
+        the casing or representation they are given in.
+
+        :param token_a: Address of a token.
+        :param token_b: Address of a token.
+        :return: The given addresses, lower sort order first.
+        """
+        address_a = Address.of(token_a)
+        address_b = Address.of(token_b)
+        assert address_a != address_b
+        (token_0, token_1) = (token_a, token_b) if address_a < address_b else (token_b, token_a)
+        assert Address.of(token_0) != Address.ZERO
         return token_0, token_1
 
     @staticmethod
-    def pair_for(factory, token_a, token_b):
-        prefix = Web3.toHex(hexstr="ff")
-        encoded_tokens = Web3.solidityKeccak(["address", "address"], UniswapV2Utils.sort_tokens(token_a, token_b))
-        suffix = Web3.toHex(hexstr="96e8ac4277198ff8b6f785478aa9a39f403cb768dd02cbee326c3e7da348845f")
-        raw = Web3.solidityKeccak(["bytes", "address", "bytes", "bytes"], [prefix, factory, encoded_tokens, suffix])
-        return Web3.toChecksumAddress(Web3.toHex(raw)[-40:])
+    def pair_for(factory, token_a, token_b, init_code_hash=INIT_CODE_HASH):
+        """
+        Computes the CREATE2 address of the pair for token_a and token_b
+        without querying the chain. Results are cached.
+
+        :param factory: Address of the factory.
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param init_code_hash: Keccak hash of the pair init code of the factory.
+        :return: Checksum address of the pair.
+        """
+        if init_code_hash is None:
+            raise RuntimeError("Unknown init code hash for factory " + str(factory) + ", query the factory instead")
+        token_0, token_1 = UniswapV2Utils.sort_tokens(Address.of(token_a), Address.of(token_b))
+        return _pair_for(Address.of(factory), token_0, token_1, init_code_hash).checksum
 
     @staticmethod
     def get_reserves(factory, token_a, token_b):
         pass  # TODO move to UniswapV2Client
 
+    @staticmethod
+    def sqrt(y):
+        """
+        Integer square root, rounded down (babylonian method, as in the
+        Math library used by the pair contract).
+
+        :param y: Non-negative integer.
+        :return: Largest integer z such that z*z <= y.
+        """
+        if y > 3:
+            z = y
+            x = y // 2 + 1
+            while x < z:
+                z = x
+                x = (y // x + x) // 2
+            return z
+        return 1 if y != 0 else 0
+
     @staticmethod
     def calculate_quote(amount_a, reserve_a, reserve_b):
         assert amount_a > 0
         assert reserve_a > 0 and reserve_b > 0
-        return amount_a * (reserve_b/reserve_a)
+        return amount_a * reserve_b // reserve_a
 
     @staticmethod
-    def get_amount_out(amount_in, reserve_in, reserve_out):
+    def get_amount_out(amount_in, reserve_in, reserve_out, fee_bps=30):
         """
         Given an input asset amount, returns the maximum output amount of the
         other asset (accounting for fees) given reserves.
 
         :param amount_in: Amount of input asset.
         :param reserve_in: Reserve of input asset in the pair contract.
-        :param reserve_out: Reserve of input asset in the pair contract.
+        :param reserve_out: Reserve of output asset in the pair contract.
+        :param fee_bps: Swap fee in basis points.
         :return: Maximum amount of output asset.
         """
         assert amount_in > 0
         assert reserve_in > 0 and reserve_out > 0
-        amount_in_with_fee = amount_in*997
+        amount_in_with_fee = amount_in*(10000 - fee_bps)
         numerator = amount_in_with_fee*reserve_out
-        denominator = reserve_in*1000 + amount_in_with_fee
-        return int(numerator/denominator)
+        denominator = reserve_in*10000 + amount_in_with_fee
+        return numerator // denominator
 
     @staticmethod
-    def get_amount_in(amount_out, reserve_in, reserve_out):
+    def get_amount_in(amount_out, reserve_in, reserve_out, fee_bps=30):
         """
         Returns the minimum input asset amount required to buy the given
         output asset amount (accounting for fees) given reserves.
 
         :param amount_out: Amount of output asset.
         :param reserve_in: Reserve of input asset in the pair contract.
-        :param reserve_out: Reserve of input asset in the pair contract.
+        :param reserve_out: Reserve of output asset in the pair contract.
+        :param fee_bps: Swap fee in basis points.
         :return: Required amount of input asset.
         """
         assert amount_out > 0
         assert reserve_in > 0 and reserve_out > 0
-        numerator = reserve_in*amount_out*1000
-        denominator = (reserve_out - amount_out)*997
-        return int(numerator/denominator + 1)
+        numerator = reserve_in*amount_out*10000
+        denominator = (reserve_out - amount_out)*(10000 - fee_bps)
+        return numerator // denominator + 1
+
+    @staticmethod
+    def get_position(liquidity, total_supply, reserve_0, reserve_1, k_last=0, fee_on=False):
+        """
+        Calculates the underlying token amounts of a liquidity position,
+        accounting for the protocol fee liquidity the pair would mint on
+        the next liquidity event.
+
+        :param liquidity: Amount of liquidity tokens held.
+        :param total_supply: Total supply of liquidity tokens.
+        :param reserve_0: Reserve of token_0 in the pair contract.
+        :param reserve_1: Reserve of token_1 in the pair contract.
+        :param k_last: Product of the reserves as of the most recent liquidity event.
+        :param fee_on: Whether or not the protocol fee is switched on.
+        :return:
+            - amount_0 - Amount of token_0 the liquidity is worth.
+            - amount_1 - Amount of token_1 the liquidity is worth.
+            - fee_liquidity - Amount of liquidity tokens pending to be minted as protocol fee.
+        """
+        fee_liquidity = 0
+        if fee_on and k_last != 0:
+            root_k = UniswapV2Utils.sqrt(reserve_0 * reserve_1)
+            root_k_last = UniswapV2Utils.sqrt(k_last)
+            if root_k > root_k_last:
+                fee_liquidity = total_supply * (root_k - root_k_last) // (root_k * 5 + root_k_last)
+        total_supply += fee_liquidity
+        if total_supply == 0:
+            return 0, 0, fee_liquidity
+        return liquidity * reserve_0 // total_supply, liquidity * reserve_1 // total_supply, fee_liquidity
 
     @staticmethod
     def get_amounts_out(amount_in, path):
@@ -97,48 +229,173 @@ class UniswapV2Utils(object):
         pass
 
 
+class PreflightError(RuntimeError):
+    """
+    Raised when a transaction reverts when simulated before being sent.
+    """
+
+    def __init__(self, reason, func=None):
+        super().__init__("Transaction would revert: " + str(reason))
+        self.reason = reason
+        self.func = func
+
+
+def _revert_reason(error):
+    # nodes report reverts as {"code": ..., "message": "execution reverted: <reason>"}
+    message = error.args[0] if error.args else error
+    if isinstance(message, dict):
+        message = message.get("message", message)
+    message = str(message)
+    prefix = "execution reverted: "
+    return message[message.index(prefix) + len(prefix):] if prefix in message else message
+
+
 class UniswapObject(object):
 
+    ERROR_SELECTOR = bytes.fromhex("08c379a0")  # Error(string)
+    SIMULATION_GAS = 10000000
+
     def __init__(self, address, private_key, provider=None):
-        self.address = Web3.toChecksumAddress(address)
+        self.address = _checksum(address)
         self.private_key = private_key
 
         self.provider = os.environ["PROVIDER"] if not provider else provider
-        if re.match(r'^https*:', self.provider):
-            provider = Web3.HTTPProvider(self.provider, request_kwargs={"timeout": 60})
-        elif re.match(r'^ws*:', self.provider):
-            provider = Web3.WebsocketProvider(self.provider)
-        elif re.match(r'^/', self.provider):
-            provider = Web3.IPCProvider(self.provider)
-        else:
-            raise RuntimeError("Unknown provider type " + self.provider)
-        self.conn = Web3(provider)
-        if not self.conn.isConnected():
-            raise RuntimeError("Unable to connect to provider at " + self.provider)
-        self.gasPrice = self.conn.toWei(15, "gwei"),
-
-    def _create_transaction_params(self, value=0, gas=1500000):
+        self.conn = connect(self.provider)
+        self.gasPrice = self.conn.toWei(15, "gwei")
+        self.gas_multiplier = 1.2
+        self.preflight = False
+        self._collected = None
+
+    def _create_transaction_params(self, value=0, gas=None, nonce="latest"):
+        # nonce None leaves it to the caller, e.g. when sending with consecutive nonces
         return {
             "from": self.address,
             "value": value,
             'gasPrice': self.gasPrice,
             "gas": gas,
-            "nonce": self.conn.eth.getTransactionCount(self.address),
+            "nonce": self.conn.eth.getTransactionCount(self.address) if nonce == "latest" else nonce,
         }
 
-    def _send_transaction(self, func, params):
+    def _send_transaction(self, func, params, collect=True):
+        if collect and self._collected is not None:
+            self._collected.append((func, params))
+            return None
+        if self.preflight:
+            params["gas"] = params["gas"] or self.simulate(func, params)[1]
+        elif not params["gas"]:
+            params["gas"] = self._estimate_gas(func, params)
         tx = func.buildTransaction(params)
         signed_tx = self.conn.eth.account.sign_transaction(tx, private_key=self.private_key)
         return self.conn.eth.sendRawTransaction(signed_tx.rawTransaction)
 
+    # Pre-flight Simulation
+    # -----------------------------------------------------------
+    def _call_params(self, func, params):
+        tx = func.buildTransaction(dict(params, gas=params["gas"] or UniswapObject.SIMULATION_GAS))
+        return {"from": tx["from"], "to": tx["to"], "data": tx["data"], "value": tx.get("value", 0)}
+
+    def _estimate_gas(self, func, params, block_identifier="pending"):
+        try:
+            gas = self.conn.eth.estimateGas(self._call_params(func, params), block_identifier)
+        except ValueError as e:
+            raise PreflightError(_revert_reason(e), func)
+        return int(gas * self.gas_multiplier)
+
+    def simulate(self, func, params, block_identifier="pending"):
+        """
+        Runs a transaction through eth_call and eth_estimateGas without sending it.
+
+        :param func: Contract function call of the transaction.
+        :param params: Transaction parameters.
+        :param block_identifier: Block to simulate on top of, defaults to the pending block.
+        :return:
+            - result - Decoded return values of the call.
+            - gas - Gas estimate, with the gas_multiplier margin applied.
+        :raise PreflightError: If the transaction reverts.
+        """
+        call = self._call_params(func, params)
+        try:
+            data = self.conn.eth.call(call, block_identifier)
+        except ValueError as e:
+            raise PreflightError(_revert_reason(e), func)
+        if data[:4] == UniswapObject.ERROR_SELECTOR:
+            raise PreflightError(decode_abi(["string"], data[4:])[0], func)
+        types = [output["type"] for output in func.abi.get("outputs", [])]
+        result = decode_abi(types, data) if types else ()
+        result = result[0] if len(result) == 1 else result
+        return result, self._estimate_gas(func, params, block_identifier)
+
+    def simulate_all(self, transactions, workers=8, block_identifier="pending"):
+        """
+        Simulates transactions concurrently, each on its own against the same block.
+
+        :param transactions: List of ``(func, params)`` tuples, e.g. collected with ``collect``.
+        :param workers: Number of concurrent simulations.
+        :param block_identifier: Block to simulate on top of, defaults to the pending block.
+        :return: ``(result, gas)`` tuples as returned by simulate, or the PreflightError
+            of the transactions that revert.
+        """
+        def simulate(transaction):
+            try:
+                return self.simulate(transaction[0], transaction[1], block_identifier)
+            except PreflightError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(simulate, transactions))
+
+    def send_all(self, transactions, workers=8):
+        """
+        Simulates transactions concurrently and sends the ones that pass, in
+        order, with consecutive nonces and gas limits taken from the estimates.
+
+        Each transaction is simulated on its own against the pending block, not
+        on top of the earlier ones in the batch. A transaction relying on an
+        earlier one, e.g. on its approval, the tokens it receives or the reserves
+        it moves, can pass and still revert once mined, so such transactions
+        should be sent in separate batches once the ones they rely on are mined.
+
+        :param transactions: List of ``(func, params)`` tuples, e.g. collected with ``collect``.
+        :param workers: Number of concurrent simulations.
+        :return: Hash of each sent transaction, or the PreflightError of the ones that revert.
+        """
+        results = self.simulate_all(transactions, workers)
+        nonce = self.conn.eth.getTransactionCount(self.address, "pending")
+        sent = []
+        for (func, params), result in zip(transactions, results):
+            if isinstance(result, PreflightError):
+                sent.append(result)
+                continue
+            tx = func.buildTransaction(dict(params, gas=result[1], nonce=nonce))
+            signed_tx = self.conn.eth.account.sign_transaction(tx, private_key=self.private_key)
+            sent.append(self.conn.eth.sendRawTransaction(signed_tx.rawTransaction))
+            nonce += 1
+        return sent
+
+    @contextmanager
+    def collect(self):
+        """
+        Collects the transactions of the state-changing methods called in the
+        context instead of sending them, to be passed to simulate_all or
+        send_all. Token approvals are still sent and awaited, so that the
+        collected transactions can be simulated.
+
+        :return: List the ``(func, params)`` tuples are collected into.
+        """
+        self._collected = collected = []
+        try:
+            yield collected
+        finally:
+            self._collected = None
+
 
 class UniswapV2Client(UniswapObject):
 
-    ADDRESS = "0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f"
+    ADDRESS = UNISWAP_V2.factory
 
     ABI = json.load(open(os.path.abspath(f"{os.path.dirname(os.path.abspath(__file__))}/assets/" + "IUniswapV2Factory.json")))["abi"]
 
-    ROUTER_ADDRESS = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+    ROUTER_ADDRESS = UNISWAP_V2.router
     ROUTER_ABI = json.load(open(os.path.abspath(f"{os.path.dirname(os.path.abspath(__file__))}/assets/" + "IUniswapV2Router02.json")))["abi"]
 
     MAX_APPROVAL_HEX = "0x" + "f" * 64
@@ -147,21 +404,26 @@ class UniswapV2Client(UniswapObject):
 
     PAIR_ABI = json.load(open(os.path.abspath(f"{os.path.dirname(os.path.abspath(__file__))}/assets/" + "IUniswapV2Pair.json")))["abi"]
 
-    def __init__(self, address, private_key, provider=None):
+    def __init__(self, address, private_key, provider=None, profile=UNISWAP_V2):
+        """
+        :param address: Address of the account.
+        :param private_key: Private key of the account.
+        :param provider: Provider URI or web3 provider object, defaults to the PROVIDER environment variable.
+        :param profile: FactoryProfile of the exchange to use, defaults to Uniswap V2.
+        """
         super().__init__(address, private_key, provider)
+        self.profile = profile
         self.contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(UniswapV2Client.ADDRESS), abi=UniswapV2Client.ABI)
+            address=_checksum(profile.factory), abi=UniswapV2Client.ABI)
         self.router = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(UniswapV2Client.ROUTER_ADDRESS), abi=UniswapV2Client.ROUTER_ABI)
+            address=_checksum(profile.router), abi=UniswapV2Client.ROUTER_ABI)
+        self.multicall = Multicall(self.conn)
+        self.raw = RawReader(self.conn.provider)
 
     # Utilities
     # -----------------------------------------------------------
     def _is_approved(self, token, amount=MAX_APPROVAL_INT):
-        erc20_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(token), abi=UniswapV2Client.PAIR_ABI)
-        print(erc20_contract, token)
-        approved_amount = erc20_contract.functions.allowance(self.address, self.router.address).call()
-        return approved_amount >= amount
+        return self.raw.allowance(token, self.address, self.router.address) >= amount
 
     def is_approved(self, token, amount=MAX_APPROVAL_INT):
         return self._is_approved(token, amount)
@@ -172,59 +434,78 @@ class UniswapV2Client(UniswapObject):
 
         print("Approving {} of {}".format(max_approval, token))
         erc20_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(token), abi=UniswapV2Client.ERC20_ABI)
+            address=_checksum(token), abi=UniswapV2Client.ERC20_ABI)
 
         func = erc20_contract.functions.approve(self.router.address, max_approval)
         params = self._create_transaction_params()
-        tx = self._send_transaction(func, params)
+        tx = self._send_transaction(func, params, collect=False)
 
         # wait for transaction receipt
         self.conn.eth.waitForTransactionReceipt(tx, timeout=6000)  # TODO raise exception on timeout
 
+    def at_block(self, block_identifier="latest"):
+        """
+        Returns a read-only view of the client pinned to a single block.
+        Every read made through the view, batched ones included, executes
+        at that block and is cached for the lifetime of the view.
+
+        :param block_identifier: Block number, or "latest" to pin the current block.
+        :return: The snapshot view.
+        """
+        if block_identifier == "latest":
+            block_identifier = self.conn.eth.blockNumber
+        return UniswapV2Snapshot(self, block_identifier)
+
     # Factory Read-Only Functions
     # -----------------------------------------------------------
-    def get_pair(self, token_a, token_b):
+    def get_pair(self, token_a, token_b, block_identifier="latest"):
         """
         Gets the address of the pair for token_a and token_b,
         if it has been created, else 0x0.
+
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Address of the pair.
         """
-        addr_1 = self.conn.toChecksumAddress(token_a)
-        addr_2 = self.conn.toChecksumAddress(token_b)
-        return self.contract.functions.getPair(addr_1, addr_2).call()
+        addr_1 = _checksum(token_a)
+        addr_2 = _checksum(token_b)
+        return self.contract.functions.getPair(addr_1, addr_2).call(block_identifier=block_identifier)
 
-    def get_pair_by_index(self, pair_index):
+    def get_pair_by_index(self, pair_index, block_identifier="latest"):
         """
         Gets the address of the nth pair (0-indexed) created through
         the factory, or 0x0 if not enough pairs have been created yet.
 
         :param pair_index: Index of the pair in the factory.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Address of the indexed pair.
         """
         try:
-            return self.contract.functions.allPairs(pair_index).call()
+            return self.contract.functions.allPairs(pair_index).call(block_identifier=block_identifier)
         except BadFunctionCallOutput:
             return "0x0000000000000000000000000000000000000000"
 
-    def get_num_pairs(self):
+    def get_num_pairs(self, block_identifier="latest"):
         """
         Gets the total number of pairs created through the factory so far.
 
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Total number of pairs.
         """
-        return self.contract.functions.allPairsLength().call()
+        return self.contract.functions.allPairsLength().call(block_identifier=block_identifier)
 
-    def get_fee(self):
+    def get_fee(self, block_identifier="latest"):
         """
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Protocol wide fee.
         """
-        return self.contract.functions.feeTo().call()
+        return self.contract.functions.feeTo().call(block_identifier=block_identifier)
 
-    def get_fee_setter(self):
+    def get_fee_setter(self, block_identifier="latest"):
         """
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Address allowed to change the fee.
         """
-        return self.contract.functions.feeToSetter().call()
+        return self.contract.functions.feeToSetter().call(block_identifier=block_identifier)
 
     # Factory State-Changing Functions
     # -----------------------------------------------------------
@@ -234,30 +515,32 @@ class UniswapV2Client(UniswapObject):
         :return: the created address of the pair.
         """
         func = self.contract.functions.createPair(token_1, token_2)
-        params = self._create_transaction_params(gas=3000000)
+        params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
     # Router Read-Only Functions
     # -----------------------------------------------------------
-    def get_factory(self, query_chain=False):
+    def get_factory(self, query_chain=False, block_identifier="latest"):
         """
         Returns the address for the factory contract.
 
         :param query_chain: Whether or not to query the on chain contract.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: The factory address.
         """
         if query_chain:
-            return self.router.functions.factory().call()
-        return UniswapV2Client.ADDRESS
+            return self.router.functions.factory().call(block_identifier=block_identifier)
+        return _checksum(self.profile.factory)
 
-    def get_weth_address(self):
+    def get_weth_address(self, block_identifier="latest"):
         """
         Returns the canonical WETH address on the Ethereum mainnet, or the
         Ropsten, Rinkeby, Gorli, or Kovan testnets.
 
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: The canonical WETH address
         """
-        return self.router.functions.WETH().call()
+        return self.router.functions.WETH().call(block_identifier=block_identifier)
 
     # Router State-Changing Functions
     # -----------------------------------------------------------
@@ -280,8 +563,9 @@ class UniswapV2Client(UniswapObject):
         """
         self.approve(token_a, amount_a)
         self.approve(token_b, amount_b)
-        func = self.router.functions.addLiquidity(token_a, token_b, amount_a, amount_b, min_a, min_b, to, deadline)
-        params = self._create_transaction_params(gas=3000000)  # FIXME
+        func = self.router.functions.addLiquidity(
+            _checksum(token_a), _checksum(token_b), amount_a, amount_b, min_a, min_b, _checksum(to), deadline)
+        params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
     def add_liquidity_eth(self, token, amount_token, amount_eth, min_token, min_eth, to, deadline):
@@ -301,8 +585,9 @@ class UniswapV2Client(UniswapObject):
             - liquidity - Amount of liquidity tokens minted.
         """
         self.approve(token, amount_token)
-        func = self.router.functions.addLiquidityETH(token, amount_token, min_token, min_eth, to, deadline)
-        params = self._create_transaction_params(amount_eth)  # FIXME
+        func = self.router.functions.addLiquidityETH(
+            _checksum(token), amount_token, min_token, min_eth, _checksum(to), deadline)
+        params = self._create_transaction_params(amount_eth)
         return self._send_transaction(func, params)
 
     def remove_liquidity(self, token_a, token_b, liquidity, min_a, min_b, to, deadline):
@@ -321,7 +606,8 @@ class UniswapV2Client(UniswapObject):
             - amount_b - Amount of token_b received.
         """
         self.approve(self.get_pair(token_a, token_b), liquidity)
-        func = self.router.functions.removeLiquidity(token_a, token_b, liquidity, min_a, min_b, to, deadline)
+        func = self.router.functions.removeLiquidity(
+            _checksum(token_a), _checksum(token_b), liquidity, min_a, min_b, _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -339,8 +625,9 @@ class UniswapV2Client(UniswapObject):
             - amount_token - Amount of token received.
             - amount_eth - Amount of ETH received.
         """
-        self.approve(self.get_pair(token, "0xc778417e063141139fce010982780140aa0cd5ab"), liquidity)  # FIXME hardcoded WETH address
-        func = self.router.functions.removeLiquidityETH(token, liquidity, min_token, min_eth, to, deadline)
+        self.approve(self.get_pair(token, self.profile.weth or self.get_weth_address()), liquidity)
+        func = self.router.functions.removeLiquidityETH(
+            _checksum(token), liquidity, min_token, min_eth, _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -365,7 +652,7 @@ class UniswapV2Client(UniswapObject):
             - amount_b - Amount of token_b received.
         """
         func = self.router.functions.removeLiquidityWithPermit(
-            token_a, token_b, liquidity, min_a, min_b, to, deadline, approve_max, v, r, s)
+            _checksum(token_a), _checksum(token_b), liquidity, min_a, min_b, _checksum(to), deadline, approve_max, v, r, s)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -389,7 +676,7 @@ class UniswapV2Client(UniswapObject):
             - amount_eth - Amount of ETH received.
         """
         func = self.router.functions.removeLiquidityETHWithPermit(
-            token, liquidity, min_token, min_eth, to, deadline, approve_max, v, r, s)
+            _checksum(token), liquidity, min_token, min_eth, _checksum(to), deadline, approve_max, v, r, s)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -409,7 +696,8 @@ class UniswapV2Client(UniswapObject):
         :return: Input token amount and all subsequent output token amounts.
         """
         self.approve(path[0], amount)
-        func = self.router.functions.swapExactTokensForTokens(amount, min_out, path, to, deadline)
+        func = self.router.functions.swapExactTokensForTokens(
+            amount, min_out, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -429,7 +717,8 @@ class UniswapV2Client(UniswapObject):
         :return: Input token amount and all subsequent output token amounts.
         """
         self.approve(path[0], amount_out)
-        func = self.router.functions.swapTokensForExactTokens(amount_out, amount_in_max, path, to, deadline)
+        func = self.router.functions.swapTokensForExactTokens(
+            amount_out, amount_in_max, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -448,7 +737,7 @@ class UniswapV2Client(UniswapObject):
         :param deadline: Unix timestamp after which the transaction will revert.
         :return: Input token amount and all subsequent output token amounts.
         """
-        func = self.router.functions.swapExactETHForTokens(min_out, path, to, deadline)
+        func = self.router.functions.swapExactETHForTokens(min_out, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params(amount)
         return self._send_transaction(func, params)
 
@@ -468,7 +757,8 @@ class UniswapV2Client(UniswapObject):
         :return: Input token amount and all subsequent output token amounts.
         """
         self.approve(path[0], amount_in_max)
-        func = self.router.functions.swapTokensForExactETH(amount_out, amount_in_max, path, to, deadline)
+        func = self.router.functions.swapTokensForExactETH(
+            amount_out, amount_in_max, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -488,7 +778,8 @@ class UniswapV2Client(UniswapObject):
         :return: Input token amount and all subsequent output token amounts.
         """
         self.approve(path[0], amount)
-        func = self.router.functions.swapExactTokensForETH(amount, min_out, path, to, deadline)
+        func = self.router.functions.swapExactTokensForETH(
+            amount, min_out, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params()
         return self._send_transaction(func, params)
 
@@ -507,112 +798,246 @@ class UniswapV2Client(UniswapObject):
         :param deadline: Unix timestamp after which the transaction will revert.
         :return: Input token amount and all subsequent output token amounts.
         """
-        func = self.router.functions.swapETHForExactTokens(amount_out, path, to, deadline)
+        func = self.router.functions.swapETHForExactTokens(amount_out, _checksum_path(path), _checksum(to), deadline)
         params = self._create_transaction_params(amount_in_max)
         return self._send_transaction(func, params)
 
     # Pair Read-Only Functions
     # -----------------------------------------------------------
 
-    def get_token_0(self, pair):
+    def get_token_0(self, pair, block_identifier="latest"):
         """
         Gets the address of the pair token with the lower sort order.
 
         :param pair: Address of the pair.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Address of the pair token with the lower sort order
         """
-        pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(pair), abi=UniswapV2Client.PAIR_ABI)
-        return pair_contract.functions.token0().call()
+        return self.raw.token_0(pair, block_identifier).checksum
 
-    def get_token_1(self, pair):
+    def get_token_1(self, pair, block_identifier="latest"):
         """
         Gets the address of the pair token with the lower sort order.
 
         :param pair: Address of the pair.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Address of the pair token with the lower sort order.
         """
-        pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(pair), abi=UniswapV2Client.PAIR_ABI)
-        return pair_contract.functions.token1().call()
+        return self.raw.token_1(pair, block_identifier).checksum
 
-    def get_reserves(self, token_a, token_b):
+    def get_reserves(self, token_a, token_b, block_identifier="latest"):
         """
         Gets the reserves of token_0 and token_1 used to price trades
         and distribute liquidity as well as the timestamp of the last block
         during which an interaction occurred for the pair.
 
-        :param pair: Address of the pair.
+        :param token_a: Address of a pool token.
+        :param token_b: Address of a pool token.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return:
             - reserve_0 - Amount of token_0 in the contract.
             - reserve_1 - Amount of token_1 in the contract.
             - liquidity - Unix timestamp of the block containing the last pair interaction.
         """
-        (token0, token1) = UniswapV2Utils.sort_tokens(token_a, token_b)
-        pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(
-                UniswapV2Utils.pair_for(self.get_factory(), token_a, token_b)),
-                abi=UniswapV2Client.PAIR_ABI
-            )
-        reserve = pair_contract.functions.getReserves().call()
-        return reserve if token0 == token_a else [reserve[1], reserve[0], reserve[2]]
+        token_a = Address.of(token_a)
+        (token0, token1) = UniswapV2Utils.sort_tokens(token_a, Address.of(token_b))
+        if self.profile.init_code_hash is None:
+            pair = self.get_pair(token0, token1, block_identifier)
+        else:
+            pair = UniswapV2Utils.pair_for(self.get_factory(), token0, token1, self.profile.init_code_hash)
+        reserve_0, reserve_1, timestamp = self.raw.get_reserves(pair, block_identifier)
+        return [reserve_0, reserve_1, timestamp] if token0 == token_a else [reserve_1, reserve_0, timestamp]
 
-    def get_price_0_cumulative_last(self, pair):
+    def get_price_0_cumulative_last(self, pair, block_identifier="latest"):
         """
         Gets the commutative price of the pair calculated relatively
         to token_0.
 
         :param pair: Address of the pair.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Commutative price relative to token_0.
         """
         pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(pair), abi=UniswapV2Client.PAIR_ABI)
-        return pair_contract.functions.price0CumulativeLast().call()
+            address=_checksum(pair), abi=UniswapV2Client.PAIR_ABI)
+        return pair_contract.functions.price0CumulativeLast().call(block_identifier=block_identifier)
 
-    def get_price_1_cumulative_last(self, pair):
+    def get_price_1_cumulative_last(self, pair, block_identifier="latest"):
         """
         Gets the commutative price of the pair calculated relatively
         to token_1.
 
         :param pair: Address of the pair.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Commutative price relative to token_1.
         """
         pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(pair), abi=UniswapV2Client.PAIR_ABI)
-        return pair_contract.functions.price1CumulativeLast().call()
+            address=_checksum(pair), abi=UniswapV2Client.PAIR_ABI)
+        return pair_contract.functions.price1CumulativeLast().call(block_identifier=block_identifier)
 
-    def get_k_last(self, pair):
+    def get_k_last(self, pair, block_identifier="latest"):
         """
         Returns the product of the reserves as of the most recent
         liquidity event.
 
         :param pair: Address of the pair.
+        :param block_identifier: Block to query, defaults to the latest block.
         :return: Product of the reserves.
         """
         pair_contract = self.conn.eth.contract(
-            address=Web3.toChecksumAddress(pair), abi=UniswapV2Client.PAIR_ABI)
-        return pair_contract.functions.kLast().call()
+            address=_checksum(pair), abi=UniswapV2Client.PAIR_ABI)
+        return pair_contract.functions.kLast().call(block_identifier=block_identifier)
 
-    def get_amounts_out(self, amount_in, path):
+    def get_positions(self, owner, pairs, block_identifier="latest"):
+        """
+        Values the liquidity positions of owner in many pairs, reading all
+        balances, supplies, reserves and kLast values in batched calls.
+
+        :param owner: Address of the liquidity provider.
+        :param pairs: Addresses of the pairs.
+        :param block_identifier: Block to value the positions at.
+        :return: List of dicts, one per pair, with keys pair, token_0, token_1, liquidity,
+            total_supply, reserve_0, reserve_1, k_last, amount_0, amount_1 and fee_liquidity.
+        """
+        owner = _checksum(owner)
+        pairs = _checksum_path(pairs)
+        uint = decoder("uint256")
+        address = decoder("address")
+        balance_of = encode_call("balanceOf(address)", ["address"], [owner])
+        total_supply = encode_call("totalSupply()")
+        k_last = encode_call("kLast()")
+        reserves = decoder("uint112", "uint112", "uint32")
+
+        calls = [(self.get_factory(), encode_call("feeTo()"), address)]
+        for pair in pairs:
+            calls += [
+                (pair, Multicall.TOKEN_0, address),
+                (pair, Multicall.TOKEN_1, address),
+                (pair, balance_of, uint),
+                (pair, total_supply, uint),
+                (pair, Multicall.GET_RESERVES, reserves),
+                (pair, k_last, uint),
+            ]
+        results = self.multicall.call(calls, block_identifier)
+        fee_on = results[0] is not None and int(results[0], 16) != 0
+
+        positions = []
+        for i, pair in enumerate(pairs):
+            token_0, token_1, liquidity, supply, reserve, k = results[1 + 6 * i:7 + 6 * i]
+            if reserve is None:
+                raise RuntimeError("Unable to read pair at " + pair)
+            amount_0, amount_1, fee_liquidity = UniswapV2Utils.get_position(
+                liquidity, supply, reserve[0], reserve[1], k or 0, fee_on)
+            positions.append({
+                "pair": pair,
+                "token_0": _checksum(token_0),
+                "token_1": _checksum(token_1),
+                "liquidity": liquidity,
+                "total_supply": supply,
+                "reserve_0": reserve[0],
+                "reserve_1": reserve[1],
+                "k_last": k or 0,
+                "amount_0": amount_0,
+                "amount_1": amount_1,
+                "fee_liquidity": fee_liquidity,
+            })
+        return positions
+
+    def get_amounts_out(self, amount_in, path, block_identifier="latest"):
         assert len(path) >= 2
-        amounts = [amount_in]
-        current_amount = amount_in
-        for p0, p1 in zip(path, path[1:]):
-            r = self.get_reserves(p0, p1)
-            current_amount = UniswapV2Utils.get_amount_out(
-                current_amount, r[0], r[1]
-            )
-            amounts.append(current_amount)
+        amounts = [0] * len(path)
+        amounts[0] = amount_in
+        for i in range(1, len(path)):
+            r = self.get_reserves(path[i - 1], path[i], block_identifier)
+            amounts[i] = UniswapV2Utils.get_amount_out(amounts[i - 1], r[0], r[1], self.profile.fee_bps)
         return amounts
 
-    def get_amounts_in(self, amount_out, path):
+    def get_amounts_in(self, amount_out, path, block_identifier="latest"):
         assert len(path) >= 2
-        amounts = [amount_out]
-        current_amount = amount_out
-        for p0, p1 in reversed(list(zip(path, path[1:]))):
-            r = self.get_reserves(p0, p1)
-            current_amount = UniswapV2Utils.get_amount_in(
-                current_amount, r[0], r[1]
-            )
-            amounts.insert(0, current_amount)
+        amounts = [0] * len(path)
+        amounts[-1] = amount_out
+        for i in range(len(path) - 1, 0, -1):
+            r = self.get_reserves(path[i - 1], path[i], block_identifier)
+            amounts[i - 1] = UniswapV2Utils.get_amount_in(amounts[i], r[0], r[1], self.profile.fee_bps)
         return amounts
+
+
+class UniswapV2Snapshot(object):
+    """
+    Read-only view of a UniswapV2Client pinned to a single block,
+    see UniswapV2Client.at_block.
+    """
+
+    def __init__(self, client, block_number):
+        self.client = client
+        self.conn = client.conn
+        self.profile = client.profile
+        self.block_number = block_number
+        self.multicall = PinnedMulticall(client.multicall, block_number)
+        self._cache = {}
+
+    def _read(self, key, read):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = read()
+            return value
+
+    def get_pair(self, token_a, token_b, block_identifier=None):
+        token_0, token_1 = UniswapV2Utils.sort_tokens(Address.of(token_a), Address.of(token_b))
+        return self._read(("getPair", token_0, token_1),
+                          lambda: self.client.get_pair(token_0, token_1, self.block_number))
+
+    def get_pair_by_index(self, pair_index, block_identifier=None):
+        return self._read(("allPairs", pair_index),
+                          lambda: self.client.get_pair_by_index(pair_index, self.block_number))
+
+    def get_num_pairs(self, block_identifier=None):
+        return self._read(("allPairsLength",), lambda: self.client.get_num_pairs(self.block_number))
+
+    def get_fee(self, block_identifier=None):
+        return self._read(("feeTo",), lambda: self.client.get_fee(self.block_number))
+
+    def get_fee_setter(self, block_identifier=None):
+        return self._read(("feeToSetter",), lambda: self.client.get_fee_setter(self.block_number))
+
+    def get_factory(self, query_chain=False, block_identifier=None):
+        if not query_chain:
+            return self.client.get_factory()
+        return self._read(("factory",), lambda: self.client.get_factory(True, self.block_number))
+
+    def get_weth_address(self, block_identifier=None):
+        return self._read(("WETH",), lambda: self.client.get_weth_address(self.block_number))
+
+    def get_token_0(self, pair, block_identifier=None):
+        pair = Address.of(pair)
+        return self._read(("token0", pair), lambda: self.client.get_token_0(pair, self.block_number))
+
+    def get_token_1(self, pair, block_identifier=None):
+        pair = Address.of(pair)
+        return self._read(("token1", pair), lambda: self.client.get_token_1(pair, self.block_number))
+
+    def get_reserves(self, token_a, token_b, block_identifier=None):
+        token_a = Address.of(token_a)
+        token_0, token_1 = UniswapV2Utils.sort_tokens(token_a, Address.of(token_b))
+        reserve = self._read(("getReserves", token_0, token_1),
+                             lambda: self.client.get_reserves(token_0, token_1, self.block_number))
+        return reserve if token_0 == token_a else [reserve[1], reserve[0], reserve[2]]
+
+    def get_price_0_cumulative_last(self, pair, block_identifier=None):
+        pair = Address.of(pair)
+        return self._read(("price0CumulativeLast", pair),
+                          lambda: self.client.get_price_0_cumulative_last(pair, self.block_number))
+
+    def get_price_1_cumulative_last(self, pair, block_identifier=None):
+        pair = Address.of(pair)
+        return self._read(("price1CumulativeLast", pair),
+                          lambda: self.client.get_price_1_cumulative_last(pair, self.block_number))
+
+    def get_k_last(self, pair, block_identifier=None):
+        pair = Address.of(pair)
+        return self._read(("kLast", pair), lambda: self.client.get_k_last(pair, self.block_number))
+
+    # batched and derived reads go through the pinned multicall and the cached getters above
+    get_positions = UniswapV2Client.get_positions
+    get_amounts_out = UniswapV2Client.get_amounts_out
+    get_amounts_in = UniswapV2Client.get_amounts_in